@@ -0,0 +1,311 @@
+"""
+异步数据抓取模块 - 批量获取多个交易对×周期的K线
+直接调用币安公开K线接口（不需要API key），所有请求共享一个连接池，并发数有上限
+
+域名优先使用市场信息缓存中上次连接成功的域名（与 DataCollector 相同），网络错误时依次切换备用域名
+开启HTTP录制/回放（utils/http_replay.py）时，请求改走 requests 录制/回放会话
+
+输出与 DataCollector.fetch_ohlcv 完全一致（datetime索引 + timestamp/open/high/low/close/volume）
+
+使用方法：
+    async with AsyncDataCollector() as collector:
+        frames = await collector.fetch_many(['BTC/USDT', 'ETH/USDT'], ['15m', '1h'])
+
+    # 同步代码中
+    frames = fetch_many_sync(['BTC/USDT', 'ETH/USDT'], ['15m', '1h'])
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+
+import aiohttp
+import pandas as pd
+import requests
+
+from data_collector import ohlcv_to_dataframe
+from utils.market_cache import get_market_cache
+from utils.http_replay import get_http_session, replay_mode
+
+logger = logging.getLogger(__name__)
+
+# 市场类型 → (可用域名（按优先级）, K线接口, 单次最大条数)
+KLINE_ENDPOINTS = {
+    'spot': (('api.binance.com', 'api2.binance.com', 'api3.binance.com', 'api4.binance.com'),
+             '/api/v3/klines', 1000),
+    'future': (('fapi.binance.com',), '/fapi/v1/klines', 1500),
+}
+
+
+class _RateLimited(Exception):
+    def __init__(self, delay: float):
+        super().__init__(f"retry after {delay}s")
+        self.delay = delay
+
+
+class AsyncDataCollector:
+    """异步数据采集器"""
+
+    def __init__(
+        self,
+        market_type: str = 'spot',
+        base_url: Optional[str] = None,
+        max_concurrency: int = 10,
+        proxy: Optional[str] = None,
+        timeout: float = 30,
+        max_retries: int = 3
+    ):
+        """
+        初始化异步数据采集器
+
+        Args:
+            market_type: 市场类型，'spot' (现货) 或 'future' (合约)
+            base_url: 接口地址（测试时可指向本地模拟服务），指定后不再切换备用域名；
+                      默认从市场信息缓存中的域名开始，依次尝试 KLINE_ENDPOINTS 中的域名
+            max_concurrency: 最大并发请求数（同时也是连接池大小）
+            proxy: 代理地址，如 'http://127.0.0.1:7890'
+            timeout: 单次请求超时（秒）
+            max_retries: 网络错误/限流时的最大重试次数
+        """
+        if market_type not in KLINE_ENDPOINTS:
+            raise ValueError(f"不支持的市场类型: {market_type}")
+
+        hostnames, self.kline_path, self.max_limit = KLINE_ENDPOINTS[market_type]
+        if base_url:
+            self.base_urls = [base_url.rstrip('/')]
+        else:
+            # 上次连接成功的域名（DataCollector 写入市场信息缓存）排在最前
+            cached = get_market_cache().load('binance', market_type)
+            first = (cached or {}).get('hostname')
+            if first not in hostnames:
+                first = hostnames[0]
+            self.base_urls = [f"https://{host}" for host in [first] + [h for h in hostnames if h != first]]
+        self.base_url = self.base_urls[0]
+        self.market_type = market_type
+        self.max_concurrency = max_concurrency
+        self.proxy = proxy
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_retries = max_retries
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._http = get_http_session() if replay_mode() else None   # 录制/回放会话
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        """创建共享连接池（同一事件循环内复用）"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @staticmethod
+    def _convert_symbol(symbol: str) -> str:
+        """BTC/USDT（或合约 BTC/USDT:USDT）→ BTCUSDT"""
+        return symbol.split(':')[0].replace('/', '')
+
+    def _failover(self, failed_url: str, error: Exception) -> bool:
+        """
+        切换到下一个备用域名（并发请求同时失败时只切换一次）
+
+        Returns:
+            是否有可用的新域名（False 表示所有域名都已尝试）
+        """
+        if self.base_url != failed_url:
+            return True
+        index = self.base_urls.index(failed_url)
+        if index + 1 >= len(self.base_urls):
+            return False
+        self.base_url = self.base_urls[index + 1]
+        logger.warning(f"⚠️  {failed_url} 连接失败，切换备用域名 {self.base_url}: {error}")
+        return True
+
+    async def _request(self, url: str, params: Dict) -> Tuple[int, Dict, str]:
+        """发送一次GET请求，返回 (状态码, 响应头, 响应内容)"""
+        if self._http is not None:
+            proxies = {'http': self.proxy, 'https': self.proxy} if self.proxy else None
+            response = await asyncio.to_thread(self._http.get, url, params=params,
+                                               proxies=proxies, timeout=self.timeout.total)
+            return response.status_code, response.headers, response.text
+
+        async with self.session.get(url, params=params, proxy=self.proxy) as response:
+            return response.status, response.headers, await response.text()
+
+    async def _get(self, params: Dict) -> list:
+        """请求K线接口（网络错误先切换备用域名，限流/网络错误按指数退避重试）"""
+        attempt = 0
+        while True:
+            base_url = self.base_url
+            try:
+                async with self._semaphore:
+                    status, headers, body = await self._request(f"{base_url}{self.kline_path}", params)
+                if status in (418, 429):
+                    raise _RateLimited(float(headers.get('Retry-After', 2 ** attempt)))
+                if status >= 400:
+                    raise ValueError(f"HTTP {status}: {body[:200]}")
+                return json.loads(body)
+            except _RateLimited as e:
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"触发限流，重试{self.max_retries}次后仍失败") from e
+                logger.warning(f"⚠️  {params['symbol']} {params['interval']} 触发限流，{e.delay:.0f}s 后重试")
+                await asyncio.sleep(e.delay)
+                attempt += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError, requests.exceptions.RequestException) as e:
+                if self._failover(base_url, e):
+                    continue
+                if attempt == self.max_retries:
+                    raise
+                delay = 2 ** attempt * 0.5
+                logger.warning(f"⚠️  {params['symbol']} {params['interval']} 网络错误，{delay}s 后重试: {e}")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str = '1h',
+        limit: int = 500,
+        since: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        获取OHLCV数据（开高低收量）
+
+        Args:
+            symbol: 交易对，如 'BTC/USDT'
+            timeframe: 时间周期，如 '1m', '5m', '15m', '1h', '4h', '1d'
+            limit: 获取条数，默认500
+            since: 起始时间戳（毫秒），None表示最近数据
+
+        Returns:
+            DataFrame with columns: timestamp, open, high, low, close, volume
+        """
+        await self.start()
+
+        params = {
+            'symbol': self._convert_symbol(symbol),
+            'interval': timeframe,
+            'limit': min(limit, self.max_limit),
+        }
+        if since is not None:
+            params['startTime'] = int(since)
+
+        rows = await self._get(params)
+
+        # 币安K线: [开盘时间, "开", "高", "低", "收", "量", 收盘时间, ...]
+        ohlcv = [[int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5])] for r in rows]
+        return ohlcv_to_dataframe(ohlcv)
+
+    async def fetch_since(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: int,
+        limit: int = 1000,
+        max_pages: int = 50
+    ) -> pd.DataFrame:
+        """
+        从 since 开始向后分页获取，直到最新K线（某一页不足一整页）或达到 max_pages 页
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            since: 起始时间戳（毫秒）
+            limit: 每页条数（不超过接口单次上限）
+            max_pages: 最多请求页数
+
+        Returns:
+            DataFrame（格式同 fetch_ohlcv）
+        """
+        page_size = min(limit, self.max_limit)
+        frames = []
+        for _ in range(max_pages):
+            df = await self.fetch_ohlcv(symbol, timeframe, page_size, since)
+            frames.append(df)
+            if len(df) < page_size:
+                break
+            since = int(df['timestamp'].iloc[-1]) + 1
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+    async def fetch_many(
+        self,
+        symbols: List[str],
+        timeframes: List[str],
+        limit: int = 500,
+        since: Union[None, int, Dict[Tuple[str, str], Optional[int]]] = None,
+        max_pages: int = 1
+    ) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """
+        并发获取多个交易对×周期的K线
+
+        Args:
+            symbols: 交易对列表
+            timeframes: 时间周期列表
+            limit: 每个序列获取条数
+            since: 起始时间戳（毫秒），可以按 (symbol, timeframe) 分别指定
+            max_pages: 指定了 since 的序列最多向后分页请求的页数（>1 时一直拉取到最新K线，见 fetch_since）
+
+        Returns:
+            {(symbol, timeframe): DataFrame}，获取失败的序列不包含在结果中（已记录错误日志）
+        """
+        await self.start()
+
+        pairs = [(symbol, tf) for symbol in symbols for tf in timeframes]
+        starts = since if isinstance(since, dict) else {pair: since for pair in pairs}
+
+        def fetch(symbol, tf):
+            start = starts.get((symbol, tf))
+            if start is not None and max_pages > 1:
+                return self.fetch_since(symbol, tf, start, limit, max_pages)
+            return self.fetch_ohlcv(symbol, tf, limit, start)
+
+        results = await asyncio.gather(*(fetch(symbol, tf) for symbol, tf in pairs), return_exceptions=True)
+
+        frames = {}
+        for pair, result in zip(pairs, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ 获取 {pair[0]} {pair[1]} 数据失败: {result}")
+            else:
+                frames[pair] = result
+
+        logger.info(f"✅ 批量获取完成: {len(frames)}/{len(pairs)} 个序列")
+        return frames
+
+
+def fetch_many_sync(symbols: List[str], timeframes: List[str], limit: int = 500,
+                    since=None, max_pages: int = 1, **collector_kwargs) -> Dict[Tuple[str, str], pd.DataFrame]:
+    """同步代码中批量获取（内部创建事件循环，参数同 AsyncDataCollector.fetch_many）"""
+
+    async def _run():
+        async with AsyncDataCollector(**collector_kwargs) as collector:
+            return await collector.fetch_many(symbols, timeframes, limit, since, max_pages)
+
+    return asyncio.run(_run())
+
+
+if __name__ == '__main__':
+    import time
+
+    logging.basicConfig(level=logging.INFO)
+
+    symbols = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'BNB/USDT']
+    timeframes = ['15m', '1h', '4h']
+
+    start = time.perf_counter()
+    frames = fetch_many_sync(symbols, timeframes, limit=500)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n📊 {len(frames)} 个序列, 耗时 {elapsed:.2f}s")
+    for (symbol, tf), df in sorted(frames.items()):
+        print(f"  {symbol:<10} {tf:<4} {len(df):>4} 条  {df.index[0]} ~ {df.index[-1]}")
@@ -320,18 +320,24 @@ CUSTOM_CONFIG = {
 }
 
 # ==================== 方案选择器 ====================
+PRESET_CONFIGS = {
+    'CONSERVATIVE': CONSERVATIVE_CONFIG,
+    'SIMPLIFIED': SIMPLIFIED_CONFIG,
+    'BALANCED': BALANCED_CONFIG,
+    'CUSTOM': CUSTOM_CONFIG,
+}
+
+
+def get_preset_config(preset: str):
+    """获取指定预设方案的配置"""
+    if preset not in PRESET_CONFIGS:
+        raise ValueError(f"未知的预设方案: {preset}")
+    return PRESET_CONFIGS[preset]
+
+
 def get_active_config():
     """获取当前激活的配置"""
-    if ACTIVE_PRESET == 'CONSERVATIVE':
-        return CONSERVATIVE_CONFIG
-    elif ACTIVE_PRESET == 'SIMPLIFIED':
-        return SIMPLIFIED_CONFIG
-    elif ACTIVE_PRESET == 'BALANCED':
-        return BALANCED_CONFIG
-    elif ACTIVE_PRESET == 'CUSTOM':
-        return CUSTOM_CONFIG
-    else:
-        raise ValueError(f"未知的预设方案: {ACTIVE_PRESET}")
+    return get_preset_config(ACTIVE_PRESET)
 
 def print_config_summary():
     """打印配置摘要"""
@@ -41,6 +41,51 @@ STORAGE_PARAMS = {
     "enable_cache": True,                  # 启用查询缓存
 }
 
+# ==================== K线缓存存储（data_cache_manager）====================
+
+CACHE_STORAGE_PARAMS = {
+    "cache_dir": "data/cache",             # 缓存目录
+    "backend": "columnar",                 # columnar(列式二进制), csv(原格式)
+    "compression": None,                   # 列式存储压缩：None(可追加/内存映射), "npz"(体积更小)
+    "read_legacy_csv": True,               # 新格式不存在时回退读取原CSV缓存
+    "lock_timeout": 300,                   # 等待序列读写锁的最长时间（秒），None表示一直等待
+}
+
+# ==================== 历史数据回填（data_backfill）====================
+
+BACKFILL_PARAMS = {
+    "requests_per_second": 8,              # 全局请求速率（所有线程共享，币安K线接口权重较低，留足余量）
+    "burst": 16,                           # 令牌桶容量（允许的瞬时并发请求数）
+    "max_workers": 8,                      # 并发线程数（交易对×周期 并行）
+    "page_limit": 1000,                    # 每页K线数（币安上限1000）
+    "flush_pages": 20,                     # 每抓取N页写入一次缓存并保存断点
+    "max_retries": 5,                      # 单页请求最大重试次数（指数退避）
+    "cursor_file": "data/cache/backfill_cursors.json",  # 断点文件
+}
+
+# ==================== 交易所市场信息缓存（utils/market_cache）====================
+
+MARKET_CACHE_PARAMS = {
+    "cache_dir": "data/cache/markets",     # 缓存目录（多个进程共享）
+    "ttl_hours": 24,                       # 有效期，过期后重新请求 load_markets
+}
+
+# ==================== HTTP 录制/回放（utils/http_replay）====================
+
+HTTP_REPLAY_PARAMS = {
+    "mode": None,                          # None(直连), "record"(录制), "replay"(离线回放)；环境变量 HTTP_REPLAY_MODE 优先
+    "archive_dir": "data/http_archive",    # 归档目录
+    "ignore_params": ["timestamp", "signature"],  # 计算请求指纹时忽略的查询参数
+    "latency": {                           # 回放延迟模型
+        "model": "none",                   # none / fixed / recorded / lognormal
+        "fixed_ms": 50,                    # fixed: 固定延迟
+        "scale": 1.0,                      # recorded: 录制耗时的倍数
+        "median_ms": 80,                   # lognormal: 中位数
+        "sigma": 0.5,                      # lognormal: 离散度
+        "seed": 0,                         # lognormal: 随机种子（保证可复现）
+    },
+}
+
 # ==================== 存储模式预设 ====================
 
 STORAGE_MODES = {
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+深度历史数据回填
+按 since 游标分页向后拉取，多个交易对×周期并发执行，直接写入本地缓存
+
+特性：
+1. 全局令牌桶限速（所有线程共享一个请求预算）
+2. 每写入一批数据保存一次断点，中断后从断点继续
+3. 已缓存的区间直接跳过，只拉取缺失的部分
+4. 网络错误/限流按指数退避重试
+
+使用方法：
+  python3 data_backfill.py --all -t 15m --days 365          # 所有交易对回填一年15m数据
+  python3 data_backfill.py --symbols BTC/USDT ETH/USDT -t 1h 15m --days 90
+  python3 data_backfill.py --all -t 15m --days 365 --reset  # 忽略断点重新开始
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import ccxt
+import pandas as pd
+
+from config.storage_params import BACKFILL_PARAMS
+from data_cache_manager import DataCacheManager
+from data_collector import ohlcv_to_dataframe
+from utils.timeframes import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 令牌桶容量（最大突发请求数）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """获取令牌，不足时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """被交易所限流后清空令牌，所有线程一起暂停"""
+        with self.lock:
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class CursorStore:
+    """回填断点（JSON文件，原子写入）"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.cursors: Dict[str, Dict] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.cursors = json.load(f)
+
+    @staticmethod
+    def key(symbol: str, timeframe: str) -> str:
+        return f"{symbol}|{timeframe}"
+
+    def get(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        with self.lock:
+            return self.cursors.get(self.key(symbol, timeframe))
+
+    def set(self, symbol: str, timeframe: str, cursor: Dict):
+        with self.lock:
+            self.cursors[self.key(symbol, timeframe)] = cursor
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cursors, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def clear(self, symbol: str, timeframe: str):
+        with self.lock:
+            self.cursors.pop(self.key(symbol, timeframe), None)
+
+
+class HistoryBackfiller:
+    """历史数据回填器"""
+
+    def __init__(
+        self,
+        exchange,
+        cache_manager: Optional[DataCacheManager] = None,
+        params: Optional[Dict] = None
+    ):
+        """
+        初始化回填器
+
+        Args:
+            exchange: ccxt 交易所实例（所有线程共享；run() 期间由令牌桶统一限速，结束后恢复原限速设置）
+            cache_manager: 缓存管理器
+            params: 回填参数，默认 BACKFILL_PARAMS
+        """
+        self.exchange = exchange
+        self.cache_manager = cache_manager or DataCacheManager()
+        self.params = {**BACKFILL_PARAMS, **(params or {})}
+
+        self.limiter = TokenBucket(self.params['requests_per_second'], self.params['burst'])
+        self.cursors = CursorStore(self.params['cursor_file'])
+
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    def _fetch_page(self, symbol: str, timeframe: str, since: int) -> list:
+        """拉取一页K线（限速 + 指数退避重试）"""
+        max_retries = self.params['max_retries']
+        for attempt in range(max_retries + 1):
+            self.limiter.acquire()
+            with self._count_lock:
+                self.request_count += 1
+            try:
+                return self.exchange.fetch_ohlcv(symbol, timeframe, since=since,
+                                                 limit=self.params['page_limit'])
+            except (ccxt.RateLimitExceeded, ccxt.DDoSProtection) as e:
+                if attempt == max_retries:
+                    raise
+                delay = 2 ** attempt * 5
+                logger.warning(f"⚠️  {symbol} {timeframe} 触发限流，全局暂停 {delay}s: {e}")
+                self.limiter.penalize(delay)
+            except ccxt.NetworkError as e:
+                if attempt == max_retries:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"⚠️  {symbol} {timeframe} 网络错误，{delay}s 后重试: {e}")
+                time.sleep(delay)
+
+    def backfill(self, symbol: str, timeframe: str, start_ms: int,
+                 end_ms: Optional[int] = None, reset: bool = False) -> Dict:
+        """
+        回填单个交易对×周期的 [start_ms, end_ms] 区间
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            start_ms: 开始时间（毫秒）
+            end_ms: 结束时间（毫秒），None表示到当前
+            reset: 忽略已保存的断点
+
+        Returns:
+            {'symbol', 'timeframe', 'bars', 'pages', 'seconds'}
+        """
+        started = time.perf_counter()
+        tf_ms = timeframe_to_ms(timeframe)
+        end_ms = end_ms or int(time.time() * 1000)
+        since = start_ms // tf_ms * tf_ms
+
+        # 从断点继续（断点对应的回填起点必须覆盖本次起点）
+        cursor = None if reset else self.cursors.get(symbol, timeframe)
+        if cursor and cursor['start'] <= since and not cursor.get('done'):
+            since = max(since, cursor['since'])
+            logger.info(f"↩️  {symbol} {timeframe} 从断点继续: {pd.Timestamp(since, unit='ms')}")
+
+        # 已缓存区间：游标进入时直接跳到缓存末尾
+        cached_first = cached_last = None
+        time_range = self.cache_manager.get_time_range(symbol, timeframe)
+        if time_range is not None:
+            cached_first, cached_last = (int(t.value // 1_000_000) for t in time_range)
+
+        pending: List[list] = []
+        pages = bars = 0
+
+        def flush(next_since: int, done: bool = False):
+            nonlocal pending
+            if pending:
+                self.cache_manager.merge_and_save(ohlcv_to_dataframe(pending), symbol, timeframe,
+                                                  return_data=False)
+                pending = []
+            self.cursors.set(symbol, timeframe, {
+                'start': start_ms // tf_ms * tf_ms, 'since': next_since, 'end': end_ms, 'done': done,
+            })
+
+        while since <= end_ms:
+            if cached_first is not None and cached_first <= since < cached_last:
+                # 缓存最后一根可能未收盘，从它开始重新拉取
+                since = cached_last
+
+            page = self._fetch_page(symbol, timeframe, since)
+            page = [bar for bar in page if since <= bar[0] <= end_ms]
+            if not page:
+                break
+
+            pending.extend(page)
+            pages += 1
+            bars += len(page)
+            since = page[-1][0] + tf_ms
+
+            if pages % self.params['flush_pages'] == 0:
+                flush(since)
+
+        flush(since, done=True)
+
+        result = {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'bars': bars,
+            'pages': pages,
+            'seconds': time.perf_counter() - started,
+        }
+        logger.info(f"✅ {symbol} {timeframe} 回填完成: {bars} 根K线, {pages} 页, {result['seconds']:.1f}s")
+        return result
+
+    def run(self, symbols: List[str], timeframes: List[str], start_ms: int,
+            end_ms: Optional[int] = None, reset: bool = False) -> List[Dict]:
+        """
+        并发回填多个交易对×周期
+
+        Returns:
+            每个任务的结果（失败的任务包含 'error'）
+        """
+        jobs = [(symbol, tf) for symbol in symbols for tf in timeframes]
+        results = []
+
+        # 由全局令牌桶限速，回填期间关闭 ccxt 的单实例限速（多线程下不可靠），结束后恢复
+        rate_limit = self.exchange.enableRateLimit
+        self.exchange.enableRateLimit = False
+        try:
+            with ThreadPoolExecutor(max_workers=self.params['max_workers']) as pool:
+                futures = {
+                    pool.submit(self.backfill, symbol, tf, start_ms, end_ms, reset): (symbol, tf)
+                    for symbol, tf in jobs
+                }
+                for future in as_completed(futures):
+                    symbol, tf = futures[future]
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.error(f"❌ {symbol} {tf} 回填失败（断点已保存，可重新运行继续）: {e}")
+                        results.append({'symbol': symbol, 'timeframe': tf, 'error': str(e)})
+        finally:
+            self.exchange.enableRateLimit = rate_limit
+
+        return results
+
+
+def main():
+    """主函数"""
+    import argparse
+    from data_collector import DataCollector
+    from config.strategy_params import TRADING_SYMBOLS
+
+    parser = argparse.ArgumentParser(description='深度历史数据回填')
+    parser.add_argument('--symbols', nargs='+', help='交易对，如 BTC/USDT ETH/USDT')
+    parser.add_argument('--all', action='store_true', help='回填 TRADING_SYMBOLS 中的所有交易对')
+    parser.add_argument('-t', '--timeframes', nargs='+', default=['15m'], help='时间周期，默认: 15m')
+    parser.add_argument('--days', type=int, default=365, help='回填天数，默认: 365')
+    parser.add_argument('--start', help='开始日期（优先于 --days），如 2024-01-01')
+    parser.add_argument('--workers', type=int, help='并发线程数')
+    parser.add_argument('--rps', type=float, help='全局每秒请求数')
+    parser.add_argument('--reset', action='store_true', help='忽略断点重新开始')
+    args = parser.parse_args()
+
+    symbols = TRADING_SYMBOLS if args.all else args.symbols
+    if not symbols:
+        print("❌ 请指定 --symbols 或使用 --all")
+        return
+
+    if args.start:
+        start_ms = int(pd.Timestamp(args.start).value // 1_000_000)
+    else:
+        start_ms = int((time.time() - args.days * 86400) * 1000)
+
+    params = {}
+    if args.workers:
+        params['max_workers'] = args.workers
+    if args.rps:
+        params['requests_per_second'] = args.rps
+
+    collector = DataCollector('binance')
+    backfiller = HistoryBackfiller(collector.exchange, params=params)
+
+    started = time.perf_counter()
+    results = backfiller.run(symbols, args.timeframes, start_ms, reset=args.reset)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{'='*80}")
+    print(f"📥 历史数据回填: {len(results)} 个任务, {backfiller.request_count} 次请求, {elapsed:.1f}s")
+    print(f"{'='*80}")
+    for r in sorted(results, key=lambda x: (x['symbol'], x['timeframe'])):
+        if 'error' in r:
+            print(f"  ❌ {r['symbol']:<16} {r['timeframe']:<5} {r['error']}")
+        else:
+            print(f"  ✅ {r['symbol']:<16} {r['timeframe']:<5} {r['bars']:>8} 根  {r['pages']:>4} 页  {r['seconds']:>6.1f}s")
+    print(f"{'='*80}\n")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
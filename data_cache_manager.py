@@ -9,39 +9,82 @@
 3. 支持数据更新（追加最新数据）
 4. 支持数据管理（查看、清理、导出）
 
-数据结构：
+数据结构（默认列式二进制存储，见 utils/cache_storage.py）：
 data/cache/
-  ├── BTC_USDT_1h.csv
-  ├── BTC_USDT_30m.csv
-  ├── ETH_USDT_1h.csv
-  └── ...
-
-每个文件包含：timestamp, open, high, low, close, volume
+  ├── BTC_USDT_1h/           # meta.json + 每列一个二进制文件
+  ├── BTC_USDT_30m/
+  ├── ETH_USDT_1h.csv        # 原CSV缓存（仍可读取，可用 migrate 转换）
+  ├── ...
+  ├── index/
+  │   └── BTC_USDT_1h.json   # 元数据索引（行数、时间范围、缺口、内容指纹，见 utils/cache_index.py）
+  ├── locks/
+  │   └── BTC_USDT_1h.lock   # 序列读写锁（见 utils/file_lock.py）
+  └── regimes/
+      └── BTC_USDT_1h.json   # 市场状态区间（由K线数据派生）
+
+每个序列包含：timestamp, open, high, low, close, volume
+
+并发访问：写入先写临时文件再原子替换；读取持有序列读锁、写入持有序列写锁，
+更新进程运行时多个回测进程可以同时读取缓存，不会读到写了一半的数据
 """
 
 import os
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict
 import logging
 
+from config.storage_params import CACHE_STORAGE_PARAMS
+from utils.cache_storage import CSVStorage, get_storage, benchmark_backends
+from utils.cache_index import CacheIndex, summarize, extend_summary
+from utils.file_lock import SeriesLocks
+from utils.regime_timeline import RegimeTimeline, regime_params_hash
+from utils.timeframes import timeframe_to_ms
+
 logger = logging.getLogger(__name__)
 
 
 class DataCacheManager:
     """本地数据缓存管理器"""
 
-    def __init__(self, cache_dir: str = 'data/cache'):
+    def __init__(self, cache_dir: str = CACHE_STORAGE_PARAMS['cache_dir'],
+                 backend: Optional[str] = None, compression: Optional[str] = None):
         """
         初始化缓存管理器
 
         Args:
             cache_dir: 缓存目录路径
+            backend: 存储后端（'columnar' / 'csv'），默认 CACHE_STORAGE_PARAMS
+            compression: 列式存储压缩方式（None / 'npz'），默认 CACHE_STORAGE_PARAMS
         """
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        logger.info(f"✅ 数据缓存目录: {self.cache_dir.absolute()}")
+
+        backend = backend or CACHE_STORAGE_PARAMS['backend']
+        if compression is None:
+            compression = CACHE_STORAGE_PARAMS.get('compression')
+        self.storage = get_storage(backend, compression)
+
+        # 新格式不存在时回退读取原CSV缓存
+        self.legacy_storage = None
+        if backend != 'csv' and CACHE_STORAGE_PARAMS.get('read_legacy_csv', True):
+            self.legacy_storage = CSVStorage()
+
+        # 元数据索引：统计、新鲜度检查不需要解析缓存文件
+        self.index = CacheIndex(self.cache_dir / 'index')
+
+        # 序列级读写锁：多进程同时读取/更新缓存
+        self.locks = SeriesLocks(self.cache_dir / 'locks', CACHE_STORAGE_PARAMS.get('lock_timeout'))
+
+        logger.info(f"✅ 数据缓存目录: {self.cache_dir.absolute()} (存储: {self.storage.name})")
+
+    @staticmethod
+    def _cache_key(symbol: str, timeframe: str) -> str:
+        # 将 BTC/USDT 转换为 BTC_USDT
+        safe_symbol = symbol.replace('/', '_')
+        return f"{safe_symbol}_{timeframe}"
 
     def _get_cache_path(self, symbol: str, timeframe: str) -> Path:
         """
@@ -52,12 +95,110 @@ class DataCacheManager:
             timeframe: 时间周期，如 '1h'
 
         Returns:
-            缓存文件路径
+            缓存文件路径（列式存储为目录）
         """
-        # 将 BTC/USDT 转换为 BTC_USDT
+        return self.storage.path(self.cache_dir, self._cache_key(symbol, timeframe))
+
+    def _get_legacy_path(self, symbol: str, timeframe: str) -> Optional[Path]:
+        """原CSV缓存路径（未启用回退时为None）"""
+        if self.legacy_storage is None:
+            return None
+        return self.legacy_storage.path(self.cache_dir, self._cache_key(symbol, timeframe))
+
+    def _get_regime_path(self, symbol: str, timeframe: str) -> Path:
+        """市场状态时间线文件路径（与K线缓存放在一起）"""
         safe_symbol = symbol.replace('/', '_')
-        filename = f"{safe_symbol}_{timeframe}.csv"
-        return self.cache_dir / filename
+        return self.cache_dir / 'regimes' / f"{safe_symbol}_{timeframe}.json"
+
+    def _locate(self, key: str) -> Optional[tuple]:
+        """缓存序列所在的存储：(存储后端, 路径)，新格式优先，不存在时为None"""
+        path = self.storage.path(self.cache_dir, key)
+        if self.storage.exists(path):
+            return self.storage, path
+        if self.legacy_storage is not None:
+            legacy_path = self.legacy_storage.path(self.cache_dir, key)
+            if self.legacy_storage.exists(legacy_path):
+                return self.legacy_storage, legacy_path
+        return None
+
+    # ==================== 元数据索引 ====================
+
+    def _index_series(self, key: str, df: pd.DataFrame, storage, path: Path) -> Dict:
+        """由完整数据重新生成索引条目"""
+        timeframe = key.rsplit('_', 1)[1]
+        previous = self.index.get(key) or {}
+        entry = {
+            **summarize(df, timeframe_to_ms(timeframe), previous.get('confirmed_gaps', [])),
+            'format': storage.name,
+            'signature': storage.signature(path),
+        }
+        self.index.put(key, entry)
+        return entry
+
+    def _fresh_entry(self, key: str, storage, path: Path) -> Optional[Dict]:
+        """与缓存文件一致的索引条目（缺失或文件被外部修改过时为None）"""
+        entry = self.index.get(key)
+        if entry is None or entry.get('format') != storage.name:
+            return None
+        if entry.get('signature') != storage.signature(path):
+            return None
+        return entry
+
+    def _series_info(self, key: str) -> Optional[Dict]:
+        located = self._locate(key)
+        if located is None:
+            return None
+        storage, path = located
+
+        entry = self._fresh_entry(key, storage, path)
+        if entry is not None:
+            return entry
+
+        try:
+            with self.locks.read(key):
+                # 可能正好在等待写入完成，写入方已经更新了索引
+                entry = self._fresh_entry(key, storage, path)
+                if entry is not None:
+                    return entry
+                logger.info(f"🔎 重建缓存索引: {key}")
+                return self._index_series(key, storage.load(path), storage, path)
+        except Exception as e:
+            logger.warning(f"⚠️  无法读取 {path.name}: {e}")
+            return None
+
+    def get_series_info(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        """
+        缓存序列的元数据（读取索引，索引缺失或过期时自动重建）
+
+        Returns:
+            {'rows', 'first', 'last', 'gaps', 'missing_bars', 'content_hash', 'format', ...}，
+            时间均为毫秒；缓存不存在时为None
+        """
+        return self._series_info(self._cache_key(symbol, timeframe))
+
+    def rebuild_index(self) -> Dict[str, list]:
+        """
+        由缓存数据重建所有索引条目，并核对原索引的内容指纹
+
+        Returns:
+            {'rebuilt': [序列名], 'mismatched': [原索引与数据不一致的序列名]}
+        """
+        result = {'rebuilt': [], 'mismatched': []}
+        for storage, key in self._iter_series():
+            path = storage.path(self.cache_dir, key)
+            try:
+                with self.locks.read(key):
+                    previous = self.index.get(key)
+                    entry = self._index_series(key, storage.load(path), storage, path)
+            except Exception as e:
+                logger.error(f"❌ 重建索引失败 {key}: {e}")
+                continue
+
+            result['rebuilt'].append(key)
+            if previous is not None and previous['content_hash'] != entry['content_hash']:
+                logger.warning(f"⚠️  索引与数据不一致（已修正）: {key}")
+                result['mismatched'].append(key)
+        return result
 
     def load_from_cache(self, symbol: str, timeframe: str) -> Optional[pd.DataFrame]:
         """
@@ -70,14 +211,16 @@ class DataCacheManager:
         Returns:
             DataFrame或None
         """
-        cache_path = self._get_cache_path(symbol, timeframe)
-
-        if not cache_path.exists():
-            logger.info(f"⚠️  缓存不存在: {cache_path.name}")
+        key = self._cache_key(symbol, timeframe)
+        located = self._locate(key)
+        if located is None:
+            logger.info(f"⚠️  缓存不存在: {self._get_cache_path(symbol, timeframe).name}")
             return None
+        storage, cache_path = located
 
         try:
-            df = pd.read_csv(cache_path, index_col=0, parse_dates=True)
+            with self.locks.read(key):
+                df = storage.load(cache_path)
             logger.info(f"✅ 从缓存加载: {cache_path.name}")
             logger.info(f"   数据范围: {df.index[0]} 至 {df.index[-1]}")
             logger.info(f"   数据条数: {len(df)}")
@@ -86,6 +229,45 @@ class DataCacheManager:
             logger.error(f"❌ 加载缓存失败: {e}")
             return None
 
+    def load_range(self, symbol: str, timeframe: str, start=None, end=None) -> Optional[pd.DataFrame]:
+        """
+        按时间范围加载缓存（结果与 df[(df.index >= start) & (df.index <= end)] 相同）
+
+        列式存储通过内存映射 + 二分查找只读取范围内的行，其他格式退化为完整加载后过滤
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            start: 开始时间（含），如 '2025-09-01'
+            end: 结束时间（含）
+
+        Returns:
+            DataFrame或None
+        """
+        cache_path = self._get_cache_path(symbol, timeframe)
+
+        if not (hasattr(self.storage, 'load_range') and self.storage.exists(cache_path)):
+            df = self.load_from_cache(symbol, timeframe)
+            if df is None:
+                return None
+            if start is not None:
+                df = df[df.index >= start]
+            if end is not None:
+                df = df[df.index <= end]
+            return df
+
+        start_ms = None if start is None else int(pd.Timestamp(start).value // 1_000_000)
+        end_ms = None if end is None else int(pd.Timestamp(end).value // 1_000_000)
+        try:
+            with self.locks.read(self._cache_key(symbol, timeframe)):
+                df = self.storage.load_range(cache_path, start_ms, end_ms)
+        except Exception as e:
+            logger.error(f"❌ 加载缓存失败: {e}")
+            return None
+
+        logger.info(f"✅ 从缓存加载: {cache_path.name} [{start or '开始'} ~ {end or '最新'}] {len(df)} 条")
+        return df
+
     def save_to_cache(self, df: pd.DataFrame, symbol: str, timeframe: str):
         """
         保存数据到缓存
@@ -96,27 +278,58 @@ class DataCacheManager:
             timeframe: 时间周期
         """
         cache_path = self._get_cache_path(symbol, timeframe)
+        key = self._cache_key(symbol, timeframe)
 
         try:
-            df.to_csv(cache_path)
+            with self.locks.write(key):
+                self.storage.save(df, cache_path)
+                self._index_series(key, df, self.storage, cache_path)
             logger.info(f"💾 保存到缓存: {cache_path.name}")
             logger.info(f"   数据范围: {df.index[0]} 至 {df.index[-1]}")
             logger.info(f"   数据条数: {len(df)}")
         except Exception as e:
             logger.error(f"❌ 保存缓存失败: {e}")
 
-    def merge_and_save(self, new_df: pd.DataFrame, symbol: str, timeframe: str) -> pd.DataFrame:
+    def merge_and_save(self, new_df: pd.DataFrame, symbol: str, timeframe: str,
+                       return_data: bool = True) -> Optional[pd.DataFrame]:
         """
         合并新旧数据并保存
 
+        新数据接在已有数据之后（或覆盖尾部正在形成的K线）时只写入尾部；
+        落在历史中间（修补缺口）时只重写新数据起点之后的部分；
+        早于已有数据（回填历史）或压缩存储时加载全部数据合并后整体重写
+
         Args:
             new_df: 新拉取的数据
             symbol: 交易对
             timeframe: 时间周期
+            return_data: 是否返回合并后的完整数据（批量更新时可关闭，避免重新读取）
 
         Returns:
-            合并后的完整数据
+            合并后的完整数据（return_data=False 时为None）
         """
+        # 读取-合并-写入期间持有写锁，两个更新进程不会互相覆盖
+        with self.locks.write(self._cache_key(symbol, timeframe)):
+            return self._merge_and_save(new_df, symbol, timeframe, return_data)
+
+    def _merge_and_save(self, new_df: pd.DataFrame, symbol: str, timeframe: str,
+                        return_data: bool) -> Optional[pd.DataFrame]:
+        new_df = new_df[~new_df.index.duplicated(keep='last')].sort_index()
+
+        # 增量写入：I/O 与新数据量成正比
+        cache_path = self._get_cache_path(symbol, timeframe)
+        if hasattr(self.storage, 'append') and self.storage.exists(cache_path):
+            key = self._cache_key(symbol, timeframe)
+            rows = self._append(new_df, key, cache_path)
+            if rows is not None:
+                logger.info(f"➕ 追加写入: {cache_path.name} 新数据 {len(new_df)} 条，总计 {rows} 条")
+                return self.load_from_cache(symbol, timeframe) if return_data else None
+
+            rows = self._merge_tail(new_df, key, cache_path)
+            if rows is not None:
+                logger.info(f"🩹 局部重写: {cache_path.name} 新数据 {len(new_df)} 条，总计 {rows} 条")
+                return self.load_from_cache(symbol, timeframe) if return_data else None
+
         # 加载现有缓存
         cached_df = self.load_from_cache(symbol, timeframe)
 
@@ -137,14 +350,186 @@ class DataCacheManager:
         # 保存
         self.save_to_cache(merged_df, symbol, timeframe)
 
-        logger.info(f"🔄 数据合并完成:")
+        logger.info(f"🔄 数据合并完成（整体重写）:")
         logger.info(f"   原有: {len(cached_df)} 条")
         logger.info(f"   新增: {len(new_df)} 条")
         logger.info(f"   总计: {len(merged_df)} 条")
 
-        return merged_df
+        return merged_df if return_data else None
+
+    def _merge_tail(self, new_df: pd.DataFrame, key: str, cache_path: Path) -> Optional[int]:
+        """
+        新数据与其起点之后的已有数据合并后作为尾部写入（早于已有数据时返回None）
+
+        合并后的尾部覆盖已提交的行（插入的K线使后面的行整体后移），
+        storage.append 对这种情况先写临时文件再原子替换，中途崩溃不会留下错位的数据
+        """
+        info = self._series_info(key)
+        first_ms = int(new_df.index[0].value // 1_000_000)
+        if info is None or info['rows'] == 0 or first_ms < info['first']:
+            return None
+
+        tail_df = self.storage.load_range(cache_path, first_ms, None)
+        merged_df = pd.concat([tail_df, new_df])
+        merged_df = merged_df[~merged_df.index.duplicated(keep='last')].sort_index()
+        return self._append(merged_df, key, cache_path, replaced_df=tail_df)
+
+    def _append(self, new_df: pd.DataFrame, key: str, cache_path: Path,
+                replaced_df: Optional[pd.DataFrame] = None) -> Optional[int]:
+        """
+        尾部追加并增量更新索引（索引缺失或过期时追加后整体重建）
+
+        replaced_df: 调用方已读取的被覆盖尾部（新数据起点之后的已有行），避免重复读取
+        """
+        entry = self._fresh_entry(key, self.storage, cache_path)
+        if entry is not None:
+            # 追加前记下被覆盖的尾部（只读取新数据起点之后的行）
+            first_ms = int(new_df.index[0].value // 1_000_000)
+            timestamps = self.storage.open_arrays(cache_path)['timestamp']
+            start = int(np.searchsorted(timestamps, first_ms, side='left'))
+            prev_ts = int(timestamps[start - 1]) if start > 0 else None
+            del timestamps
+            if replaced_df is None:
+                replaced_df = self.storage.load_range(cache_path, first_ms, None)
+
+        rows = self.storage.append(new_df, cache_path)
+        if rows is None:
+            return None
+
+        if entry is not None:
+            entry = extend_summary(entry, rows, prev_ts, replaced_df, new_df)
+            self.index.put(key, {**entry, 'signature': self.storage.signature(cache_path)})
+        else:
+            self._series_info(key)
+        return rows
+
+    def get_gaps(self, symbol: str, timeframe: str, start=None, end=None) -> pd.DataFrame:
+        """
+        缓存中的缺口（读取元数据索引）
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            start: 只返回与 [start, end] 有重叠的缺口
+            end: 结束时间
 
-    def update_latest(self, symbol: str, timeframe: str, data_collector) -> pd.DataFrame:
+        Returns:
+            before(缺口前一根K线), after(缺口后一根K线), missing_bars, confirmed(交易所确认无数据)
+        """
+        columns = ['before', 'after', 'missing_bars', 'confirmed']
+        info = self.get_series_info(symbol, timeframe)
+        if info is None or not info['gaps']:
+            return pd.DataFrame(columns=columns)
+
+        gaps = np.array(info['gaps'], dtype='int64')
+        confirmed = {tuple(gap) for gap in info.get('confirmed_gaps', [])}
+        df = pd.DataFrame({
+            'before': pd.to_datetime(gaps[:, 0], unit='ms'),
+            'after': pd.to_datetime(gaps[:, 1], unit='ms'),
+            'missing_bars': (gaps[:, 1] - gaps[:, 0]) // info['interval_ms'] - 1,
+            'confirmed': [tuple(gap) in confirmed for gap in info['gaps']],
+        })
+        if start is not None:
+            df = df[df['after'] > pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['before'] < pd.Timestamp(end)]
+        return df[columns]
+
+    def repair_gaps(self, symbol: str, timeframe: str, data_collector, force: bool = False) -> Dict:
+        """
+        只重新拉取缺口内的K线并补入缓存
+
+        交易所也没有数据的缺口（停机、下架期间）记为已确认，之后不再重复拉取；
+        拉取失败的缺口记录错误后跳过（不确认），下次修补时重试
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            data_collector: DataCollector实例
+            force: 已确认的缺口也重新拉取
+
+        Returns:
+            {'gaps': 尝试修补的缺口数, 'filled_bars': 补入K线数, 'remaining': 剩余缺口数,
+             'confirmed': 已确认缺口数, 'errors': 拉取失败的缺口数}
+        """
+        key = self._cache_key(symbol, timeframe)
+        info = self.get_series_info(symbol, timeframe)
+        if info is None:
+            logger.warning(f"⚠️  缓存不存在: {key}")
+            return {'gaps': 0, 'filled_bars': 0, 'remaining': 0, 'confirmed': 0, 'errors': 0}
+
+        interval_ms = info['interval_ms']
+        confirmed = {tuple(gap) for gap in info.get('confirmed_gaps', [])}
+        targets = [gap for gap in info['gaps'] if force or tuple(gap) not in confirmed]
+
+        fetched = []
+        failed = []
+        for before, after in targets:
+            since = before + interval_ms
+            try:
+                while since < after:
+                    missing = (after - since) // interval_ms
+                    df = data_collector.fetch_ohlcv(symbol, timeframe, limit=min(missing, 1000), since=since)
+                    df = df[(df['timestamp'] >= since) & (df['timestamp'] < after)]
+                    if df.empty:
+                        break
+                    fetched.append(df)
+                    since = int(df['timestamp'].iloc[-1]) + interval_ms
+            except Exception as e:
+                failed.append((before, after))
+                logger.error(f"❌ {key} 缺口 {pd.Timestamp(before, unit='ms')} → "
+                             f"{pd.Timestamp(after, unit='ms')} 拉取失败，跳过: {e}")
+
+        filled_bars = 0
+        with self.locks.write(key):
+            if fetched:
+                patch = pd.concat(fetched)
+                filled_bars = len(patch)
+                self.merge_and_save(patch, symbol, timeframe, return_data=False)
+
+            # 修补后仍在原缺口范围内的缺口：交易所确认没有数据（拉取失败的缺口不确认）
+            checked = [(b, a) for b, a in targets if (b, a) not in failed]
+            entry = self.get_series_info(symbol, timeframe)
+            in_target = [gap for gap in entry['gaps']
+                         if tuple(gap) in confirmed or any(b <= gap[0] and gap[1] <= a for b, a in checked)]
+            entry['confirmed_gaps'] = in_target
+            self.index.put(key, entry)
+
+        result = {
+            'gaps': len(targets),
+            'filled_bars': filled_bars,
+            'remaining': len(entry['gaps']),
+            'confirmed': len(in_target),
+            'errors': len(failed),
+        }
+        logger.info(f"🩹 {key} 缺口修补: 尝试 {result['gaps']} 个, 补入 {filled_bars} 根K线, "
+                    f"剩余 {result['remaining']} 个（已确认 {result['confirmed']} 个, 失败 {result['errors']} 个）")
+        return result
+
+    def get_last_time(self, symbol: str, timeframe: str) -> Optional[pd.Timestamp]:
+        """
+        最后一根缓存K线的时间（读取元数据索引）
+
+        Returns:
+            UTC时间（无时区），缓存不存在时为None
+        """
+        time_range = self.get_time_range(symbol, timeframe)
+        return None if time_range is None else time_range[1]
+
+    def get_time_range(self, symbol: str, timeframe: str) -> Optional[tuple]:
+        """
+        缓存的时间范围（读取元数据索引）
+
+        Returns:
+            (第一根K线时间, 最后一根K线时间)，缓存不存在或为空时为None
+        """
+        info = self.get_series_info(symbol, timeframe)
+        if info is None or info['rows'] == 0:
+            return None
+        return pd.Timestamp(info['first'], unit='ms'), pd.Timestamp(info['last'], unit='ms')
+
+    def update_latest(self, symbol: str, timeframe: str, data_collector,
+                      return_data: bool = True) -> Optional[pd.DataFrame]:
         """
         更新最新数据
 
@@ -152,22 +537,22 @@ class DataCacheManager:
             symbol: 交易对
             timeframe: 时间周期
             data_collector: DataCollector实例
+            return_data: 是否返回更新后的完整数据
 
         Returns:
-            更新后的完整数据
+            更新后的完整数据（return_data=False 时为None）
         """
-        cached_df = self.load_from_cache(symbol, timeframe)
+        last_time = self.get_last_time(symbol, timeframe)
 
-        if cached_df is None:
+        if last_time is None:
             # 没有缓存，拉取完整数据
             logger.info("📥 首次拉取，获取完整历史数据...")
             new_df = data_collector.fetch_ohlcv(symbol, timeframe, limit=1000)
             self.save_to_cache(new_df, symbol, timeframe)
-            return new_df
+            return new_df if return_data else None
 
-        # 计算需要更新的数据量
-        last_time = cached_df.index[-1]
-        now = pd.Timestamp.now(tz='UTC')
+        # 计算需要更新的数据量（缓存时间为无时区的UTC时间）
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
         time_diff = now - last_time
 
         # 根据时间周期计算需要拉取的K线数量
@@ -180,15 +565,97 @@ class DataCacheManager:
 
         if bars_needed <= 0:
             logger.info("✅ 数据已是最新，无需更新")
-            return cached_df
+            return self.load_from_cache(symbol, timeframe) if return_data else None
 
         logger.info(f"📥 更新最新数据，预计需要 {bars_needed} 根K线...")
         new_df = data_collector.fetch_ohlcv(symbol, timeframe, limit=min(bars_needed, 1000))
 
         # 合并并保存
-        merged_df = self.merge_and_save(new_df, symbol, timeframe)
+        merged_df = self.merge_and_save(new_df, symbol, timeframe, return_data)
         return merged_df
 
+    def update_many(self, symbols, timeframes, max_pages: int = 50, **collector_kwargs) -> Dict[str, int]:
+        """
+        并发更新多个交易对×周期（AsyncDataCollector 共享连接池，总耗时约为一次请求的延迟）
+
+        已缓存的序列从最后一根K线开始向后分页拉取到最新（不会在缓存末尾与新数据之间留下缺口），
+        未缓存的序列拉取最近1000根
+
+        Args:
+            symbols: 交易对列表
+            timeframes: 时间周期列表
+            max_pages: 已缓存序列最多拉取的页数（每页1000根），仍未追上最新K线的序列计入 partial
+            **collector_kwargs: 传给 AsyncDataCollector（如 base_url, max_concurrency, proxy）
+
+        Returns:
+            {'updated': 已更新到最新, 'partial': 已更新但仍落后, 'failed': 失败数}
+        """
+        from async_data_collector import fetch_many_sync
+
+        since = {}
+        for symbol in symbols:
+            for tf in timeframes:
+                last_time = self.get_last_time(symbol, tf)
+                since[(symbol, tf)] = None if last_time is None else int(last_time.value // 1_000_000)
+
+        frames = fetch_many_sync(symbols, timeframes, limit=1000, since=since,
+                                 max_pages=max_pages, **collector_kwargs)
+
+        now_ms = int(pd.Timestamp.now(tz='UTC').value // 1_000_000)
+        counts = {'updated': 0, 'partial': 0, 'failed': len(since) - len(frames)}
+        for (symbol, tf), new_df in frames.items():
+            if not new_df.empty:
+                self.merge_and_save(new_df, symbol, tf, return_data=False)
+
+            # 最新K线（未收盘）距现在不超过一个周期才算追上
+            last_time = self.get_last_time(symbol, tf)
+            last_ms = None if last_time is None else int(last_time.value // 1_000_000)
+            if last_ms is None or now_ms - last_ms > 2 * timeframe_to_ms(tf):
+                counts['partial'] += 1
+                logger.warning(f"⚠️  {symbol} {tf} 拉取 {len(new_df)} 根后仍未追上最新K线")
+            else:
+                counts['updated'] += 1
+
+        return counts
+
+    def load_regime_timeline(self, symbol: str, timeframe: str,
+                             params: Optional[Dict] = None) -> Optional[RegimeTimeline]:
+        """
+        加载市场状态时间线（不存在、参数变化或K线数据已更新时重新生成并保存）
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            params: 状态识别参数，默认 MARKET_REGIME_PARAMS
+
+        Returns:
+            RegimeTimeline，K线缓存不存在时返回None
+        """
+        if params is None:
+            from config.strategy_params import MARKET_REGIME_PARAMS
+            params = MARKET_REGIME_PARAMS
+
+        last_time = self.get_last_time(symbol, timeframe)
+        if last_time is None:
+            return None
+
+        regime_path = self._get_regime_path(symbol, timeframe)
+        data_end = int(last_time.value // 1_000_000)
+
+        if regime_path.exists():
+            try:
+                timeline = RegimeTimeline.load(regime_path)
+                if timeline.params_hash == regime_params_hash(params) and timeline.data_end == data_end:
+                    return timeline
+            except Exception as e:
+                logger.warning(f"⚠️  市场状态时间线损坏，重新生成: {e}")
+
+        df = self.load_from_cache(symbol, timeframe)
+        timeline = RegimeTimeline.build(df, params)
+        timeline.save(regime_path)
+        logger.info(f"💾 市场状态时间线: {regime_path.name} ({len(timeline)} 个区间)")
+        return timeline
+
     def get_stats(self) -> dict:
         """
         获取缓存统计信息
@@ -202,26 +669,94 @@ class DataCacheManager:
             'files': []
         }
 
-        for cache_file in self.cache_dir.glob('*.csv'):
+        for storage, key in self._iter_series():
+            cache_file = storage.path(self.cache_dir, key)
+            info = self._series_info(key)
+            if info is None or info['rows'] == 0:
+                continue
+
+            # 索引签名的第一项即文件大小
+            size_mb = info['signature'][0] / (1024 * 1024)
+            start = pd.Timestamp(info['first'], unit='ms')
+            end = pd.Timestamp(info['last'], unit='ms')
+
+            stats['files'].append({
+                'name': cache_file.name,
+                'format': info['format'],
+                'rows': info['rows'],
+                'size_mb': size_mb,
+                'start': start,
+                'end': end,
+                'days': (end - start).days,
+                'gaps': len(info['gaps']),
+                'missing_bars': info['missing_bars'],
+            })
+
+            stats['total_files'] += 1
+            stats['total_size_mb'] += size_mb
+
+        return stats
+
+    def _iter_series(self):
+        """遍历所有缓存序列：(存储后端, 序列名)，同名时新格式优先"""
+        keys = set(self.storage.list_keys(self.cache_dir))
+        for key in sorted(keys):
+            yield self.storage, key
+        if self.legacy_storage is not None:
+            for key in self.legacy_storage.list_keys(self.cache_dir):
+                if key not in keys:
+                    yield self.legacy_storage, key
+
+    def migrate(self, remove_csv: bool = False) -> Dict[str, int]:
+        """
+        把原CSV缓存一次性转换为当前存储格式
+
+        Args:
+            remove_csv: 转换并校验成功后删除原CSV文件
+
+        Returns:
+            {'migrated': 数量, 'skipped': 数量, 'failed': 数量}
+        """
+        counts = {'migrated': 0, 'skipped': 0, 'failed': 0}
+        if self.storage.name == 'csv':
+            logger.warning("⚠️  当前存储后端为CSV，无需转换")
+            return counts
+
+        legacy = CSVStorage()
+        for key in legacy.list_keys(self.cache_dir):
+            csv_path = legacy.path(self.cache_dir, key)
+            new_path = self.storage.path(self.cache_dir, key)
+
+            if self.storage.exists(new_path):
+                logger.info(f"⏭️  已存在新格式，跳过: {key}")
+                counts['skipped'] += 1
+                continue
+
             try:
-                df = pd.read_csv(cache_file, index_col=0, parse_dates=True)
-                size_mb = cache_file.stat().st_size / (1024 * 1024)
-
-                stats['files'].append({
-                    'name': cache_file.name,
-                    'rows': len(df),
-                    'size_mb': size_mb,
-                    'start': df.index[0],
-                    'end': df.index[-1],
-                    'days': (df.index[-1] - df.index[0]).days
-                })
-
-                stats['total_files'] += 1
-                stats['total_size_mb'] += size_mb
+                with self.locks.write(key):
+                    df = legacy.load(csv_path)
+                    self.storage.save(df, new_path)
+
+                    # 校验：重新读取后与原数据完全一致
+                    reloaded = self.storage.load(new_path)
+                    if 'timestamp' not in df.columns:
+                        reloaded = reloaded.drop(columns='timestamp')
+                    pd.testing.assert_frame_equal(reloaded, df, check_freq=False, check_index_type=False)
+                    self._index_series(key, df, self.storage, new_path)
+
+                logger.info(f"✅ 已转换: {key} ({len(df)} 条, "
+                            f"{legacy.size_bytes(csv_path) / 1024:.0f} KB → "
+                            f"{self.storage.size_bytes(new_path) / 1024:.0f} KB)")
+
+                if remove_csv:
+                    legacy.delete(csv_path)
+                counts['migrated'] += 1
             except Exception as e:
-                logger.warning(f"⚠️  无法读取 {cache_file.name}: {e}")
+                self.storage.delete(new_path)
+                counts['failed'] += 1
+                logger.error(f"❌ 转换失败 {key}: {e}")
 
-        return stats
+        return counts
 
     def print_stats(self):
         """打印缓存统计"""
@@ -236,12 +771,14 @@ class DataCacheManager:
         print()
 
         if stats['files']:
-            print(f"{'文件名':<25} {'数据条数':<10} {'天数':<8} {'大小':<10} {'时间范围'}")
+            print(f"{'文件名':<25} {'格式':<9} {'数据条数':<10} {'天数':<8} {'缺口':<8} {'大小':<10} {'时间范围'}")
             print(f"{'-'*80}")
             for file_info in sorted(stats['files'], key=lambda x: x['name']):
                 print(f"{file_info['name']:<25} "
+                      f"{file_info['format']:<9} "
                       f"{file_info['rows']:<10} "
                       f"{file_info['days']:<8} "
+                      f"{file_info['gaps']:<8} "
                       f"{file_info['size_mb']:.2f} MB   "
                       f"{file_info['start']} ~ {file_info['end']}")
         else:
@@ -260,31 +797,118 @@ class DataCacheManager:
         if symbol and timeframe:
             # 清理特定文件
             cache_path = self._get_cache_path(symbol, timeframe)
-            if cache_path.exists():
-                cache_path.unlink()
-                logger.info(f"🗑️  已删除: {cache_path.name}")
-            else:
-                logger.warning(f"⚠️  文件不存在: {cache_path.name}")
+            legacy_path = self._get_legacy_path(symbol, timeframe)
+            key = self._cache_key(symbol, timeframe)
+            with self.locks.write(key):
+                if self.storage.exists(cache_path):
+                    self.storage.delete(cache_path)
+                    logger.info(f"🗑️  已删除: {cache_path.name}")
+                elif legacy_path is None or not legacy_path.exists():
+                    logger.warning(f"⚠️  文件不存在: {cache_path.name}")
+                if legacy_path is not None and legacy_path.exists():
+                    self.legacy_storage.delete(legacy_path)
+                    logger.info(f"🗑️  已删除: {legacy_path.name}")
+                self._get_regime_path(symbol, timeframe).unlink(missing_ok=True)
+                self.index.delete(key)
         else:
             # 清理所有文件
             count = 0
-            for cache_file in self.cache_dir.glob('*.csv'):
-                cache_file.unlink()
-                count += 1
+            for storage in (self.storage, self.legacy_storage):
+                if storage is None:
+                    continue
+                for key in storage.list_keys(self.cache_dir):
+                    with self.locks.write(key):
+                        storage.delete(storage.path(self.cache_dir, key))
+                    count += 1
+            for regime_file in (self.cache_dir / 'regimes').glob('*.json'):
+                regime_file.unlink()
+            self.index.clear()
             logger.info(f"🗑️  已清理 {count} 个缓存文件")
 
 
 # ==================== 命令行工具 ====================
+def print_regime_report(manager: DataCacheManager, symbol: str, timeframe: str,
+                        regime: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None):
+    """打印市场状态分布、分状态收益和区间列表"""
+    timeline = manager.load_regime_timeline(symbol, timeframe)
+    if timeline is None:
+        print(f"❌ 缓存不存在，请先运行: python3 data_cache_manager.py update --symbol {symbol} --timeframe {timeframe}")
+        return
+
+    df = manager.load_from_cache(symbol, timeframe)
+    if start:
+        df = df[df.index >= start]
+    if end:
+        df = df[df.index <= end]
+
+    print(f"\n{'='*80}")
+    print(f"📈 市场状态时间线: {symbol} @ {timeframe}")
+    print(f"{'='*80}")
+    print(f"{'状态':<14} {'区间数':>6} {'K线数':>7} {'占比':>7} {'平均持续':>8} {'平均收益':>9} {'波动':>7} {'累计收益':>9}")
+    print(f"{'-'*80}")
+    summary = timeline.summary().join(timeline.return_stats(df)[['mean_return_pct', 'volatility_pct', 'total_return_pct']])
+    for name, row in summary.iterrows():
+        print(f"{name:<14} {int(row['segments']):>6} {int(row['bars']):>7} {row['pct']:>6.1f}% {row['avg_bars']:>8.1f} "
+              f"{row['mean_return_pct']:>8.3f}% {row['volatility_pct']:>6.2f}% {row['total_return_pct']:>8.2f}%")
+
+    segments = timeline.query(start, end, regime)
+    print(f"\n区间列表 ({len(segments)} 个，最近20个):")
+    for _, seg in segments.tail(20).iterrows():
+        print(f"  {seg['start']} ~ {seg['end']}  {seg['regime']:<14} {seg['bars']:>4} 根")
+    print(f"{'='*80}\n")
+
+
+def run_storage_benchmark(manager: DataCacheManager, symbol: Optional[str] = None,
+                          timeframe: Optional[str] = None, rows: int = 200000):
+    """对比 CSV / 列式 / 列式+压缩 的读写耗时和体积"""
+    import tempfile
+
+    df = manager.load_from_cache(symbol, timeframe) if symbol and timeframe else None
+    if df is None:
+        # 模拟15m数据
+        index = pd.date_range('2020-01-01', periods=rows, freq='15min', name='datetime')
+        close = 30000 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.002, rows)))
+        df = pd.DataFrame({
+            'timestamp': index.values.astype('datetime64[ms]').astype('int64'),
+            'open': close, 'high': close * 1.002, 'low': close * 0.998, 'close': close,
+            'volume': np.random.default_rng(1).lognormal(5, 1, rows),
+        }, index=index)
+        label = f"模拟数据 {rows} 行"
+    else:
+        label = f"{symbol} @ {timeframe} ({len(df)} 行)"
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = benchmark_backends(df, Path(work_dir))
+
+    print(f"\n{'='*80}")
+    print(f"⏱️  存储格式对比: {label}")
+    print(f"{'='*80}")
+    print(f"{'格式':<15} {'写入':>10} {'读取':>10} {'大小':>10}")
+    print(f"{'-'*80}")
+    for r in results:
+        print(f"{r['backend']:<15} {r['save_ms']:>8.1f}ms {r['load_ms']:>8.1f}ms {r['size_mb']:>7.2f} MB")
+    print(f"{'='*80}\n")
+
+
 def main():
     """主函数：缓存管理工具"""
     import argparse
 
     parser = argparse.ArgumentParser(description='数据缓存管理工具')
-    parser.add_argument('action', choices=['stats', 'update', 'clear'],
-                        help='操作：stats(统计), update(更新), clear(清理)')
+    parser.add_argument('action', choices=['stats', 'update', 'clear', 'regimes', 'migrate', 'benchmark', 'reindex',
+                                           'repair'],
+                        help='操作：stats(统计), update(更新), clear(清理), regimes(市场状态时间线), '
+                             'migrate(CSV转换为列式存储), benchmark(存储格式读写对比), '
+                             'reindex(重建并核对元数据索引), repair(修补缺失K线)')
     parser.add_argument('--symbol', help='交易对，如 BTC/USDT')
     parser.add_argument('--timeframe', '-t', help='时间周期，如 1h')
     parser.add_argument('--all', action='store_true', help='更新所有交易对')
+    parser.add_argument('--regime', help='regimes: 只列出某个状态的区间，如 SQUEEZE')
+    parser.add_argument('--start', help='regimes: 开始时间，如 2025-09-01')
+    parser.add_argument('--end', help='regimes: 结束时间')
+    parser.add_argument('--remove-csv', action='store_true', help='migrate: 转换成功后删除原CSV')
+    parser.add_argument('--rows', type=int, default=200000, help='benchmark: 未指定交易对时的模拟数据行数')
+    parser.add_argument('--force', action='store_true', help='repair: 已确认无数据的缺口也重新拉取')
 
     args = parser.parse_args()
 
@@ -299,21 +923,75 @@ def main():
         from data_collector import DataCollector
         from config.strategy_params import TRADING_SYMBOLS
 
-        collector = DataCollector('binance')
-
         if args.all:
-            # 更新所有交易对
+            # 更新所有交易对（并发请求）
             timeframes = ['1h', '30m', '15m']
-            for symbol in TRADING_SYMBOLS:
-                for tf in timeframes:
-                    print(f"\n更新 {symbol} @ {tf}...")
-                    manager.update_latest(symbol, tf, collector)
+            counts = manager.update_many(TRADING_SYMBOLS, timeframes)
+            print(f"\n更新完成: 成功 {counts['updated']}, 未追上最新 {counts['partial']}, 失败 {counts['failed']}")
         elif args.symbol and args.timeframe:
             # 更新指定交易对
-            manager.update_latest(args.symbol, args.timeframe, collector)
+            collector = DataCollector('binance')
+            manager.update_latest(args.symbol, args.timeframe, collector, return_data=False)
         else:
             print("❌ 请指定 --symbol 和 --timeframe，或使用 --all")
 
+    elif args.action == 'regimes':
+        # 市场状态时间线
+        if not (args.symbol and args.timeframe):
+            print("❌ 请指定 --symbol 和 --timeframe")
+            return
+        print_regime_report(manager, args.symbol, args.timeframe, args.regime, args.start, args.end)
+
+    elif args.action == 'migrate':
+        # CSV → 列式存储
+        counts = manager.migrate(remove_csv=args.remove_csv)
+        print(f"\n转换完成: 成功 {counts['migrated']}, 跳过 {counts['skipped']}, 失败 {counts['failed']}")
+
+    elif args.action == 'benchmark':
+        # 存储格式读写对比
+        run_storage_benchmark(manager, args.symbol, args.timeframe, args.rows)
+
+    elif args.action == 'repair':
+        # 修补缺失K线（只拉取缺口部分）
+        from data_collector import DataCollector
+
+        if args.all:
+            series = [key.rsplit('_', 1) for _, key in manager._iter_series()]
+            series = [(key.replace('_', '/'), tf) for key, tf in series]
+        elif args.symbol and args.timeframe:
+            series = [(args.symbol, args.timeframe)]
+        else:
+            print("❌ 请指定 --symbol 和 --timeframe，或使用 --all")
+            return
+
+        collector = None
+        for symbol, tf in series:
+            gaps = manager.get_gaps(symbol, tf)
+            pending = gaps if args.force else gaps[~gaps['confirmed']]
+            if pending.empty:
+                print(f"✅ {symbol} @ {tf} 无待修补缺口（已确认 {len(gaps)} 个）")
+                continue
+
+            print(f"\n🩹 {symbol} @ {tf}: {len(pending)} 个缺口, 共缺 {int(pending['missing_bars'].sum())} 根K线")
+            for _, gap in pending.head(10).iterrows():
+                print(f"   {gap['before']} → {gap['after']}  缺 {gap['missing_bars']} 根")
+            collector = collector or DataCollector('binance')
+            try:
+                result = manager.repair_gaps(symbol, tf, collector, force=args.force)
+            except Exception as e:
+                print(f"   ❌ 修补失败，跳过: {e}")
+                continue
+            print(f"   补入 {result['filled_bars']} 根, 剩余缺口 {result['remaining']} 个（交易所无数据 {result['confirmed']} 个）")
+            if result['errors']:
+                print(f"   ⚠️  {result['errors']} 个缺口拉取失败，下次运行 repair 重试")
+
+    elif args.action == 'reindex':
+        # 重建元数据索引
+        result = manager.rebuild_index()
+        print(f"\n索引重建完成: {len(result['rebuilt'])} 个序列, 不一致 {len(result['mismatched'])} 个")
+        for key in result['mismatched']:
+            print(f"  ⚠️  {key}")
+
     elif args.action == 'clear':
         # 清理缓存
         if args.symbol and args.timeframe:
@@ -9,9 +9,34 @@ from datetime import datetime, timedelta
 from typing import Optional, List
 import logging
 
+from utils.market_cache import get_market_cache
+from utils.http_replay import get_http_session
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def ohlcv_to_dataframe(ohlcv: list) -> pd.DataFrame:
+    """
+    交易所原始K线列表转换为DataFrame
+
+    Args:
+        ohlcv: [[timestamp, open, high, low, close, volume], ...]
+
+    Returns:
+        datetime索引 + timestamp/open/high/low/close/volume 列
+    """
+    df = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+
+    # 转换时间戳为datetime
+    df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
+
+    # 设置索引
+    df.set_index('datetime', inplace=True)
+    return df
+
 
 class DataCollector:
     """数据采集器 - 获取历史K线数据"""
@@ -20,15 +45,19 @@ class DataCollector:
         self,
         exchange_name: str = 'binance',
         proxy: Optional[str] = None,
-        market_type: str = 'spot'
+        market_type: str = 'spot',
+        reload_markets: bool = False
     ):
         """
         初始化数据采集器
 
+        市场信息优先从磁盘缓存加载（见 utils/market_cache.py），过期时才请求交易所
+
         Args:
             exchange_name: 交易所名称，默认 binance
             proxy: 代理地址，如 'http://127.0.0.1:7890'
             market_type: 市场类型，'spot' (现货) 或 'future' (合约)，默认 spot
+            reload_markets: 忽略缓存，重新加载市场信息
         """
         self.exchange_name = exchange_name
         self.market_type = market_type
@@ -37,6 +66,7 @@ class DataCollector:
             'enableRateLimit': True,
             'options': {'defaultType': market_type},  # 现货或合约市场
             'timeout': 30000,  # 30秒超时
+            'session': get_http_session(),  # 支持HTTP录制/回放（utils/http_replay.py）
         }
 
         # 如果提供代理，配置代理
@@ -47,19 +77,44 @@ class DataCollector:
             }
             logger.info(f"🔗 使用代理: {proxy}")
 
+        self._config = config
+        self._cached_hostname = False   # 是否直接使用了缓存中的域名（未测试连接）
+
+        # 缓存有效：直接使用上次连接成功的域名，不再测试连接
+        market_cache = get_market_cache()
+        cached = None if reload_markets else market_cache.load(exchange_name, market_type)
+        if cached is not None:
+            if cached.get('hostname'):
+                config['hostname'] = cached['hostname']
+            self.exchange = getattr(ccxt, exchange_name)(config)
+            market_cache.load_markets(self.exchange, exchange_name, market_type)
+            self._cached_hostname = exchange_name == 'binance'
+            logger.info(f"✅ 初始化 {exchange_name} 数据采集器 (市场信息来自缓存)")
+            return
+
+        self._connect()
+
+    def _connect(self):
+        """依次测试交易所域名，连接成功后重新加载市场信息并写入缓存"""
+        config = self._config
+        exchange_name = self.exchange_name
+        market_cache = get_market_cache()
+
         # 尝试多个币安域名
         if exchange_name == 'binance':
             # 币安有多个备用域名
             for i in range(1, 5):
                 try:
                     if i == 1:
+                        config.pop('hostname', None)
                         self.exchange = ccxt.binance(config)
                     else:
                         config['hostname'] = f'api{i}.binance.com'
                         self.exchange = ccxt.binance(config)
 
-                    # 测试连接
-                    self.exchange.load_markets()
+                    # 测试连接（同时写入市场信息缓存）
+                    market_cache.load_markets(self.exchange, exchange_name, self.market_type,
+                                              hostname=config.get('hostname'), reload=True)
                     logger.info(f"✅ 初始化 {exchange_name} 数据采集器 (域名: {config.get('hostname', 'api.binance.com')})")
                     return
                 except Exception as e:
@@ -73,6 +128,22 @@ class DataCollector:
             self.exchange = getattr(ccxt, exchange_name)(config)
             logger.info(f"✅ 初始化 {exchange_name} 数据采集器")
 
+    def _request(self, method: str, **kwargs):
+        """
+        调用交易所接口
+
+        使用缓存域名时没有测试过连接：遇到网络错误重新测试备用域名（刷新市场信息缓存）后重试一次
+        """
+        try:
+            return getattr(self.exchange, method)(**kwargs)
+        except ccxt.NetworkError as e:
+            if not self._cached_hostname:
+                raise
+            self._cached_hostname = False
+            logger.warning(f"⚠️  缓存的域名 {self._config.get('hostname', 'api.binance.com')} 请求失败，重新测试备用域名: {e}")
+            self._connect()
+            return getattr(self.exchange, method)(**kwargs)
+
     def fetch_ohlcv(
         self,
         symbol: str,
@@ -96,7 +167,8 @@ class DataCollector:
             logger.info(f"📥 获取 {symbol} {timeframe} 数据，共 {limit} 条")
 
             # 获取K线数据
-            ohlcv = self.exchange.fetch_ohlcv(
+            ohlcv = self._request(
+                'fetch_ohlcv',
                 symbol=symbol,
                 timeframe=timeframe,
                 limit=limit,
@@ -104,19 +176,11 @@ class DataCollector:
             )
 
             # 转换为DataFrame
-            df = pd.DataFrame(
-                ohlcv,
-                columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
-            )
-
-            # 转换时间戳为datetime
-            df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-
-            # 设置索引
-            df.set_index('datetime', inplace=True)
+            df = ohlcv_to_dataframe(ohlcv)
 
             logger.info(f"✅ 成功获取 {len(df)} 条数据")
-            logger.info(f"📅 时间范围: {df.index[0]} 至 {df.index[-1]}")
+            if not df.empty:
+                logger.info(f"📅 时间范围: {df.index[0]} 至 {df.index[-1]}")
 
             return df
 
@@ -193,7 +257,7 @@ class DataCollector:
             当前价格
         """
         try:
-            ticker = self.exchange.fetch_ticker(symbol)
+            ticker = self._request('fetch_ticker', symbol=symbol)
             return ticker['last']
         except Exception as e:
             logger.error(f"❌ 获取价格失败: {e}")
@@ -90,27 +90,26 @@ class FastBacktest:
         logger.info(f"🚀 快速回测: {symbol} {timeframe}")
         logger.info(f"{'='*80}")
 
-        # 1. 从缓存加载数据
-        df = self.cache_manager.load_from_cache(symbol, timeframe)
+        # 1. 从缓存加载数据（只读取日期范围内的K线）
+        df = self.cache_manager.load_range(symbol, timeframe, start_date, end_date)
 
         if df is None:
             logger.error(f"❌ 缓存不存在，请先运行数据更新:")
             logger.error(f"   python3 data_cache_manager.py update --symbol {symbol} --timeframe {timeframe}")
             return None
 
-        # 2. 过滤日期范围
-        if start_date:
-            df = df[df.index >= start_date]
-        if end_date:
-            df = df[df.index <= end_date]
-
         logger.info(f"数据范围: {df.index[0]} ~ {df.index[-1]}")
         logger.info(f"数据条数: {len(df)}")
 
-        # 3. 重置状态
+        gaps = self.cache_manager.get_gaps(symbol, timeframe, start_date, end_date)
+        if not gaps.empty:
+            logger.warning(f"⚠️  数据中有 {len(gaps)} 个缺口（共缺 {int(gaps['missing_bars'].sum())} 根K线），指标可能失真，可运行修补:")
+            logger.warning(f"   python3 data_cache_manager.py repair --symbol {symbol} --timeframe {timeframe}")
+
+        # 2. 重置状态
         self.reset()
 
-        # 4. 逐根K线回测
+        # 3. 逐根K线回测
         logger.info(f"\n{'='*80}")
         logger.info(f"📊 开始快速回测...")
         logger.info(f"{'='*80}\n")
@@ -123,36 +122,48 @@ class FastBacktest:
             # 生成信号
             signal = self.strategy_engine.generate_signal(current_df, symbol)
 
-            # 检查止损止盈
-            self._check_exit_conditions(current_time, current_price, signal)
+            self._process_bar(current_time, current_price, signal)
+
+        # 4. 强制平仓 + 计算结果
+        results = self._finish(df)
 
-            # 处理信号
-            if signal['action'] == 'BUY' and self.position == 0:
-                self._execute_buy(current_time, current_price, signal)
-            elif signal['action'] == 'SELL' and self.position > 0:
-                self._execute_sell(current_time, current_price, signal)
+        # 按开仓时的市场状态统计交易
+        timeline = self.cache_manager.load_regime_timeline(symbol, timeframe)
+        if timeline is not None:
+            results['regime_trades'] = timeline.trade_stats(self.trades)
 
-            # 记录权益
-            equity = self._calculate_equity(current_price)
-            self.equity_curve.append({
-                'timestamp': current_time,
-                'equity': equity,
-                'price': current_price
-            })
+        # 5. 打印结果
+        self._print_results(results)
+
+        return results
 
-        # 5. 强制平仓
+    def _process_bar(self, current_time, current_price: float, signal: Dict):
+        """处理单根K线：止损止盈 → 信号开平仓 → 记录权益"""
+        # 检查止损止盈
+        self._check_exit_conditions(current_time, current_price, signal)
+
+        # 处理信号
+        if signal['action'] == 'BUY' and self.position == 0:
+            self._execute_buy(current_time, current_price, signal)
+        elif signal['action'] == 'SELL' and self.position > 0:
+            self._execute_sell(current_time, current_price, signal)
+
+        # 记录权益
+        equity = self._calculate_equity(current_price)
+        self.equity_curve.append({
+            'timestamp': current_time,
+            'equity': equity,
+            'price': current_price
+        })
+
+    def _finish(self, df: pd.DataFrame) -> Dict:
+        """回测结束：强制平仓并计算结果"""
         if self.position > 0:
             final_price = float(df['close'].iloc[-1])
             final_time = df.index[-1]
             self._execute_sell(final_time, final_price, {'reasons': ['回测结束']})
 
-        # 6. 计算结果
-        results = self._calculate_results(df)
-
-        # 7. 打印结果
-        self._print_results(results)
-
-        return results
+        return self._calculate_results(df)
 
     def _execute_buy(self, timestamp, price: float, signal: Dict):
         """执行买入"""
@@ -309,6 +320,13 @@ class FastBacktest:
         print(f"  平均亏损:      ${results['avg_loss']:>12,.2f}")
         print(f"  盈亏比:        {results['profit_factor']:>15.2f}:1")
 
+        regime_trades = results.get('regime_trades')
+        if regime_trades is not None and not regime_trades.empty:
+            print(f"\n【分市场状态】")
+            for regime, row in regime_trades.iterrows():
+                print(f"  {regime:<14} 交易 {int(row['trades']):>3}  胜率 {row['win_rate']:>6.1f}%  "
+                      f"盈亏 ${row['total_profit']:>10,.2f}  平均 {row['avg_profit_pct']:+.2f}%")
+
         print(f"\n{'='*80}\n")
 
 
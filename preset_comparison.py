@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+信号过滤方案对比（一次计算，多方案并行评估）
+
+流程：
+1. 指标只在整段历史上计算一次（指标均为因果计算，与逐根截取计算结果一致）
+2. 原始信号（未经v7.3过滤）逐根生成一次
+3. 每个预设方案编译为过滤管线，向量化得到各自的动作掩码
+4. 用 FastBacktest 的同一套开平仓/统计逻辑，按掩码模拟各方案交易
+
+每多一个方案只增加一次掩码计算和一次轻量交易模拟，边际成本接近零
+注意：不请求情绪数据（资金费率/OI是实时数据，对历史回测无意义）
+
+使用方法：
+  python3 preset_comparison.py BTC/USDT -t 1h
+  python3 preset_comparison.py BTC/USDT -t 30m --presets BALANCED CUSTOM
+  python3 test_signal_config.py BTC/USDT --presets     # 同样的对比
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy_engine import StrategyEngine
+from fast_backtest import FastBacktest
+from config.signal_filter_config import PRESET_CONFIGS
+from config.strategy_params import SYMBOL_SPECIFIC_PARAMS
+from utils.signal_filter import (
+    ACTION_CODES,
+    SIGNAL_TYPES,
+    STAGE_STRATEGY,
+    compile_filter_pipeline,
+    is_volume_confirmed,
+)
+
+logger = logging.getLogger(__name__)
+
+HOLD_SIGNAL = {'action': 'HOLD', 'strength': 0, 'reasons': []}
+
+
+def compute_raw_signals(df: pd.DataFrame, engine: StrategyEngine, warmup: int = 200) -> Dict:
+    """
+    计算原始信号数组（所有方案共享）
+
+    Args:
+        df: OHLCV数据
+        engine: 未加配置过滤的策略引擎（StrategyEngine）
+        warmup: 预热K线数（与 FastBacktest 一致从第200根开始）
+
+    Returns:
+        数组字典及每根K线的交易计划
+    """
+    indicators = engine.calculate_all_indicators(df.copy())
+    n = len(df) - warmup
+
+    arrays = {
+        'action': np.zeros(n, dtype=np.int8),
+        'strength': np.zeros(n),
+        'signal_type': np.full(n, '', dtype=object),
+        'adx': indicators['adx'].to_numpy()[warmup:],
+        'rsi': indicators['rsi'].to_numpy()[warmup:],
+        'volume_confirmed': np.zeros(n, dtype=bool),
+        'divergence': np.zeros(n, dtype=bool),
+        'market_regime': np.full(n, '', dtype=object),
+    }
+    plans: List[Optional[Dict]] = [None] * n
+
+    for j, i in enumerate(range(warmup, len(df))):
+        # 不传symbol：不请求情绪数据，品种过滤在掩码阶段统一处理
+        signal = engine.generate_signal_from_indicators(indicators.iloc[:i+1])
+
+        arrays['action'][j] = ACTION_CODES[signal['action']]
+        arrays['strength'][j] = signal['strength']
+        arrays['signal_type'][j] = SIGNAL_TYPES.get(signal['type'], '')
+        arrays['market_regime'][j] = signal['market_regime']
+        if signal['action'] != 'HOLD':
+            arrays['volume_confirmed'][j] = is_volume_confirmed(signal['reasons'])
+            arrays['divergence'][j] = any('量价背离' in r or '假突破风险' in r for r in signal['reasons'])
+            plans[j] = signal['trading_plan']
+
+    return {'arrays': arrays, 'plans': plans}
+
+
+def symbol_filter_mask(arrays: Dict, symbol: Optional[str]) -> np.ndarray:
+    """品种差异化过滤（与 StrategyEngine.generate_signal 中的规则一致），True表示通过"""
+    params = SYMBOL_SPECIFIC_PARAMS.get(symbol) if symbol else None
+    if not params:
+        return np.ones(len(arrays['action']), dtype=bool)
+
+    passed = arrays['strength'] >= params.get('min_signal_strength', 0)
+    if params.get('filter_divergence_enabled', False):
+        min_with_divergence = params.get('min_signal_with_divergence', 75)
+        passed &= ~(arrays['divergence'] & (arrays['strength'] < min_with_divergence))
+    return passed
+
+
+def compare_presets(
+    df: pd.DataFrame,
+    symbol: Optional[str] = None,
+    presets: Optional[List[str]] = None,
+    backtest: Optional[FastBacktest] = None,
+    warmup: int = 200
+) -> Dict[str, Dict]:
+    """
+    一次性评估多个预设方案
+
+    Args:
+        df: OHLCV数据
+        symbol: 交易对（用于品种差异化过滤）
+        presets: 方案名称列表，默认全部
+        backtest: 用于模拟交易的 FastBacktest 实例
+        warmup: 预热K线数
+
+    Returns:
+        {方案名: 回测结果（额外包含信号统计和 config_hash）}
+    """
+    presets = presets or list(PRESET_CONFIGS)
+    backtest = backtest or FastBacktest()
+    engine = StrategyEngine(use_hyperliquid=False, use_smart_money=False)
+
+    start = time.perf_counter()
+    raw = compute_raw_signals(df, engine, warmup)
+    raw_seconds = time.perf_counter() - start
+
+    arrays, plans = raw['arrays'], raw['plans']
+    symbol_passed = symbol_filter_mask(arrays, symbol)
+    times = df.index[warmup:]
+    prices = df['close'].to_numpy()[warmup:]
+
+    all_results = {}
+    for preset in presets:
+        preset_start = time.perf_counter()
+        pipeline = compile_filter_pipeline(PRESET_CONFIGS[preset], preset)
+
+        # 策略阶段过滤后仍有动作且通过品种过滤的K线才带有交易计划（与逐根回测一致）
+        strategy_predicates = pipeline.stage_predicates(STAGE_STRATEGY)
+        strategy_pipeline = pipeline._replace(predicates=strategy_predicates)
+        after_strategy, _ = strategy_pipeline.evaluate(arrays)
+        has_plan = (after_strategy != 0) & symbol_passed
+
+        actions, _ = pipeline.evaluate(arrays)
+        actions = np.where(symbol_passed, actions, 0)
+
+        backtest.reset()
+        for j in range(len(actions)):
+            if actions[j] == 0 and not has_plan[j]:
+                signal = HOLD_SIGNAL
+            else:
+                signal = {
+                    'action': 'BUY' if actions[j] == 1 else 'SELL' if actions[j] == -1 else 'HOLD',
+                    'strength': int(arrays['strength'][j]),
+                    'reasons': [],
+                    'trading_plan': plans[j] if has_plan[j] else {},
+                }
+            backtest._process_bar(times[j], float(prices[j]), signal)
+
+        results = backtest._finish(df)
+        results.update({
+            'preset': preset,
+            'name': pipeline.name,
+            'config_hash': pipeline.config_hash,
+            'buy_signals': int((actions == 1).sum()),
+            'sell_signals': int((actions == -1).sum()),
+            'seconds': time.perf_counter() - preset_start,
+        })
+        all_results[preset] = results
+
+    logger.info(f"原始信号计算耗时 {raw_seconds:.2f}s，"
+                f"{len(presets)} 个方案共耗时 {sum(r['seconds'] for r in all_results.values()):.2f}s")
+    for results in all_results.values():
+        results['raw_seconds'] = raw_seconds
+
+    return all_results
+
+
+def print_comparison(all_results: Dict[str, Dict], symbol: str, timeframe: str):
+    """并排打印各方案结果"""
+    print(f"\n{'='*100}")
+    print(f"信号过滤方案对比: {symbol} @ {timeframe}")
+    print(f"{'='*100}")
+    print(f"{'方案':<14} {'买/卖信号':<10} {'交易':>5} {'胜率':>8} {'收益率':>9} "
+          f"{'最大回撤':>9} {'盈亏比':>7} {'耗时':>7}  {'hash'}")
+    print(f"{'-'*100}")
+    for preset, r in all_results.items():
+        print(f"{preset:<14} {r['buy_signals']:>4}/{r['sell_signals']:<5} "
+              f"{r['total_trades']:>5} {r['win_rate']:>7.1f}% {r['total_return_pct']:>8.2f}% "
+              f"{r['max_drawdown']:>8.2f}% {r['profit_factor']:>7.2f} {r['seconds']:>6.2f}s  {r['config_hash']}")
+
+    raw_seconds = next(iter(all_results.values()))['raw_seconds'] if all_results else 0
+    print(f"{'-'*100}")
+    print(f"原始信号（所有方案共享）耗时: {raw_seconds:.2f}s")
+    print(f"{'='*100}\n")
+
+
+def run_comparison(symbol: str, timeframe: str, presets: Optional[List[str]] = None,
+                   start_date: str = None, end_date: str = None) -> Dict[str, Dict]:
+    """从本地缓存（不存在时从交易所拉取）加载数据并对比方案"""
+    backtest = FastBacktest()
+    df = backtest.cache_manager.load_range(symbol, timeframe, start_date, end_date)
+    if df is None:
+        from data_collector import DataCollector
+        df = DataCollector('binance').fetch_ohlcv(symbol, timeframe, 1000)
+        if start_date:
+            df = df[df.index >= start_date]
+        if end_date:
+            df = df[df.index <= end_date]
+
+    all_results = compare_presets(df, symbol, presets, backtest)
+    print_comparison(all_results, symbol, timeframe)
+    return all_results
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='信号过滤方案对比')
+    parser.add_argument('symbol', nargs='?', default='BTC/USDT', help='交易对')
+    parser.add_argument('-t', '--timeframe', default='1h', help='时间周期，默认: 1h')
+    parser.add_argument('--presets', nargs='+', choices=list(PRESET_CONFIGS), help='要对比的方案（默认全部）')
+    parser.add_argument('--start', help='开始日期，如 2025-09-01')
+    parser.add_argument('--end', help='结束日期，如 2025-10-27')
+    args = parser.parse_args()
+
+    run_comparison(args.symbol, args.timeframe, args.presets, args.start, args.end)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -1,14 +1,32 @@
 """
 实时信号引擎
 基于实时数据生成交易信号
+
+增量模式（默认）：每个交易对维护流式指标状态（utils.streaming_indicators），
+K线封闭时只用这一根K线推进指标，再对最新指标值运行市场状态与信号规则，
+耗时与缓冲区长度无关；关闭后每根K线对整个缓冲区重新计算所有指标
+
+临时信号（可选，需增量模式）：K线形成过程中按不超过 provisional_interval 秒一次的频率，
+用正在形成的K线推测性计算指标（IndicatorState.peek，不写入状态）并评估信号，
+结果标记 provisional=True，K线封闭后由正式信号取代
+
+回填K线（kline['backfill']=True，utils.gap_filler 在断线重连后补回的历史K线）只更新缓冲区和指标状态，
+不生成信号；回填结束后的第一根实时K线按正常流程生成信号
+
+延迟追踪：每条K线记录 network / queue 阶段，K线封闭时记录 indicator / callback / close_to_signal
+（utils.latency_tracker，默认写入全局追踪器）
 """
 
+import time
 import pandas as pd
 import logging
 from typing import Dict, Optional, Callable
 from datetime import datetime
 
 from utils.data_buffer import KlineBuffer
+from utils.streaming_indicators import IndicatorState, build_indicator_specs
+from utils.latency_tracker import LatencyTracker, get_latency_tracker
+from utils.timeframes import timeframe_to_ms
 from strategy_engine import StrategyEngine
 
 logging.basicConfig(level=logging.INFO)
@@ -23,7 +41,10 @@ class RealtimeSignalEngine:
         symbol: str,
         timeframe: str,
         buffer_size: int = 500,
-        min_periods: int = 200
+        min_periods: int = 200,
+        incremental: bool = True,
+        provisional_interval: Optional[float] = None,
+        latency: Optional[LatencyTracker] = None
     ):
         """
         初始化实时信号引擎
@@ -33,10 +54,18 @@ class RealtimeSignalEngine:
             timeframe: 时间周期
             buffer_size: 缓冲区大小
             min_periods: 最小周期数（指标计算需要）
+            incremental: 增量模式（K线封闭时只推进流式指标状态，不重算整个缓冲区）
+            provisional_interval: 临时信号最小间隔（秒），None表示不计算临时信号
+            latency: 延迟追踪器，默认使用全局追踪器
         """
+        if provisional_interval is not None and not incremental:
+            raise ValueError("临时信号需要增量模式（incremental=True）")
+
         self.symbol = symbol
         self.timeframe = timeframe
         self.min_periods = min_periods
+        self.incremental = incremental
+        self.provisional_interval = provisional_interval
 
         # 数据缓冲区
         self.buffer = KlineBuffer(symbol, timeframe, buffer_size)
@@ -44,12 +73,29 @@ class RealtimeSignalEngine:
         # 策略引擎
         self.strategy = StrategyEngine()
 
+        # 流式指标状态（增量模式）
+        self.state: Optional[IndicatorState] = None
+        if incremental:
+            self.state = IndicatorState(build_indicator_specs(self.strategy))
+
         # 最新信号
         self.latest_signal: Optional[Dict] = None
         self.last_action = 'HOLD'  # 上次动作
 
+        # 正在形成的K线上的临时信号
+        self.provisional_signal: Optional[Dict] = None
+        self._last_provisional_at = float('-inf')
+        self.provisional_stats = {'evaluated': 0, 'throttled': 0}
+
+        # 延迟追踪
+        self.latency = latency or get_latency_tracker()
+        self.latency_key = f"{symbol} {timeframe}"
+        self._timeframe_ms = timeframe_to_ms(timeframe)
+        self._callback_seconds = 0.0
+
         # 回调函数
         self.on_signal_change: Optional[Callable] = None
+        self.on_provisional_signal: Optional[Callable] = None
 
         logger.info(f"🎯 实时信号引擎初始化: {symbol} {timeframe}")
 
@@ -61,6 +107,10 @@ class RealtimeSignalEngine:
             historical_data: 历史K线数据
         """
         self.buffer.initialize(historical_data)
+        if self.incremental:
+            # 用全部历史数据预热（比缓冲区更长，EMA等递推指标更充分收敛）
+            self.state = IndicatorState(build_indicator_specs(self.strategy))
+            self.state.warm_up(historical_data)
         logger.info(f"✅ 引擎初始化完成: {len(self.buffer)} 条K线")
 
         # 立即生成初始信号
@@ -72,25 +122,75 @@ class RealtimeSignalEngine:
         处理新K线数据
 
         Args:
-            kline: K线数据
+            kline: K线数据（可带 event_time / received_at 时间戳）
         """
+        started = time.time()
+        started_perf = time.perf_counter()
+        self._record_receive(kline, started)
+
         # 更新缓冲区
         is_new_kline = self.buffer.update_kline(kline)
+        self._callback_seconds = 0.0
+
+        # 上一根K线封闭：推进流式指标状态
+        if is_new_kline and self.incremental:
+            self._advance_state()
+
+        # 回填的历史K线不生成信号
+        if kline.get('backfill'):
+            return
 
         # 如果数据足够，生成信号
         if self.buffer.is_ready(self.min_periods):
             # 只在新K线封闭时重新计算
             if is_new_kline:
+                self.provisional_signal = None
                 self._generate_signal()
+                self._record_close(started_perf)
                 logger.info(f"🕐 新K线封闭: {kline['datetime']}, 重新计算信号")
             else:
                 # K线更新中，只更新价格显示（不重新计算指标）
                 self._update_current_price(kline['close'])
+                if self.provisional_interval is not None:
+                    self._generate_provisional_signal()
         else:
             logger.info(f"⏳ 数据不足: {len(self.buffer)}/{self.min_periods}")
 
+    def _record_receive(self, kline: Dict, now: float):
+        """记录 交易所事件 → 收到 → 开始处理 的延迟"""
+        received_at = kline.get('received_at')
+        event_time = kline.get('event_time')
+        if event_time is not None and received_at is not None:
+            self.latency.record(self.latency_key, 'network', received_at - event_time / 1000)
+        if received_at is not None:
+            self.latency.record(self.latency_key, 'queue', now - received_at)
+
+    def _record_close(self, started_perf: float):
+        """记录K线封闭时的计算耗时与端到端延迟（K线周期结束 → 信号生成完成）"""
+        elapsed = time.perf_counter() - started_perf
+        self.latency.record(self.latency_key, 'indicator', elapsed - self._callback_seconds)
+
+        bar = self.buffer.get_last_closed()
+        if bar is not None:
+            close_time = (bar['timestamp'] + self._timeframe_ms) / 1000
+            self.latency.record(self.latency_key, 'close_to_signal', time.time() - close_time)
+
+    def _advance_state(self):
+        """用刚封闭的K线推进一步指标状态（同一根K线不会重复推进）"""
+        bar = self.buffer.get_last_closed()
+        if bar is None:
+            return
+        latest = self.state.latest
+        if latest is not None and bar['timestamp'] <= latest['timestamp']:
+            return
+        self.state.update(bar)
+
     def _generate_signal(self):
         """生成交易信号"""
+        if self.incremental:
+            self._generate_signal_incremental()
+            return
+
         try:
             # 获取数据框（不包含当前正在形成的K线）
             df = self.buffer.to_dataframe(include_current=False)
@@ -101,23 +201,91 @@ class RealtimeSignalEngine:
 
             # 生成信号
             signal = self.strategy.generate_signal(df)
+            self._publish(signal)
 
-            # 检查信号是否变化
-            action_changed = (signal['action'] != self.last_action)
+        except Exception as e:
+            logger.error(f"❌ 生成信号失败: {e}")
+            import traceback
+            traceback.print_exc()
 
-            # 更新状态
-            self.latest_signal = signal
-            self.last_action = signal['action']
+    def _generate_signal_incremental(self):
+        """基于流式指标状态的最新值生成信号（不重算指标）"""
+        try:
+            if self.state.bars < self.min_periods:
+                logger.warning(f"⚠️  数据不足，无法计算指标")
+                return
 
-            # 如果信号改变且有回调，触发回调
-            if action_changed and self.on_signal_change:
-                self.on_signal_change(signal)
+            signal = self.strategy.generate_signal_from_indicators(self.state.frame())
+            self._publish(signal)
 
         except Exception as e:
             logger.error(f"❌ 生成信号失败: {e}")
             import traceback
             traceback.print_exc()
 
+    def _generate_provisional_signal(self):
+        """在正在形成的K线上推测性评估信号（限频，不修改指标状态）"""
+        now = time.monotonic()
+        if now - self._last_provisional_at < self.provisional_interval:
+            self.provisional_stats['throttled'] += 1
+            return
+        if self.state.bars < self.min_periods:
+            return
+
+        bar = self.buffer.current_kline
+        if bar is None:
+            return
+        self._last_provisional_at = now
+
+        try:
+            row = self.state.peek(bar)
+            signal = self.strategy.generate_signal_from_indicators(self.state.frame(extra_row=row))
+        except Exception as e:
+            logger.error(f"❌ 生成临时信号失败: {e}")
+            return
+
+        signal['provisional'] = True
+        signal['bar_timestamp'] = bar['timestamp']
+        self.provisional_signal = signal
+        self.provisional_stats['evaluated'] += 1
+
+        if self.on_provisional_signal:
+            self.on_provisional_signal(signal)
+
+    def _publish(self, signal: Dict):
+        """更新最新信号，动作变化时触发回调"""
+        action_changed = (signal['action'] != self.last_action)
+
+        self.latest_signal = signal
+        self.last_action = signal['action']
+
+        if action_changed and self.on_signal_change:
+            started = time.perf_counter()
+            self.on_signal_change(signal)
+            self._callback_seconds = time.perf_counter() - started
+            self.latency.record(self.latency_key, 'callback', self._callback_seconds)
+
+    def apply_config(self, snapshot):
+        """
+        应用热更新的配置（utils.config_watcher）
+
+        增量模式只重算参数变化的指标（用缓冲区中的K线回填），否则指标由缓冲区重新计算；
+        均无需重新预热，立即按新参数重新生成信号
+
+        Args:
+            snapshot: ConfigSnapshot
+        """
+        self.strategy.apply_config(snapshot)
+
+        if self.incremental:
+            specs = build_indicator_specs(self.strategy)
+            changed = self.state.reconfigure(specs, self.buffer.to_dataframe(include_current=False))
+            if changed:
+                logger.info(f"🔄 {self.symbol} {self.timeframe} 重算指标: {', '.join(changed)}")
+
+        if self.buffer.is_ready(self.min_periods):
+            self._generate_signal()
+
     def _update_current_price(self, price: float):
         """
         更新当前价格（不重新计算指标）
@@ -138,6 +306,24 @@ class RealtimeSignalEngine:
         """
         return self.latest_signal
 
+    def get_provisional_signal(self) -> Optional[Dict]:
+        """
+        获取正在形成的K线上的临时信号（K线封闭后为None）
+
+        Returns:
+            信号字典（provisional=True）
+        """
+        return self.provisional_signal
+
+    def get_latency(self) -> Dict[str, Dict]:
+        """
+        本交易对各阶段延迟统计（毫秒）
+
+        Returns:
+            {stage: {'count', 'mean', 'p50', 'p90', 'p99', 'max'}}
+        """
+        return self.latency.summary(self.latency_key)
+
     def get_current_price(self) -> Optional[float]:
         """获取当前价格"""
         return self.buffer.get_latest_price()
@@ -167,5 +353,6 @@ class RealtimeSignalEngine:
             'strength': signal['strength'],
             'market_regime': signal['market_regime'],
             'buffer_size': len(self.buffer),
+            'provisional_action': self.provisional_signal['action'] if self.provisional_signal else None,
             'last_update': datetime.now()
         }
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+多进程分片实时监控
+交易对列表分成若干片，每片一个工作进程（各自的 StreamManager 连接 + RealtimeSignalEngine），
+K线封闭时各进程在自己的CPU核上计算指标，不再在同一个事件循环里排队
+
+    主进程（ShardedMonitor）
+        ├─ 工作进程 0: 交易对 0, N, 2N, ...  ─┐
+        ├─ 工作进程 1: 交易对 1, N+1, ...     ├─ 事件队列（信号 / 心跳 / 错误）→ 主进程
+        └─ ...                               ─┘
+       主进程 → 各工作进程的命令队列（追加交易对 / 停止）
+
+工作进程退出、心跳超时或启动（预热）超时时：
+    - 重启次数未超过 max_restarts：用同一片交易对启动新进程
+    - 否则把这片交易对分配给其余存活进程中交易对最少的（通过命令队列追加订阅）
+
+进程间只传递信号摘要（SIGNAL_FIELDS）和统计数据
+
+watch_config=True（默认）时每个工作进程运行 ConfigWatcher（utils/config_watcher.py），
+修改 config/strategy_params.py 等配置文件后各进程的引擎原地热更新，缓冲区和指标状态保留
+
+使用方法：
+    monitor = ShardedMonitor(symbols, '15m', workers=4, proxy='http://127.0.0.1:7890')
+    monitor.on_signal = lambda symbol, timeframe, signal: print(symbol, signal['action'])
+    monitor.run()
+
+    python3 sharded_monitor.py --symbols BTC/USDT ETH/USDT SOL/USDT -t 15m --workers 4
+"""
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import argparse
+import multiprocessing as mp
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 发送给主进程的信号字段
+SIGNAL_FIELDS = ('action', 'strength', 'type', 'market_regime', 'reasons', 'trading_plan',
+                 'current_price', 'provisional')
+
+# 事件类型（工作进程 → 主进程）
+EVENT_READY = 'ready'
+EVENT_SIGNAL = 'signal'
+EVENT_HEARTBEAT = 'heartbeat'
+EVENT_ERROR = 'error'
+
+# 命令（主进程 → 工作进程）
+COMMAND_ADD = 'add'
+COMMAND_STOP = 'stop'
+
+
+def shard_symbols(symbols: List[str], shards: int) -> List[List[str]]:
+    """交易对轮流分配到各片（各片数量最多相差1）"""
+    return [symbols[i::shards] for i in range(shards)]
+
+
+def _signal_payload(signal: Dict) -> Dict:
+    return {key: signal[key] for key in SIGNAL_FIELDS if key in signal}
+
+
+# ==================== 工作进程 ====================
+
+def _worker_main(worker_id: int, symbols: List[str], timeframe: str, options: Dict,
+                 events: mp.Queue, commands: mp.Queue):
+    """工作进程入口（spawn 启动，只能接收可序列化参数）"""
+    logging.basicConfig(level=options.get('log_level', logging.INFO),
+                        format=f'%(asctime)s - [worker {worker_id}] %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(_ShardWorker(worker_id, timeframe, options, events, commands).run(symbols))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        events.put((EVENT_ERROR, worker_id, f"{type(e).__name__}: {e}"))
+        raise
+
+
+class _ShardWorker:
+    """工作进程：一个 StreamManager + 每个交易对一个信号引擎"""
+
+    def __init__(self, worker_id: int, timeframe: str, options: Dict, events: mp.Queue, commands: mp.Queue):
+        from stream_manager import StreamManager
+
+        self.worker_id = worker_id
+        self.timeframe = timeframe
+        self.options = options
+        self.events = events
+        self.commands = commands
+
+        self.engines = {}
+        self._takeovers = set()     # 进行中的接管任务
+        self.manager = StreamManager(options.get('market_type', 'spot'), proxy=options.get('proxy'),
+                                     **options.get('stream_options', {}))
+
+        self.config_watcher = None
+        if options.get('watch_config', True):
+            from utils.config_watcher import ConfigWatcher
+            self.config_watcher = ConfigWatcher()
+
+    async def run(self, symbols: List[str]):
+        await self.add_symbols(symbols)
+        self.events.put((EVENT_READY, self.worker_id, sorted(self.engines)))
+
+        # 与K线处理在同一个事件循环中，应用配置不会与处理K线交错
+        tasks = [asyncio.create_task(self._heartbeat_loop())]
+        if self.config_watcher is not None:
+            tasks.append(asyncio.create_task(self.config_watcher.run()))
+        try:
+            await self.manager.run()
+        finally:
+            for task in tasks + list(self._takeovers):
+                task.cancel()
+
+    async def add_symbols(self, symbols: List[str]):
+        """获取历史数据、创建引擎并订阅K线流（运行中调用时新流立即建立连接）"""
+        from async_data_collector import AsyncDataCollector
+        from realtime_engine import RealtimeSignalEngine
+
+        symbols = [symbol for symbol in symbols if symbol not in self.engines]
+        if not symbols:
+            return
+
+        async with AsyncDataCollector(self.options.get('market_type', 'spot'), proxy=self.options.get('proxy'),
+                                      **self.options.get('collector_options', {})) as collector:
+            frames = await collector.fetch_many(symbols, [self.timeframe], limit=self.options.get('history_limit', 500))
+
+        for symbol in symbols:
+            df = frames.get((symbol, self.timeframe))
+            if df is None or df.empty:
+                self.events.put((EVENT_ERROR, self.worker_id, f"{symbol} 历史数据获取失败，跳过"))
+                continue
+
+            engine = RealtimeSignalEngine(symbol, self.timeframe, **self.options.get('engine_options', {}))
+            engine.initialize(df)
+            engine.on_signal_change = self._signal_callback(symbol)
+            self.engines[symbol] = engine
+            if self.config_watcher is not None:
+                self.config_watcher.register(engine)
+            self.manager.subscribe(symbol, self.timeframe, engine.on_kline)
+
+            signal = engine.get_signal()
+            if signal:
+                self._send_signal(symbol, signal)
+
+    async def _take_over(self, symbols: List[str]):
+        try:
+            await self.add_symbols(symbols)
+        except Exception as e:
+            self.events.put((EVENT_ERROR, self.worker_id, f"接管交易对失败: {type(e).__name__}: {e}"))
+        self.events.put((EVENT_READY, self.worker_id, sorted(self.engines)))
+
+    def _signal_callback(self, symbol: str) -> Callable:
+        return lambda signal: self._send_signal(symbol, signal)
+
+    def _send_signal(self, symbol: str, signal: Dict):
+        self.events.put((EVENT_SIGNAL, self.worker_id, (symbol, self.timeframe, _signal_payload(signal))))
+
+    async def _heartbeat_loop(self):
+        """定期发送心跳（附带运行统计），并处理主进程命令"""
+        from utils.latency_tracker import get_latency_tracker
+
+        interval = self.options.get('heartbeat_interval', 5)
+        while True:
+            await asyncio.sleep(interval)
+
+            while True:
+                try:
+                    command, payload = self.commands.get_nowait()
+                except queue.Empty:
+                    break
+                if command == COMMAND_STOP:
+                    self.manager.stop()
+                    return
+                if command == COMMAND_ADD:
+                    # 接管在后台进行（需要拉取历史数据），期间照常发送心跳、处理命令
+                    logger.info(f"➕ 接管交易对: {', '.join(payload)}")
+                    task = asyncio.create_task(self._take_over(payload))
+                    self._takeovers.add(task)
+                    task.add_done_callback(self._takeovers.discard)
+
+            stats = self.manager.get_stats()
+            stats['latency'] = get_latency_tracker().summary()['close_to_signal']
+            self.events.put((EVENT_HEARTBEAT, self.worker_id, stats))
+
+
+# ==================== 主进程 ====================
+
+class ShardedMonitor:
+    """多进程分片监控"""
+
+    def __init__(
+        self,
+        symbols: List[str],
+        timeframe: str = '15m',
+        workers: Optional[int] = None,
+        market_type: str = 'spot',
+        proxy: Optional[str] = None,
+        history_limit: int = 500,
+        heartbeat_interval: float = 5,
+        heartbeat_timeout: float = 120,
+        startup_timeout: float = 300,
+        max_restarts: int = 3,
+        watch_config: bool = True,
+        stream_options: Optional[Dict] = None,
+        collector_options: Optional[Dict] = None,
+        engine_options: Optional[Dict] = None
+    ):
+        """
+        初始化分片监控
+
+        Args:
+            symbols: 交易对列表
+            timeframe: K线周期
+            workers: 工作进程数，默认CPU核数（不超过交易对数）
+            market_type: 市场类型，'spot' (现货) 或 'future' (合约)
+            proxy: 代理地址
+            history_limit: 每个交易对预热用的历史K线数
+            heartbeat_interval: 工作进程心跳间隔（秒）
+            heartbeat_timeout: 超过该时间无心跳视为卡死，终止后按退出处理（秒）
+            startup_timeout: 启动后超过该时间仍未就绪（预热卡住）同样终止（秒）
+            max_restarts: 每片最多重启次数，超过后把交易对分给其余进程
+            watch_config: 工作进程是否监视配置文件并热更新引擎
+            stream_options: 传给 StreamManager 的其他参数
+            collector_options: 传给 AsyncDataCollector 的其他参数
+            engine_options: 传给 RealtimeSignalEngine 的其他参数
+        """
+        if not symbols:
+            raise ValueError("交易对列表为空")
+
+        self.symbols = list(dict.fromkeys(symbols))
+        self.timeframe = timeframe
+        self.num_workers = max(1, min(workers or os.cpu_count() or 1, len(self.symbols)))
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        self.max_restarts = max_restarts
+        self.options = {
+            'market_type': market_type,
+            'proxy': proxy,
+            'history_limit': history_limit,
+            'heartbeat_interval': heartbeat_interval,
+            'watch_config': watch_config,
+            'stream_options': stream_options or {},
+            'collector_options': collector_options or {},
+            'engine_options': engine_options or {},
+            'log_level': logging.getLogger().getEffectiveLevel(),
+        }
+
+        self._ctx = mp.get_context('spawn')
+        self.events = self._ctx.Queue()
+        self.workers: Dict[int, Dict] = {}
+        self.running = False
+
+        # 最新信号 {(symbol, timeframe): signal}
+        self.latest_signals: Dict[tuple, Dict] = {}
+        self.on_signal: Optional[Callable] = None   # on_signal(symbol, timeframe, signal)
+
+        self.stats = {'signals': 0, 'restarts': 0, 'rebalanced': 0, 'errors': 0}
+
+    def _spawn(self, worker_id: int, symbols: List[str], restarts: int = 0):
+        commands = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main, name=f"shard-{worker_id}", daemon=True,
+            args=(worker_id, symbols, self.timeframe, self.options, self.events, commands)
+        )
+        process.start()
+        self.workers[worker_id] = {
+            'process': process,
+            'commands': commands,
+            'symbols': list(symbols),
+            'restarts': restarts,
+            'ready': False,
+            'started': time.monotonic(),
+            'last_heartbeat': time.monotonic(),
+            'stats': {},
+        }
+        logger.info(f"🚀 工作进程 {worker_id} 启动 (pid {process.pid}): {len(symbols)} 个交易对")
+
+    def start(self):
+        """启动所有工作进程"""
+        self.running = True
+        for worker_id, symbols in enumerate(shard_symbols(self.symbols, self.num_workers)):
+            self._spawn(worker_id, symbols)
+        logger.info(f"📡 分片监控: {len(self.symbols)} 个交易对, {self.num_workers} 个工作进程")
+
+    def run(self):
+        """启动并持续处理事件，直到 stop() 或所有工作进程退出"""
+        if not self.workers:
+            self.start()
+        try:
+            while self.running:
+                self.poll(timeout=0.5)
+                self._check_workers()
+                if not self.workers:
+                    logger.error("❌ 没有存活的工作进程")
+                    break
+        finally:
+            self.stop()
+
+    def poll(self, timeout: float = 0.5) -> int:
+        """
+        处理队列中的事件（阻塞最多 timeout 秒等待第一个事件）
+
+        Returns:
+            处理的事件数
+        """
+        handled = 0
+        try:
+            event = self.events.get(timeout=timeout)
+            while True:
+                self._handle(*event)
+                handled += 1
+                event = self.events.get_nowait()
+        except queue.Empty:
+            pass
+        return handled
+
+    def _handle(self, kind: str, worker_id: int, payload):
+        worker = self.workers.get(worker_id)
+        if worker is not None:
+            worker['last_heartbeat'] = time.monotonic()
+
+        if kind == EVENT_SIGNAL:
+            symbol, timeframe, signal = payload
+            self.latest_signals[(symbol, timeframe)] = signal
+            self.stats['signals'] += 1
+            if self.on_signal:
+                try:
+                    self.on_signal(symbol, timeframe, signal)
+                except Exception as e:
+                    logger.error(f"❌ 信号回调失败: {e}")
+        elif kind == EVENT_HEARTBEAT:
+            if worker is not None:
+                worker['stats'] = payload
+        elif kind == EVENT_READY:
+            if worker is not None:
+                worker['ready'] = True
+            logger.info(f"✅ 工作进程 {worker_id} 就绪: {len(payload)} 个交易对")
+        elif kind == EVENT_ERROR:
+            self.stats['errors'] += 1
+            logger.error(f"❌ 工作进程 {worker_id}: {payload}")
+
+    def _check_workers(self):
+        """检查退出/卡死/启动超时的工作进程，重启或把交易对分给其余进程"""
+        now = time.monotonic()
+        for worker_id, worker in list(self.workers.items()):
+            process = worker['process']
+            if process.is_alive():
+                if worker['ready'] and now - worker['last_heartbeat'] > self.heartbeat_timeout:
+                    logger.warning(f"⚠️  工作进程 {worker_id} 心跳超时，终止")
+                elif not worker['ready'] and now - worker['started'] > self.startup_timeout:
+                    logger.warning(f"⚠️  工作进程 {worker_id} 启动 {self.startup_timeout:.0f}s 仍未就绪，终止")
+                else:
+                    continue
+                process.terminate()
+                process.join(5)
+
+            del self.workers[worker_id]
+            if not self.running:
+                continue
+            logger.warning(f"⚠️  工作进程 {worker_id} 退出 (exitcode {process.exitcode})")
+
+            if worker['restarts'] < self.max_restarts:
+                self.stats['restarts'] += 1
+                self._spawn(worker_id, worker['symbols'], worker['restarts'] + 1)
+            else:
+                self._rebalance(worker['symbols'])
+
+    def _rebalance(self, symbols: List[str]):
+        """把交易对逐个分给当前交易对最少的存活进程"""
+        if not self.workers:
+            logger.error(f"❌ 无法重新分配 {len(symbols)} 个交易对：没有存活的工作进程")
+            return
+
+        assignments: Dict[int, List[str]] = {}
+        for symbol in symbols:
+            worker_id = min(self.workers, key=lambda i: len(self.workers[i]['symbols']))
+            self.workers[worker_id]['symbols'].append(symbol)
+            assignments.setdefault(worker_id, []).append(symbol)
+
+        for worker_id, assigned in assignments.items():
+            self.workers[worker_id]['commands'].put((COMMAND_ADD, assigned))
+            logger.info(f"🔀 {len(assigned)} 个交易对转移到工作进程 {worker_id}")
+        self.stats['rebalanced'] += len(symbols)
+
+    def get_stats(self) -> Dict:
+        """
+        运行统计
+
+        Returns:
+            {'workers', 'symbols', 'signals', 'restarts', 'rebalanced', 'errors',
+             'shards': {worker_id: {'pid', 'alive', 'symbols', 'restarts', 'stream'}}}
+        """
+        shards = {}
+        for worker_id, worker in self.workers.items():
+            shards[worker_id] = {
+                'pid': worker['process'].pid,
+                'alive': worker['process'].is_alive(),
+                'symbols': len(worker['symbols']),
+                'restarts': worker['restarts'],
+                'stream': worker['stats'],
+            }
+        return {'workers': len(self.workers), 'symbols': len(self.symbols), **self.stats, 'shards': shards}
+
+    def stop(self, timeout: float = 10):
+        """通知所有工作进程停止，超时未退出的强制终止"""
+        if not self.running and not self.workers:
+            return
+        self.running = False
+        for worker in self.workers.values():
+            worker['commands'].put((COMMAND_STOP, None))
+
+        deadline = time.monotonic() + timeout
+        for worker in self.workers.values():
+            worker['process'].join(max(0.0, deadline - time.monotonic()))
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+                worker['process'].join(5)
+        self.workers.clear()
+        logger.info("⏹️  分片监控已停止")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多进程分片实时监控')
+    parser.add_argument('--symbols', nargs='+', required=True, help='交易对列表')
+    parser.add_argument('-t', '--timeframe', default='15m', help='K线周期，默认: 15m')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数，默认CPU核数')
+    parser.add_argument('--market', default='spot', choices=['spot', 'future'], help='市场类型')
+    parser.add_argument('--proxy', default=None, help='代理地址')
+    parser.add_argument('--no-watch-config', action='store_true', help='不监视配置文件（修改配置需重启）')
+    args = parser.parse_args()
+
+    monitor = ShardedMonitor(args.symbols, args.timeframe, args.workers, args.market, args.proxy,
+                             watch_config=not args.no_watch_config)
+    icons = {'BUY': '🟢', 'SELL': '🔴', 'HOLD': '⚪'}
+    monitor.on_signal = lambda symbol, timeframe, signal: print(
+        f"{icons.get(signal['action'], '•')} {symbol:<12} {timeframe:<4} {signal['action']:<4} "
+        f"强度 {signal.get('strength', 0):>3}  {signal.get('market_regime', '')}")
+
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        print("\n⏹️  用户中断")
+    finally:
+        print(f"\n📊 {monitor.get_stats()}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
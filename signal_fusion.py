@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+多周期信号共振引擎
+基于 SIGNAL_FUSION_PARAMS 的周期权重，融合 15m/30m/1h 信号
+
+设计：
+1. 只订阅/拉取一条基础周期（最小周期，如15m）数据流
+2. 高周期K线由基础K线增量合成（IncrementalResampler），不重复拉取
+3. 每个周期维护独立的流式指标状态，高周期只在自身K线收盘时推进一步
+4. 每根基础K线收盘时输出一个融合信号：
+   融合分数 = Σ 周期权重 × 方向(BUY=+1, SELL=-1, HOLD=0) × 周期信号强度
+   |融合分数| ≥ min_signal_strength 时给出 BUY/SELL
+
+使用方法：
+  python3 signal_fusion.py BTC/USDT            # 回放最近的基础K线，打印融合信号
+  python3 signal_fusion.py BTC/USDT --bars 50
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from strategy_engine import StrategyEngine
+from config.strategy_params import SIGNAL_FUSION_PARAMS
+from utils.streaming_indicators import BAR_FIELDS, IndicatorState, build_indicator_specs, iter_bars
+from utils.timeframes import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalResampler:
+    """把基础周期的已收盘K线增量合成为高周期K线"""
+
+    def __init__(self, base_timeframe: str, target_timeframe: str):
+        """
+        初始化重采样器
+
+        Args:
+            base_timeframe: 基础周期，如 '15m'
+            target_timeframe: 目标周期，如 '1h'（必须是基础周期的整数倍）
+        """
+        self.base_ms = timeframe_to_ms(base_timeframe)
+        self.target_ms = timeframe_to_ms(target_timeframe)
+        if self.target_ms % self.base_ms != 0:
+            raise ValueError(f"{target_timeframe} 不是 {base_timeframe} 的整数倍")
+
+        self.target_timeframe = target_timeframe
+        self.current: Optional[Dict] = None
+
+    def update(self, bar: Dict) -> List[Dict]:
+        """
+        输入一根已收盘的基础K线
+
+        Args:
+            bar: K线字典（timestamp为开盘时间毫秒）
+
+        Returns:
+            本次收盘的高周期K线列表（通常为0或1根；数据有缺口时可能先封闭未完整的K线）
+        """
+        closed = []
+        bucket = bar['timestamp'] // self.target_ms * self.target_ms
+
+        if self.current is not None and bucket != self.current['timestamp']:
+            # 缺口：上一根高周期K线未收到最后一根基础K线，直接封闭
+            closed.append(self.current)
+            self.current = None
+
+        if self.current is None:
+            self.current = {
+                'timestamp': bucket,
+                'open': bar['open'],
+                'high': bar['high'],
+                'low': bar['low'],
+                'close': bar['close'],
+                'volume': bar['volume'],
+            }
+        else:
+            self.current['high'] = max(self.current['high'], bar['high'])
+            self.current['low'] = min(self.current['low'], bar['low'])
+            self.current['close'] = bar['close']
+            self.current['volume'] += bar['volume']
+
+        # 基础K线的收盘时间到达高周期边界 → 高周期K线收盘
+        if (bar['timestamp'] + self.base_ms) % self.target_ms == 0:
+            closed.append(self.current)
+            self.current = None
+
+        return closed
+
+
+def resample_ohlcv(df: pd.DataFrame, base_timeframe: str, target_timeframe: str):
+    """
+    向量化重采样历史数据（用于初始化）
+
+    Args:
+        df: 基础周期OHLCV数据
+        base_timeframe: 基础周期
+        target_timeframe: 目标周期
+
+    Returns:
+        (已完整收盘的高周期DataFrame, 最后一根未完成高周期K线对应的基础K线DataFrame)
+    """
+    base_ms = timeframe_to_ms(base_timeframe)
+    target_ms = timeframe_to_ms(target_timeframe)
+
+    timestamps = df.index.values.astype('datetime64[ms]').astype('int64')
+    buckets = timestamps // target_ms * target_ms
+
+    grouped = df[['open', 'high', 'low', 'close', 'volume']].groupby(buckets)
+    resampled = grouped.agg({'open': 'first', 'high': 'max', 'low': 'min',
+                             'close': 'last', 'volume': 'sum'})
+    resampled['timestamp'] = resampled.index.astype('int64')
+
+    # 最后一根基础K线没有走到边界时，最后一个高周期桶尚未收盘
+    pending = df.iloc[0:0]
+    if len(df) and (timestamps[-1] + base_ms) % target_ms != 0:
+        pending = df[buckets == buckets[-1]]
+        resampled = resampled.iloc[:-1]
+
+    resampled.index = pd.to_datetime(resampled['timestamp'], unit='ms')
+    resampled.index.name = 'datetime'
+    return resampled, pending
+
+
+class TimeframeView:
+    """单个周期的视图：重采样器 + 流式指标状态 + 最近一次信号"""
+
+    def __init__(self, timeframe: str, weight: float, specs: Dict, resampler: Optional[IncrementalResampler]):
+        self.timeframe = timeframe
+        self.weight = weight
+        self.resampler = resampler
+        self.state = IndicatorState(specs)
+        self.history: List[Dict] = []
+        self.last_signal: Optional[Dict] = None
+        self.last_bar_timestamp: Optional[int] = None
+
+
+class SignalFusionEngine:
+    """多周期信号共振引擎（单个交易对）"""
+
+    def __init__(
+        self,
+        symbol: str,
+        strategy_engine: Optional[StrategyEngine] = None,
+        fusion_params: Optional[Dict] = None,
+        min_periods: int = 200,
+        history_size: int = 500
+    ):
+        """
+        初始化信号共振引擎
+
+        Args:
+            symbol: 交易对
+            strategy_engine: 策略引擎（多个交易对可共享一个实例）
+            fusion_params: 共振参数，默认 SIGNAL_FUSION_PARAMS
+            min_periods: 周期参与共振所需的最少K线数（EMA200需要200根）
+            history_size: 每个周期保留的已收盘K线数（用于参数热更新时重算指标）
+        """
+        self.symbol = symbol
+        self.strategy = strategy_engine or StrategyEngine(use_hyperliquid=False, use_smart_money=False)
+        self.fusion_params = fusion_params or SIGNAL_FUSION_PARAMS
+        # 显式传入的共振参数不随配置热更新变化
+        self._follow_config = fusion_params is None
+        self.min_periods = min_periods
+        self.history_size = history_size
+
+        weights = self._effective_weights(self.fusion_params)
+
+        # 最小周期作为基础数据流
+        self.timeframes = sorted(weights, key=timeframe_to_ms)
+        self.base_timeframe = self.timeframes[0]
+
+        specs = build_indicator_specs(self.strategy)
+        self.views: Dict[str, TimeframeView] = {}
+        for tf in self.timeframes:
+            resampler = None if tf == self.base_timeframe else IncrementalResampler(self.base_timeframe, tf)
+            self.views[tf] = TimeframeView(tf, weights[tf], specs, resampler)
+
+        self.latest_signal: Optional[Dict] = None
+
+        logger.info(f"🔀 信号共振引擎初始化: {symbol} "
+                    f"基础周期 {self.base_timeframe}, 权重 {weights}")
+
+    @staticmethod
+    def _effective_weights(fusion_params: Dict) -> Dict[str, float]:
+        weights = fusion_params['timeframe_weights']
+        if not fusion_params.get('enabled', True):
+            # 未启用共振时只使用权重最高的周期
+            primary = max(weights, key=weights.get)
+            weights = {primary: 1.0}
+        return weights
+
+    def initialize(self, base_df: pd.DataFrame):
+        """
+        使用基础周期历史数据初始化所有周期
+
+        Args:
+            base_df: 基础周期OHLCV数据（只需一次拉取/加载）
+        """
+        for tf, view in self.views.items():
+            if view.resampler is None:
+                tf_df, pending = base_df, None
+            else:
+                tf_df, pending = resample_ohlcv(base_df, self.base_timeframe, tf)
+
+            view.state.warm_up(tf_df)
+            view.history = list(iter_bars(tf_df.tail(self.history_size)))
+            if view.history:
+                view.last_bar_timestamp = view.history[-1]['timestamp']
+                self._evaluate_view(view)
+
+            # 未收盘的高周期K线交给重采样器继续累积
+            if pending is not None:
+                for bar in iter_bars(pending):
+                    view.resampler.update(bar)
+
+            logger.info(f"✅ {self.symbol} {tf} 初始化完成: {view.state.bars} 根K线")
+
+    def on_base_bar(self, bar: Dict) -> Dict:
+        """
+        处理一根已收盘的基础周期K线
+
+        Args:
+            bar: K线字典（timestamp/open/high/low/close/volume）
+
+        Returns:
+            融合信号
+        """
+        for tf, view in self.views.items():
+            if view.resampler is None:
+                self._advance(view, bar)
+            else:
+                for closed in view.resampler.update(bar):
+                    self._advance(view, closed)
+
+        self.latest_signal = self._fuse(bar)
+        return self.latest_signal
+
+    def _advance(self, view: TimeframeView, bar: Dict):
+        """周期K线收盘：推进一步指标状态并重新评估该周期信号"""
+        view.state.update(bar)
+        view.history.append(bar)
+        if len(view.history) > self.history_size:
+            del view.history[:-self.history_size]
+        view.last_bar_timestamp = bar['timestamp']
+        self._evaluate_view(view)
+
+    def apply_config(self, snapshot):
+        """
+        应用热更新的配置（utils.config_watcher）
+
+        只重算参数变化的指标，使用各周期已有的K线历史回填，下一根K线即按新参数出信号
+
+        Args:
+            snapshot: ConfigSnapshot
+        """
+        self.strategy.apply_config(snapshot)
+
+        if self._follow_config:
+            weights = self._effective_weights(snapshot.fusion_params)
+            if set(weights) == set(self.views):
+                self.fusion_params = snapshot.fusion_params
+                for tf, view in self.views.items():
+                    view.weight = weights[tf]
+            else:
+                # 周期组合变化需要新的数据流，只能重启生效
+                logger.warning(f"⚠️  {self.symbol} 共振周期变化 {sorted(self.views)} → {sorted(weights)}，"
+                               f"需要重启才能生效")
+
+        specs = build_indicator_specs(self.strategy)
+        for tf, view in self.views.items():
+            history = pd.DataFrame(view.history, columns=list(BAR_FIELDS))
+            changed = view.state.reconfigure(specs, history)
+            if changed:
+                logger.info(f"🔄 {self.symbol} {tf} 重算指标: {', '.join(changed)}")
+            # 阈值等规则参数变化同样需要重新评估
+            if view.history:
+                self._evaluate_view(view)
+
+    def _evaluate_view(self, view: TimeframeView):
+        if view.state.bars < self.min_periods:
+            view.last_signal = None
+            return
+        # 不传symbol：情绪数据与品种过滤只作用于融合结果，避免每个周期重复请求
+        view.last_signal = self.strategy.generate_signal_from_indicators(view.state.frame())
+
+    def _fuse(self, bar: Dict) -> Dict:
+        """按权重融合各周期最近一次收盘信号"""
+        score = 0.0
+        components = {}
+        reasons = []
+
+        for tf, view in self.views.items():
+            signal = view.last_signal
+            if signal is None:
+                components[tf] = {'action': 'HOLD', 'strength': 0, 'ready': False}
+                reasons.append(f'{tf}: 数据不足({view.state.bars}/{self.min_periods})')
+                continue
+
+            direction = {'BUY': 1, 'SELL': -1}.get(signal['action'], 0)
+            score += view.weight * direction * signal['strength']
+            components[tf] = {
+                'action': signal['action'],
+                'strength': signal['strength'],
+                'market_regime': signal.get('market_regime'),
+                'bar_timestamp': view.last_bar_timestamp,
+                'ready': True,
+            }
+            reasons.append(f"{tf}({view.weight:.0%}): {signal['action']} {signal['strength']}")
+
+        min_strength = self.fusion_params['min_signal_strength']
+        if score >= min_strength:
+            action = 'BUY'
+        elif score <= -min_strength:
+            action = 'SELL'
+        else:
+            action = 'HOLD'
+
+        base_signal = self.views[self.base_timeframe].last_signal or {}
+        return {
+            'type': 'FUSED',
+            'symbol': self.symbol,
+            'timestamp': bar['timestamp'],
+            'action': action,
+            'strength': min(int(round(abs(score))), 100),
+            'fused_score': score,
+            'reasons': reasons,
+            'components': components,
+            'market_regime': base_signal.get('market_regime'),
+            'market_data': base_signal.get('market_data'),
+        }
+
+
+# ==================== 命令行工具 ====================
+def main():
+    """回放最近的基础K线，打印融合信号"""
+    import argparse
+    from data_collector import DataCollector
+
+    parser = argparse.ArgumentParser(description='多周期信号共振')
+    parser.add_argument('symbol', nargs='?', default='BTC/USDT', help='交易对')
+    parser.add_argument('--bars', type=int, default=20, help='回放最近N根基础K线')
+    args = parser.parse_args()
+
+    engine = SignalFusionEngine(args.symbol)
+    collector = DataCollector('binance')
+    # 1h EMA200 需要 200 小时 = 800 根 15m K线
+    df = collector.fetch_ohlcv(args.symbol, engine.base_timeframe, limit=1000)
+
+    engine.initialize(df.iloc[:-args.bars])
+
+    print(f"\n{'='*80}")
+    print(f"多周期信号共振: {args.symbol} (基础周期 {engine.base_timeframe})")
+    print(f"{'='*80}")
+    for bar in iter_bars(df.iloc[-args.bars:]):
+        signal = engine.on_base_bar(bar)
+        parts = ' | '.join(f"{tf} {c['action']}({c['strength']})" for tf, c in signal['components'].items())
+        print(f"{pd.to_datetime(bar['timestamp'], unit='ms')}  "
+              f"{signal['action']:<4} {signal['fused_score']:+7.1f}  {parts}")
+    print(f"{'='*80}\n")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main()
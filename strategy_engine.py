@@ -49,6 +49,7 @@ class StrategyEngine:
             use_smart_money: 是否启用聪明钱包追踪
         """
         self.market_regime_params = MARKET_REGIME_PARAMS
+        self.market_regime_strategy = MARKET_REGIME_STRATEGY
         self.trend_params = TREND_FOLLOWING_PARAMS
         self.mean_reversion_params = MEAN_REVERSION_PARAMS
         self.volume_params = VOLUME_PARAMS
@@ -94,6 +95,16 @@ class StrategyEngine:
 
         logger.info("✅ 策略引擎初始化完成")
 
+    def apply_config(self, snapshot):
+        """
+        应用热更新的策略参数（utils.config_watcher）
+
+        Args:
+            snapshot: ConfigSnapshot
+        """
+        for attr, params in snapshot.strategy_params.items():
+            setattr(self, attr, params)
+
     def calculate_all_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         计算所有技术指标
@@ -551,12 +562,28 @@ class StrategyEngine:
         # 计算指标
         df = self.calculate_all_indicators(df)
 
+        return self.generate_signal_from_indicators(df, symbol)
+
+    def generate_signal_from_indicators(self, df: pd.DataFrame, symbol: Optional[str] = None) -> Dict:
+        """
+        基于已计算好的指标生成交易信号
+
+        规则只读取最新几根K线，因此 df 可以是完整数据，也可以是
+        流式指标状态（utils.streaming_indicators）给出的最近窗口
+
+        Args:
+            df: 包含指标的DataFrame（列名与 calculate_all_indicators 一致）
+            symbol: 交易对（用于获取情绪数据）
+
+        Returns:
+            完整的交易信号
+        """
         # 识别市场状态
         market_regime = self.identify_market_regime(df)
         logger.info(f"🎯 当前市场状态: {market_regime}")
 
         # 根据市场状态选择策略
-        regime_strategy = MARKET_REGIME_STRATEGY.get(market_regime, {})
+        regime_strategy = self.market_regime_strategy.get(market_regime, {})
         strategy_type = regime_strategy.get('strategy', 'trend_following')
 
         # 生成信号
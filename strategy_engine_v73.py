@@ -8,6 +8,7 @@
 3. 动态调整信号阈值和指标权重
 4. 市场状态过滤
 5. 额外过滤条件
+6. 预设方案在启动时编译为过滤管线（utils/signal_filter.py）
 
 使用方法：
   from strategy_engine_v73 import StrategyEngineV73
@@ -16,6 +17,11 @@
 
 from strategy_engine import StrategyEngine
 from config.signal_filter_config import get_active_config
+from utils.signal_filter import (
+    compile_active_pipeline,
+    STAGE_STRATEGY,
+    STAGE_REGIME,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,16 +33,27 @@ class StrategyEngineV73(StrategyEngine):
     """
 
     def __init__(self, *args, **kwargs):
-        """初始化，加载信号过滤配置"""
+        """初始化，加载并编译信号过滤配置"""
         super().__init__(*args, **kwargs)
 
-        # 加载信号过滤配置
+        # 加载信号过滤配置（只在启动时编译一次）
         self.filter_config = get_active_config()
-        logger.info(f"✅ 信号过滤配置已加载: {self.filter_config['name']}")
+        self.filter_pipeline = compile_active_pipeline()
+        logger.info(f"✅ 信号过滤配置已加载: {self.filter_config['name']} "
+                    f"(hash: {self.filter_pipeline.config_hash})")
 
         # 打印配置摘要
         self._print_config_summary()
 
+    def apply_config(self, snapshot):
+        """应用热更新的策略参数和过滤管线"""
+        super().apply_config(snapshot)
+
+        self.filter_config = snapshot.filter_config
+        self.filter_pipeline = snapshot.filter_pipeline
+        logger.info(f"🔄 信号过滤配置已更新: {self.filter_config['name']} "
+                    f"(hash: {self.filter_pipeline.config_hash})")
+
     def _print_config_summary(self):
         """打印配置摘要"""
         config = self.filter_config
@@ -61,19 +78,23 @@ class StrategyEngineV73(StrategyEngine):
         logger.info(f"\n允许市场状态:")
         logger.info(f"  {', '.join(allowed_regimes)}")
 
+        # 编译后的过滤管线
+        logger.info(f"\n过滤管线 ({len(self.filter_pipeline.predicates)}步):")
+        logger.info(f"  {' → '.join(type(p).__name__ for p in self.filter_pipeline.predicates)}")
+
         logger.info(f"{'='*80}\n")
 
     def generate_trend_signal(self, df, symbol=None):
         """
         生成趋势信号（应用配置过滤）
 
-        覆盖父类方法，添加配置化权重和过滤
+        覆盖父类方法，添加配置化阈值和过滤
         """
         # 先调用父类方法获取原始信号（父类方法不接受symbol参数）
         signal = super().generate_trend_signal(df)
 
         # 应用配置过滤
-        signal = self._apply_config_filter(signal, 'trend')
+        signal = self._apply_config_filter(signal, 'trend', df)
 
         return signal
 
@@ -81,121 +102,40 @@ class StrategyEngineV73(StrategyEngine):
         """
         生成均值回归信号（应用配置过滤）
 
-        覆盖父类方法，添加配置化权重和过滤
+        覆盖父类方法，添加配置化阈值和过滤
         """
         # 先调用父类方法获取原始信号（父类方法不接受symbol参数）
         signal = super().generate_mean_reversion_signal(df)
 
         # 应用配置过滤
-        signal = self._apply_config_filter(signal, 'mean_reversion')
+        signal = self._apply_config_filter(signal, 'mean_reversion', df)
 
         return signal
 
-    def _apply_config_filter(self, signal: dict, signal_type: str) -> dict:
+    def _apply_config_filter(self, signal: dict, signal_type: str, df) -> dict:
         """
-        应用配置过滤器
+        应用配置过滤器（信号阈值 + 额外过滤条件）
 
         Args:
             signal: 原始信号
             signal_type: 'trend' 或 'mean_reversion'
+            df: 包含指标的DataFrame（额外过滤读取最新的ADX/RSI）
 
         Returns:
             过滤后的信号
         """
-        config = self.filter_config
-        thresholds = config['thresholds']
-
-        # 1. 应用新的阈值
-        if signal['action'] == 'BUY':
-            threshold_key = f"{signal_type}_buy"
-            required_strength = thresholds.get(threshold_key, 40)
-
-            if signal['strength'] < required_strength:
-                logger.info(f"⚠️  买入信号强度不足: {signal['strength']} < {required_strength}")
-                signal['action'] = 'HOLD'
-                signal['reasons'].insert(0, f"信号强度不足（{signal['strength']} < {required_strength}）")
-
-        elif signal['action'] == 'SELL':
-            threshold_key = f"{signal_type}_sell"
-            required_strength = thresholds.get(threshold_key, 40)
-
-            if signal['strength'] < required_strength:
-                logger.info(f"⚠️  卖出信号强度不足: {signal['strength']} < {required_strength}")
-                signal['action'] = 'HOLD'
-                signal['reasons'].insert(0, f"信号强度不足（{signal['strength']} < {required_strength}）")
-
-        # 2. 应用额外过滤条件
-        signal = self._apply_extra_filters(signal)
-
-        return signal
-
-    def _apply_extra_filters(self, signal: dict) -> dict:
-        """
-        应用额外过滤条件
-
-        Args:
-            signal: 信号字典
-
-        Returns:
-            过滤后的信号
-        """
-        if signal['action'] == 'HOLD':
-            return signal
+        latest = df.iloc[-1]
+        values = {'adx': float(latest['adx']), 'rsi': float(latest['rsi'])}
+        return self.filter_pipeline.apply(signal, STAGE_STRATEGY, signal_type, values)
 
-        extra_filters = self.filter_config.get('extra_filters', {})
-        market_data = signal.get('market_data', {})
-
-        # 过滤：最低ADX要求
-        min_adx = extra_filters.get('min_adx')
-        if min_adx and 'adx' in market_data:
-            if market_data['adx'] < min_adx:
-                logger.info(f"⚠️  ADX不足: {market_data['adx']:.1f} < {min_adx}")
-                signal['action'] = 'HOLD'
-                signal['reasons'].insert(0, f"ADX不足（{market_data['adx']:.1f} < {min_adx}）")
-                return signal
-
-        # 过滤：买入时RSI上限
-        if signal['action'] == 'BUY':
-            max_rsi = extra_filters.get('max_rsi_for_buy')
-            if max_rsi and 'rsi' in market_data:
-                if market_data['rsi'] > max_rsi:
-                    logger.info(f"⚠️  RSI过高: {market_data['rsi']:.1f} > {max_rsi}")
-                    signal['action'] = 'HOLD'
-                    signal['reasons'].insert(0, f"RSI过高（{market_data['rsi']:.1f} > {max_rsi}）")
-                    return signal
-
-        # 过滤：卖出时RSI下限
-        if signal['action'] == 'SELL':
-            min_rsi = extra_filters.get('min_rsi_for_sell')
-            if min_rsi and 'rsi' in market_data:
-                if market_data['rsi'] < min_rsi:
-                    logger.info(f"⚠️  RSI过低: {market_data['rsi']:.1f} < {min_rsi}")
-                    signal['action'] = 'HOLD'
-                    signal['reasons'].insert(0, f"RSI过低（{market_data['rsi']:.1f} < {min_rsi}）")
-                    return signal
-
-        # 过滤：必须成交量确认
-        require_volume = extra_filters.get('require_volume_confirmation', False)
-        if require_volume:
-            # 检查reasons中是否包含成交量确认
-            volume_confirmed = any('成交量' in reason or 'volume' in reason.lower()
-                                   for reason in signal['reasons'])
-            if not volume_confirmed:
-                logger.info("⚠️  缺少成交量确认")
-                signal['action'] = 'HOLD'
-                signal['reasons'].insert(0, "缺少成交量确认")
-                return signal
-
-        return signal
-
-    def generate_signal(self, df, symbol=None):
+    def generate_signal_from_indicators(self, df, symbol=None):
         """
         生成最终信号（应用市场状态过滤）
 
-        覆盖父类方法，添加市场状态过滤
+        覆盖父类方法，添加市场状态过滤（generate_signal 也经由此方法）
         """
         # 先调用父类方法获取原始信号
-        signal = super().generate_signal(df, symbol)
+        signal = super().generate_signal_from_indicators(df, symbol)
 
         # 应用市场状态过滤
         signal = self._apply_market_regime_filter(signal)
@@ -212,23 +152,9 @@ class StrategyEngineV73(StrategyEngine):
         Returns:
             过滤后的信号
         """
-        if signal['action'] == 'HOLD':
-            return signal
-
-        market_regime = signal.get('market_regime')
-        if not market_regime:
+        if not signal.get('market_regime'):
             return signal
-
-        # 检查当前市场状态是否允许交易
-        regime_filter = self.filter_config.get('market_regime_filter', {})
-        allowed = regime_filter.get(market_regime, True)
-
-        if not allowed:
-            logger.info(f"⚠️  市场状态不允许交易: {market_regime}")
-            signal['action'] = 'HOLD'
-            signal['reasons'].insert(0, f"市场状态不允许交易（{market_regime}）")
-
-        return signal
+        return self.filter_pipeline.apply(signal, STAGE_REGIME)
 
 
 # ==================== 测试代码 ====================
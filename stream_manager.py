@@ -0,0 +1,335 @@
+"""
+多路复用K线数据流
+所有交易对×周期共享少量 WebSocket 连接（币安组合流 /stream?streams=...），
+解码后按 (交易对, 周期) 分发给注册的回调
+
+与 WebSocketStream 的区别：
+    WebSocketStream  每个实例一个 ccxt.pro 客户端、每个交易对一个监听循环
+    StreamManager    每个连接承载最多 streams_per_connection 路K线流，
+                     连接数 = ceil(订阅数 / streams_per_connection)，200个交易对仍只需1个连接
+
+ccxt.pro 的币安实现会把订阅轮流分配到最多50个连接上，且丢掉了K线是否封闭的标记，
+这里直接对接币安组合流（与 AsyncDataCollector 直接调用K线接口相同）
+
+coalesce=True（默认）时回调经过K线邮箱（utils/kline_mailbox.py）：接收循环只投递不等待，
+引擎处理慢时形成中K线的中间更新被合并，封闭K线不丢；get_stats()['mailbox'] 为积压与合并统计
+
+回调收到的K线与 WebSocketStream 格式一致，另有 closed 字段（交易所标记该K线已封闭）
+与 event_time 字段（交易所事件时间，毫秒；用于延迟追踪）：
+    {'timestamp', 'datetime', 'open', 'high', 'low', 'close', 'volume', 'closed', 'event_time', 'received_at'}
+
+backfill=True（默认）时每路流经过缺口回填（utils/gap_filler.py）：重连后或时间戳跳过周期时，
+用一次K线接口请求（AsyncDataCollector）补回错过的封闭K线，按顺序先于实时K线交付
+
+stats_interval 不为空时每隔 stats_interval 秒打印一次运行统计、邮箱积压与链路延迟汇总
+
+使用方法：
+    manager = StreamManager(proxy='http://127.0.0.1:7890')
+    for symbol in symbols:
+        engine = RealtimeSignalEngine(symbol, '15m')
+        manager.subscribe(symbol, '15m', engine.on_kline)
+    await manager.run()
+"""
+
+import asyncio
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from utils.kline_mailbox import MailboxGroup
+from utils.gap_filler import GapFiller
+from utils.latency_tracker import get_latency_tracker
+
+logger = logging.getLogger(__name__)
+
+# 市场类型 → 组合流地址
+STREAM_ENDPOINTS = {
+    'spot': 'wss://stream.binance.com:9443/stream',
+    'future': 'wss://fstream.binance.com/stream',
+}
+
+# 币安单个连接最多1024路流；URL中带上全部流名，单连接不宜过长
+MAX_STREAMS_PER_CONNECTION = 1024
+
+
+class StreamManager:
+    """多路复用K线数据流管理器"""
+
+    def __init__(
+        self,
+        market_type: str = 'spot',
+        base_url: Optional[str] = None,
+        streams_per_connection: int = 200,
+        proxy: Optional[str] = None,
+        reconnect_delay: float = 5,
+        max_reconnect_delay: float = 60,
+        coalesce: bool = True,
+        backfill: bool = True,
+        collector_options: Optional[Dict] = None,
+        stats_interval: Optional[float] = None
+    ):
+        """
+        初始化数据流管理器
+
+        Args:
+            market_type: 市场类型，'spot' (现货) 或 'future' (合约)
+            base_url: 组合流地址，默认币安官方地址（测试时可指向本地模拟服务）
+            streams_per_connection: 每个连接承载的K线流数
+            proxy: 代理地址，如 'http://127.0.0.1:7890'
+            reconnect_delay: 断线后首次重连等待（秒），连续失败时指数增加
+            max_reconnect_delay: 重连等待上限（秒）
+            coalesce: 回调是否经过K线邮箱（合并形成中K线的更新，接收不等待回调处理）
+            backfill: 是否回填断线/丢消息期间错过的K线
+            collector_options: 回填用 AsyncDataCollector 的其他参数（如 base_url）
+            stats_interval: 定期打印统计的间隔（秒），None表示不打印
+        """
+        if market_type not in STREAM_ENDPOINTS:
+            raise ValueError(f"不支持的市场类型: {market_type}")
+        if not 0 < streams_per_connection <= MAX_STREAMS_PER_CONNECTION:
+            raise ValueError(f"每个连接的流数应在 1~{MAX_STREAMS_PER_CONNECTION} 之间: {streams_per_connection}")
+
+        self.market_type = market_type
+        self.base_url = base_url or STREAM_ENDPOINTS[market_type]
+        self.streams_per_connection = streams_per_connection
+        self.proxy = proxy
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.mailboxes = MailboxGroup() if coalesce else None
+        self.stats_interval = stats_interval
+        self.collector_options = collector_options or {}
+        self.gap_filler = GapFiller(self._fetch_range) if backfill else None
+        self._collector = None
+
+        # 流名（btcusdt@kline_15m）→ (交易对, 周期) / 回调列表
+        self.pairs: Dict[str, Tuple[str, str]] = {}
+        self.callbacks: Dict[str, List[Callable]] = {}
+
+        self.running = False
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._assigned = set()          # 已分配到连接的流名
+        self._tasks: List[asyncio.Task] = []
+        self._stopped: Optional[asyncio.Event] = None
+
+        self.stats = {
+            'connections': 0,           # 当前连接数
+            'messages': 0,              # 收到的K线消息数
+            'dispatched': 0,            # 回调调用次数
+            'callback_errors': 0,
+            'reconnects': 0,
+        }
+
+    @staticmethod
+    def stream_name(symbol: str, timeframe: str) -> str:
+        """BTC/USDT（或合约 BTC/USDT:USDT）+ 15m → btcusdt@kline_15m"""
+        market_id = symbol.split(':')[0].replace('/', '').lower()
+        return f"{market_id}@kline_{timeframe}"
+
+    def subscribe(self, symbol: str, timeframe: str, callback: Callable):
+        """
+        订阅K线流（运行中订阅会为新的流建立连接）
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            callback: 回调函数 callback(kline)，可以是协程函数；同一路流可注册多个
+        """
+        name = self.stream_name(symbol, timeframe)
+        if self.gap_filler is not None:
+            callback = self.gap_filler.wrap(symbol, timeframe, callback)
+        if self.mailboxes is not None:
+            callback = self.mailboxes.mailbox(symbol, timeframe, callback).put
+        self.pairs[name] = (symbol, timeframe)
+        self.callbacks.setdefault(name, []).append(callback)
+
+        if self.running:
+            self._start_connections()
+
+    def _start_connections(self):
+        """把未分配的流按 streams_per_connection 分组，每组一个连接"""
+        pending = [name for name in self.pairs if name not in self._assigned]
+        for i in range(0, len(pending), self.streams_per_connection):
+            group = pending[i:i + self.streams_per_connection]
+            self._assigned.update(group)
+            self._tasks.append(asyncio.create_task(self._connection_loop(group)))
+
+    async def run(self):
+        """建立所有连接并持续接收，直到 stop()"""
+        if not self.pairs:
+            raise ValueError("没有订阅任何K线流")
+
+        self.running = True
+        self._stopped = asyncio.Event()
+        self.session = aiohttp.ClientSession()
+        self._start_connections()
+        logger.info(f"📡 多路复用K线流: {len(self.pairs)} 路, {len(self._tasks)} 个连接")
+        if self.stats_interval:
+            self._tasks.append(asyncio.create_task(self._report_loop()))
+
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.close()
+
+    async def _connection_loop(self, streams: List[str]):
+        """单个连接：接收、解码、分发，断线后自动重连"""
+        url = f"{self.base_url}?streams={'/'.join(streams)}"
+        delay = self.reconnect_delay
+        connected = False
+
+        while self.running:
+            try:
+                async with self.session.ws_connect(url, proxy=self.proxy, heartbeat=60) as ws:
+                    self.stats['connections'] += 1
+                    delay = self.reconnect_delay
+                    logger.info(f"✅ K线流连接已建立: {len(streams)} 路")
+                    if connected and self.gap_filler is not None:
+                        self.gap_filler.mark_reconnect([self.pairs[name] for name in streams])
+                    connected = True
+                    try:
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                await self._dispatch(msg.data)
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                    finally:
+                        self.stats['connections'] -= 1
+                if self.running:
+                    logger.warning(f"⚠️  K线流连接断开（{len(streams)} 路），{delay:.0f}s 后重连")
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                logger.error(f"❌ K线流连接错误: {e}，{delay:.0f}s 后重连")
+
+            if not self.running:
+                break
+            self.stats['reconnects'] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _fetch_range(self, symbol: str, timeframe: str, since: int, limit: int) -> List[list]:
+        """回填用：一次请求获取 since 起的 limit 根K线"""
+        if self._collector is None:
+            from async_data_collector import AsyncDataCollector
+            self._collector = AsyncDataCollector(self.market_type, proxy=self.proxy, **self.collector_options)
+        df = await self._collector.fetch_ohlcv(symbol, timeframe, limit=limit, since=since)
+        return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].values.tolist()
+
+    async def _report_loop(self):
+        """定期打印运行统计、邮箱积压与延迟汇总"""
+        while self.running:
+            await asyncio.sleep(self.stats_interval)
+            stats = self.get_stats()
+            logger.info(f"📊 K线流: {stats['streams']} 路, {stats['connections']} 个连接, "
+                        f"消息 {stats['messages']}, 重连 {stats['reconnects']}")
+            if self.mailboxes is not None:
+                self.mailboxes.log_stats()
+            get_latency_tracker().log_summary()
+
+    async def _dispatch(self, raw: str):
+        """解码组合流消息并调用对应回调"""
+        received_at = time.time()
+        try:
+            message = json.loads(raw)
+            name = message.get('stream')
+            callbacks = self.callbacks.get(name)
+            if not callbacks:
+                return
+
+            data = message['data']
+            k = data['k']
+            kline = {
+                'timestamp': int(k['t']),
+                'datetime': datetime.fromtimestamp(k['t'] / 1000),
+                'open': float(k['o']),
+                'high': float(k['h']),
+                'low': float(k['l']),
+                'close': float(k['c']),
+                'volume': float(k['v']),
+                'closed': bool(k['x']),
+                'event_time': int(data['E']) if 'E' in data else None,
+                'received_at': received_at,
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠️  无法解析K线消息: {e}")
+            return
+        self.stats['messages'] += 1
+
+        for callback in callbacks:
+            try:
+                result = callback(kline)
+                if asyncio.iscoroutine(result):
+                    await result
+                self.stats['dispatched'] += 1
+            except Exception as e:
+                self.stats['callback_errors'] += 1
+                symbol, timeframe = self.pairs[name]
+                logger.error(f"❌ {symbol} {timeframe} 回调失败: {e}")
+
+    def get_stats(self) -> Dict:
+        """运行统计（订阅数、连接数、消息数、重连次数、邮箱积压与合并等）"""
+        stats = {'streams': len(self.pairs), **self.stats}
+        if self.mailboxes is not None:
+            stats['mailbox'] = self.mailboxes.get_stats()
+        if self.gap_filler is not None:
+            stats['backfill'] = dict(self.gap_filler.stats)
+        return stats
+
+    def stop(self):
+        """停止接收（run() 随后关闭所有连接并返回）"""
+        self.running = False
+        if self._stopped is not None:
+            self._stopped.set()
+        logger.info("⏹️  停止K线流")
+
+    async def close(self):
+        """关闭所有连接"""
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._assigned.clear()
+
+        if self.mailboxes is not None:
+            self.mailboxes.log_stats()
+            await self.mailboxes.close()
+
+        if self._collector is not None:
+            await self._collector.close()
+            self._collector = None
+
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        logger.info("🔌 K线流连接已关闭")
+
+
+# 测试代码
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        manager = StreamManager(proxy='http://127.0.0.1:7890')
+        symbols = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'BNB/USDT']
+
+        def make_callback(symbol, timeframe):
+            async def on_kline(kline):
+                flag = '✅' if kline['closed'] else '…'
+                print(f"{flag} {symbol:<10} {timeframe:<4} {kline['datetime']}  收: {kline['close']:.4f}")
+            return on_kline
+
+        for symbol in symbols:
+            for timeframe in ('1m', '15m'):
+                manager.subscribe(symbol, timeframe, make_callback(symbol, timeframe))
+
+        start = time.time()
+        try:
+            await manager.run()
+        except KeyboardInterrupt:
+            print("\n⏹️  用户中断")
+        finally:
+            print(f"\n📊 {manager.get_stats()}  运行 {time.time() - start:.0f}s")
+
+    asyncio.run(main())
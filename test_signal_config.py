@@ -6,6 +6,7 @@
 使用方法：
   python3 test_signal_config.py
   python3 test_signal_config.py BTC/USDT  # 测试指定交易对
+  python3 test_signal_config.py BTC/USDT --presets  # 一次性对比所有预设方案的回测表现
 """
 
 import sys
@@ -221,10 +222,16 @@ def main():
                         help='时间周期 (默认: 1h)')
     parser.add_argument('--scan', action='store_true',
                         help='扫描模式：统计最近100根K线的信号差异')
+    parser.add_argument('--presets', action='store_true',
+                        help='方案对比模式：一次计算，回测对比所有预设方案')
 
     args = parser.parse_args()
 
-    if args.scan:
+    if args.presets:
+        # 方案对比模式
+        from preset_comparison import run_comparison
+        run_comparison(args.symbol, args.timeframe)
+    elif args.scan:
         # 扫描模式
         scan_recent_signals(args.symbol, args.timeframe)
     else:
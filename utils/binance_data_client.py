@@ -8,6 +8,11 @@ import logging
 import time
 from typing import Dict, Optional
 
+try:
+    from utils.http_replay import get_http_session
+except ImportError:
+    from http_replay import get_http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,8 +56,8 @@ class BinanceDataClient:
             'sec-ch-ua-platform': '"Windows"',
         }
 
-        # 创建会话并设置
-        self.session = requests.Session()
+        # 创建会话并设置（支持HTTP录制/回放，见 utils/http_replay.py）
+        self.session = get_http_session()
         self.session.headers.update(self.headers)
 
         # 添加请求之间的延迟，避免频率过高
@@ -0,0 +1,167 @@
+"""
+K线缓存元数据索引
+每个缓存序列一个小JSON文件（data/cache/index/BTC_USDT_1h.json），每次写入缓存时同步维护：
+
+    rows          行数
+    first / last  第一根 / 最后一根K线时间（毫秒）
+    gaps          缺口 [[缺口前一根K线时间, 缺口后一根K线时间], ...]
+    missing_bars  缺口内缺失的K线总数
+    confirmed_gaps 修补时交易所也没有数据的缺口（停机等），不再重复拉取
+    content_hash  内容指纹（逐行哈希之和 mod 2^64，追加写入时可增量更新）
+    signature     写入时缓存文件的 [大小, 修改时间]，与当前不一致说明被外部修改过，需要重建
+
+统计、新鲜度检查、更新规划只需读取索引，不再解析整个缓存文件
+"""
+
+import json
+import os
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+INDEX_SCHEMA_VERSION = 1
+HASH_MODULUS = 1 << 64
+
+
+def _timestamps_ms(df: pd.DataFrame) -> np.ndarray:
+    return df.index.values.astype('datetime64[ms]').astype('int64')
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    逐行哈希（时间取自索引，数值列统一为float64，保证CSV与列式存储得到相同结果）
+    """
+    canonical = {'timestamp': _timestamps_ms(df)}
+    for name in df.columns:
+        if name != 'timestamp':
+            canonical[name] = df[name].to_numpy(dtype='float64')
+    return pd.util.hash_pandas_object(pd.DataFrame(canonical), index=False).to_numpy()
+
+
+def content_hash(df: pd.DataFrame) -> int:
+    """逐行哈希之和（uint64 自然溢出即 mod 2^64）"""
+    return int(row_hashes(df).sum(dtype='uint64'))
+
+
+def find_gaps(timestamps: np.ndarray, interval_ms: int) -> List[List[int]]:
+    """相邻K线间隔大于一个周期的位置：[[前一根时间, 后一根时间], ...]"""
+    timestamps = np.asarray(timestamps, dtype='int64')
+    if len(timestamps) < 2:
+        return []
+    idx = np.flatnonzero(np.diff(timestamps) > interval_ms)
+    return [[int(timestamps[i]), int(timestamps[i + 1])] for i in idx]
+
+
+def _missing_bars(gaps: List[List[int]], interval_ms: int) -> int:
+    return int(sum((after - before) // interval_ms - 1 for before, after in gaps))
+
+
+def _still_open(confirmed_gaps, gaps: List[List[int]]) -> List[List[int]]:
+    """已确认的缺口中仍然存在的部分（被补上的自动移除）"""
+    open_gaps = {tuple(gap) for gap in gaps}
+    return [list(gap) for gap in confirmed_gaps if tuple(gap) in open_gaps]
+
+
+def summarize(df: pd.DataFrame, interval_ms: int, confirmed_gaps=()) -> Dict:
+    """
+    由完整数据计算索引条目
+
+    Args:
+        df: 缓存数据（按时间排序）
+        interval_ms: K线周期（毫秒）
+        confirmed_gaps: 沿用的已确认缺口
+    """
+    timestamps = _timestamps_ms(df)
+    gaps = find_gaps(timestamps, interval_ms)
+    return {
+        'schema_version': INDEX_SCHEMA_VERSION,
+        'interval_ms': interval_ms,
+        'rows': len(df),
+        'first': int(timestamps[0]) if len(timestamps) else None,
+        'last': int(timestamps[-1]) if len(timestamps) else None,
+        'gaps': gaps,
+        'missing_bars': _missing_bars(gaps, interval_ms),
+        'confirmed_gaps': _still_open(confirmed_gaps, gaps),
+        'content_hash': f"{content_hash(df):016x}",
+    }
+
+
+def extend_summary(entry: Dict, rows: int, prev_ts: Optional[int],
+                   replaced_df: pd.DataFrame, new_df: pd.DataFrame) -> Dict:
+    """
+    尾部追加后增量更新索引条目（不读取未改动的历史数据）
+
+    Args:
+        entry: 追加前的索引条目
+        rows: 追加后的总行数
+        prev_ts: 被保留的最后一根K线时间（新数据之前），没有则为None
+        replaced_df: 被新数据覆盖的原尾部K线
+        new_df: 新写入的K线
+    """
+    interval_ms = entry['interval_ms']
+    new_ts = _timestamps_ms(new_df)
+
+    # 缺口：新数据之前的保持不变，重新检测 [prev_ts] + 新数据
+    gaps = [gap for gap in entry['gaps'] if gap[1] < new_ts[0]]
+    head = np.array([] if prev_ts is None else [prev_ts], dtype='int64')
+    gaps.extend(find_gaps(np.concatenate((head, new_ts)), interval_ms))
+
+    digest = (int(entry['content_hash'], 16) - content_hash(replaced_df) + content_hash(new_df)) % HASH_MODULUS
+    return {
+        **entry,
+        'rows': rows,
+        'first': entry['first'] if prev_ts is not None else int(new_ts[0]),
+        'last': int(new_ts[-1]),
+        'gaps': gaps,
+        'missing_bars': _missing_bars(gaps, interval_ms),
+        'confirmed_gaps': _still_open(entry.get('confirmed_gaps', []), gaps),
+        'content_hash': f"{digest:016x}",
+    }
+
+
+class CacheIndex:
+    """索引目录（每个序列一个JSON文件，不同序列并发写入互不影响）"""
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = Path(index_dir)
+
+    def path(self, key: str) -> Path:
+        return self.index_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取索引条目（不存在、损坏或版本不符时为None）"""
+        path = self.path(key)
+        if not path.is_file():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  缓存索引损坏，将重建: {path.name} ({e})")
+            return None
+        if entry.get('schema_version') != INDEX_SCHEMA_VERSION:
+            return None
+        return entry
+
+    def put(self, key: str, entry: Dict):
+        """写入索引条目（临时文件 + 原子替换，读者不会看到写了一半的文件）"""
+        entry = {**entry, 'updated_at': int(time.time() * 1000)}
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str):
+        self.path(key).unlink(missing_ok=True)
+
+    def clear(self):
+        for path in self.index_dir.glob('*.json'):
+            path.unlink()
@@ -0,0 +1,383 @@
+"""
+K线缓存存储后端
+
+- CSVStorage:      原有格式（BTC_USDT_1h.csv），可读性好，但加载时解析日期很慢
+- ColumnarStorage: 列式二进制格式，每个序列一个目录：
+
+    BTC_USDT_1h/
+      ├── meta.json        # 行数、列类型、压缩方式、schema版本
+      ├── timestamp.bin    # int64 开盘时间（毫秒，小端）
+      ├── open.bin         # float64
+      ├── ...
+      └── (压缩时为 data.npz)
+
+  meta.json 中的 rows 是权威行数，列文件可能比它长（追加写入未完成的部分对读者不可见）
+  增量更新只改写尾部（append），无法追加时才整体重写
+  纯追加原地写在 rows 之后；覆盖已有行或整体重写时先写临时文件再原子替换，meta.json 最后替换（已打开的内存映射仍指向旧文件）
+
+CSV 同样先写临时文件再原子替换，读者不会读到截断的文件
+多进程读写同一序列的协调（读写锁）见 utils/file_lock.py，由 DataCacheManager 负责加锁
+  时间范围查询通过内存映射 + 二分查找定位（load_range），只读取用到的行
+
+加载后的 DataFrame 与原CSV格式一致：datetime 索引 + timestamp/open/high/low/close/volume 列
+"""
+
+import json
+import os
+import time
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+META_FILE = 'meta.json'
+NPZ_FILE = 'data.npz'
+COMPRESSIONS = (None, 'npz')
+
+
+def _index_to_ms(df: pd.DataFrame) -> np.ndarray:
+    return df.index.values.astype('datetime64[ms]').astype('int64')
+
+
+def _tmp_path(path: Path) -> Path:
+    """同目录下的临时文件（os.replace 要求在同一文件系统）"""
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+def _frame_from_columns(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """由列数组构造与CSV缓存格式一致的 DataFrame"""
+    index = pd.DatetimeIndex(columns['timestamp'].astype('datetime64[ms]').astype('datetime64[ns]'), name='datetime')
+    return pd.DataFrame(columns, index=index)
+
+
+class CSVStorage:
+    """CSV存储（原有格式）"""
+
+    name = 'csv'
+
+    def path(self, cache_dir: Path, key: str) -> Path:
+        return cache_dir / f"{key}.csv"
+
+    def exists(self, path: Path) -> bool:
+        return path.is_file()
+
+    def load(self, path: Path) -> pd.DataFrame:
+        return pd.read_csv(path, index_col=0, parse_dates=True)
+
+    def save(self, df: pd.DataFrame, path: Path):
+        tmp_path = _tmp_path(path)
+        try:
+            df.to_csv(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def delete(self, path: Path):
+        path.unlink(missing_ok=True)
+
+    def size_bytes(self, path: Path) -> int:
+        return path.stat().st_size
+
+    def signature(self, path: Path) -> List[int]:
+        """[大小, 修改时间]，用于判断索引是否与文件一致"""
+        stat = path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def list_keys(self, cache_dir: Path) -> List[str]:
+        return sorted(p.stem for p in cache_dir.glob('*.csv'))
+
+
+class ColumnarStorage:
+    """列式二进制存储"""
+
+    name = 'columnar'
+
+    def __init__(self, compression: Optional[str] = None):
+        """
+        Args:
+            compression: None（原始列文件，可追加/内存映射）或 'npz'（压缩，体积更小）
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩方式: {compression}")
+        self.compression = compression
+
+    def path(self, cache_dir: Path, key: str) -> Path:
+        return cache_dir / key
+
+    def exists(self, path: Path) -> bool:
+        return (path / META_FILE).is_file()
+
+    def read_meta(self, path: Path) -> Dict:
+        with open(path / META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('schema_version', 0) > SCHEMA_VERSION:
+            raise ValueError(f"缓存格式版本过新: {meta['schema_version']} > {SCHEMA_VERSION}")
+        return meta
+
+    def write_meta(self, path: Path, meta: Dict):
+        meta_path = path / META_FILE
+        tmp_path = _tmp_path(meta_path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, meta_path)
+
+    def last_timestamp(self, path: Path) -> Optional[int]:
+        """最后一根K线的时间（毫秒），只读取一个值"""
+        meta = self.read_meta(path)
+        rows = meta['rows']
+        if rows == 0:
+            return None
+        if meta.get('compression') == 'npz':
+            with np.load(path / NPZ_FILE) as data:
+                return int(data['timestamp'][rows - 1])
+
+        dtype = np.dtype(meta['columns']['timestamp'])
+        with open(path / 'timestamp.bin', 'rb') as f:
+            f.seek((rows - 1) * dtype.itemsize)
+            return int(np.frombuffer(f.read(dtype.itemsize), dtype=dtype)[0])
+
+    def load(self, path: Path) -> pd.DataFrame:
+        meta = self.read_meta(path)
+        rows = meta['rows']
+
+        if meta.get('compression') == 'npz':
+            with np.load(path / NPZ_FILE) as data:
+                columns = {name: data[name][:rows] for name in meta['columns']}
+        else:
+            columns = {
+                name: np.fromfile(path / f"{name}.bin", dtype=dtype, count=rows)
+                for name, dtype in meta['columns'].items()
+            }
+        return _frame_from_columns(columns)
+
+    @staticmethod
+    def _columns_from_frame(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        columns = {'timestamp': _index_to_ms(df)}
+        for name in df.columns:
+            if name == 'timestamp':
+                continue
+            values = df[name].to_numpy()
+            if not np.issubdtype(values.dtype, np.number):
+                raise ValueError(f"列式存储只支持数值列: {name} ({values.dtype})")
+            columns[name] = values
+
+        # 统一为小端存储，保证跨平台可读
+        return {name: np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+                for name, values in columns.items()}
+
+    def open_arrays(self, path: Path) -> Dict[str, np.ndarray]:
+        """
+        以只读内存映射打开所有列（不读取数据，切片即零拷贝视图）
+
+        压缩存储无法映射，退化为完整读取
+        """
+        meta = self.read_meta(path)
+        rows = meta['rows']
+
+        if meta.get('compression') == 'npz':
+            with np.load(path / NPZ_FILE) as data:
+                return {name: data[name][:rows] for name in meta['columns']}
+
+        if rows == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in meta['columns'].items()}
+        return {
+            name: np.memmap(path / f"{name}.bin", dtype=dtype, mode='r', shape=(rows,))
+            for name, dtype in meta['columns'].items()
+        }
+
+    def slice_arrays(self, path: Path, start_ms: Optional[int] = None,
+                     end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        按时间范围 [start_ms, end_ms] 切片（二分查找，返回内存映射视图）
+
+        Args:
+            path: 序列目录
+            start_ms: 开始时间（毫秒，含），None表示从头
+            end_ms: 结束时间（毫秒，含），None表示到尾
+        """
+        arrays = self.open_arrays(path)
+        timestamps = arrays['timestamp']
+        lo = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side='left'))
+        hi = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side='right'))
+        return {name: values[lo:hi] for name, values in arrays.items()}
+
+    def load_range(self, path: Path, start_ms: Optional[int] = None,
+                   end_ms: Optional[int] = None) -> pd.DataFrame:
+        """按时间范围加载为 DataFrame（只复制范围内的行）"""
+        arrays = self.slice_arrays(path, start_ms, end_ms)
+        return _frame_from_columns({name: np.array(values) for name, values in arrays.items()})
+
+    def save(self, df: pd.DataFrame, path: Path):
+        columns = self._columns_from_frame(df)
+
+        path.mkdir(parents=True, exist_ok=True)
+
+        # 所有数据文件先写成临时文件，全部写完再逐个替换
+        if self.compression == 'npz':
+            files = {NPZ_FILE: lambda f: np.savez_compressed(f, **columns)}
+        else:
+            files = {f"{name}.bin": values.tofile for name, values in columns.items()}
+
+        written = {}
+        try:
+            for filename, write in files.items():
+                tmp_path = _tmp_path(path / filename)
+                written[filename] = tmp_path
+                with open(tmp_path, 'wb') as f:
+                    write(f)
+            for filename, tmp_path in written.items():
+                os.replace(tmp_path, path / filename)
+        finally:
+            for tmp_path in written.values():
+                tmp_path.unlink(missing_ok=True)
+
+        self.write_meta(path, {
+            'schema_version': SCHEMA_VERSION,
+            'rows': len(df),
+            'compression': self.compression,
+            'columns': {name: values.dtype.str for name, values in columns.items()},
+        })
+
+        # meta 替换之后再删除新格式用不到的文件（列变化、切换压缩方式）
+        for stale in list(path.glob('*.bin')) + [path / NPZ_FILE]:
+            if stale.name not in files:
+                stale.unlink(missing_ok=True)
+
+    def append(self, df: pd.DataFrame, path: Path) -> Optional[int]:
+        """
+        增量写入：只改写从新数据第一根K线开始的尾部（覆盖仍在形成中的最后一根K线）
+
+        新数据必须覆盖与已有数据重叠部分的所有K线，否则需要合并重写
+        只写在 meta['rows'] 之后时原地写入；覆盖已提交的行时先写临时文件再原子替换，
+        中途崩溃不会留下列之间不一致的数据；调用方仍需持有写锁（见 utils/file_lock.py）
+
+        Args:
+            df: 新数据（按时间排序、无重复）
+            path: 序列目录
+
+        Returns:
+            写入后的总行数；无法追加（压缩存储、列不一致、需要插入到历史中间）时返回None
+        """
+        meta = self.read_meta(path)
+        rows = meta['rows']
+        if meta.get('compression') == 'npz' or rows == 0 or df.empty:
+            return None
+
+        columns = self._columns_from_frame(df)
+        if {name: values.dtype.str for name, values in columns.items()} != meta['columns']:
+            return None
+
+        new_ts = columns['timestamp']
+        existing_ts = np.memmap(path / 'timestamp.bin', dtype=meta['columns']['timestamp'],
+                                mode='r', shape=(rows,))
+        if new_ts[0] < existing_ts[0]:
+            return None
+
+        # 被覆盖的已有K线必须全部包含在新数据中（memmap只读取尾部用到的页）
+        start = int(np.searchsorted(existing_ts, new_ts[0], side='left'))
+        overlap = np.asarray(existing_ts[start:])
+        del existing_ts
+        if len(overlap) and not np.isin(overlap, new_ts).all():
+            return None
+
+        if start >= rows:
+            # 纯追加：只写 meta['rows'] 之后的部分，对读者不可见，可以原地写入
+            for name, values in columns.items():
+                with open(path / f"{name}.bin", 'r+b') as f:
+                    f.seek(start * values.dtype.itemsize)
+                    f.write(values.tobytes())
+                    f.truncate()
+        else:
+            # 覆盖已提交的行：复制列文件到临时文件后改写尾部，全部写完再替换（与 save 相同）
+            written = {}
+            try:
+                for name, values in columns.items():
+                    tmp_path = _tmp_path(path / f"{name}.bin")
+                    written[name] = tmp_path
+                    shutil.copyfile(path / f"{name}.bin", tmp_path)
+                    with open(tmp_path, 'r+b') as f:
+                        f.seek(start * values.dtype.itemsize)
+                        f.write(values.tobytes())
+                        f.truncate()
+                for name, tmp_path in written.items():
+                    os.replace(tmp_path, path / f"{name}.bin")
+            finally:
+                for tmp_path in written.values():
+                    tmp_path.unlink(missing_ok=True)
+
+        # meta 最后写入：行数更新后新数据才对读者可见
+        meta['rows'] = start + len(new_ts)
+        self.write_meta(path, meta)
+        return meta['rows']
+
+    def delete(self, path: Path):
+        if path.is_dir():
+            shutil.rmtree(path)
+
+    def size_bytes(self, path: Path) -> int:
+        return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+
+    def signature(self, path: Path) -> List[int]:
+        """[总大小, meta.json修改时间]（每次写入最后都会改写 meta.json）"""
+        return [self.size_bytes(path), (path / META_FILE).stat().st_mtime_ns]
+
+    def list_keys(self, cache_dir: Path) -> List[str]:
+        return sorted(p.parent.name for p in cache_dir.glob(f'*/{META_FILE}'))
+
+
+def get_storage(backend: str = 'columnar', compression: Optional[str] = None):
+    """
+    创建存储后端
+
+    Args:
+        backend: 'columnar' 或 'csv'
+        compression: 列式存储的压缩方式（None / 'npz'）
+    """
+    if backend == 'columnar':
+        return ColumnarStorage(compression)
+    if backend == 'csv':
+        return CSVStorage()
+    raise ValueError(f"不支持的存储后端: {backend}")
+
+
+def benchmark_backends(df: pd.DataFrame, work_dir: Path, repeat: int = 3) -> List[Dict]:
+    """
+    对比各存储后端的读写耗时和体积
+
+    Args:
+        df: 测试数据
+        work_dir: 临时目录
+        repeat: 重复次数（取最快一次）
+
+    Returns:
+        [{'backend', 'save_ms', 'load_ms', 'size_mb'}, ...]
+    """
+
+    backends = [('csv', CSVStorage()), ('columnar', ColumnarStorage()), ('columnar+npz', ColumnarStorage('npz'))]
+    results = []
+    for label, storage in backends:
+        path = storage.path(Path(work_dir), f"bench_{label.replace('+', '_')}")
+        save_times, load_times = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            storage.save(df, path)
+            save_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            storage.load(path)
+            load_times.append(time.perf_counter() - start)
+
+        results.append({
+            'backend': label,
+            'save_ms': min(save_times) * 1000,
+            'load_ms': min(load_times) * 1000,
+            'size_mb': storage.size_bytes(path) / (1024 * 1024),
+        })
+        storage.delete(path)
+    return results
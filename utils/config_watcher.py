@@ -0,0 +1,193 @@
+"""
+配置热更新
+轮询 config/strategy_params.py 和 config/signal_filter_config.py 的修改时间，
+文件变化时重新加载并原子地应用到运行中的引擎，无需重启监控
+
+流程：
+1. 在独立命名空间中执行新配置文件并校验（编译过滤管线、生成指标规格）
+2. 校验失败：记录错误，继续使用旧配置
+3. 校验通过：重新加载配置模块，依次调用已注册引擎的 apply_config(snapshot)
+
+引擎在 apply_config 中只重算参数发生变化的指标（IndicatorState.reconfigure），
+使用已有的K线缓冲回填，下一根K线即生效，没有重新预热的空档
+
+使用方法（与K线处理在同一个事件循环中运行，保证应用配置与处理K线不会交错）：
+    watcher = ConfigWatcher()
+    watcher.register(engine)
+    asyncio.create_task(watcher.run())
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import runpy
+from types import SimpleNamespace
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from utils.signal_filter import CompiledFilterPipeline, compile_filter_pipeline
+from utils.streaming_indicators import build_indicator_specs
+
+logger = logging.getLogger(__name__)
+
+WATCHED_MODULES = ('config.strategy_params', 'config.signal_filter_config')
+
+# 引擎属性 → config.strategy_params 中的变量名
+STRATEGY_PARAM_ATTRIBUTES = {
+    'market_regime_params': 'MARKET_REGIME_PARAMS',
+    'market_regime_strategy': 'MARKET_REGIME_STRATEGY',
+    'trend_params': 'TREND_FOLLOWING_PARAMS',
+    'mean_reversion_params': 'MEAN_REVERSION_PARAMS',
+    'volume_params': 'VOLUME_PARAMS',
+    'sentiment_params': 'SENTIMENT_PARAMS',
+    'symbol_specific_params': 'SYMBOL_SPECIFIC_PARAMS',
+}
+
+
+class ConfigSnapshot(NamedTuple):
+    """一次完整加载并校验过的配置"""
+    version: int
+    strategy_params: Dict[str, Dict]   # 引擎属性名 → 参数字典
+    fusion_params: Dict
+    filter_config: Dict
+    filter_pipeline: CompiledFilterPipeline
+
+
+def load_config_snapshot(version: int = 0) -> ConfigSnapshot:
+    """
+    从磁盘加载配置并校验（不修改已加载的配置模块）
+
+    Args:
+        version: 快照版本号
+
+    Returns:
+        ConfigSnapshot
+
+    Raises:
+        配置文件语法错误、缺少参数或参数非法时抛出异常
+    """
+    strategy_module = importlib.import_module('config.strategy_params')
+    filter_module = importlib.import_module('config.signal_filter_config')
+
+    strategy_ns = runpy.run_path(strategy_module.__file__)
+    filter_ns = runpy.run_path(filter_module.__file__)
+
+    strategy_params = {attr: strategy_ns[name] for attr, name in STRATEGY_PARAM_ATTRIBUTES.items()}
+
+    preset = filter_ns['ACTIVE_PRESET']
+    filter_config = filter_ns['get_preset_config'](preset)
+    pipeline = compile_filter_pipeline(filter_config, preset)
+
+    # 指标参数缺失时在这里报错，而不是在下一根K线时
+    build_indicator_specs(SimpleNamespace(**strategy_params))
+
+    return ConfigSnapshot(
+        version=version,
+        strategy_params=strategy_params,
+        fusion_params=strategy_ns['SIGNAL_FUSION_PARAMS'],
+        filter_config=filter_config,
+        filter_pipeline=pipeline,
+    )
+
+
+class ConfigWatcher:
+    """配置文件监视器"""
+
+    def __init__(self, poll_interval: float = 2.0):
+        """
+        初始化配置监视器
+
+        Args:
+            poll_interval: 检查文件修改时间的间隔（秒）
+        """
+        self.poll_interval = poll_interval
+        self.targets: List = []
+        self.snapshot: Optional[ConfigSnapshot] = None
+        self.reload_count = 0
+        self.error_count = 0
+        self._running = False
+
+        self._paths = [importlib.import_module(name).__file__ for name in WATCHED_MODULES]
+        self._mtimes = self._read_mtimes()
+
+    def _read_mtimes(self) -> Tuple:
+        mtimes = []
+        for path in self._paths:
+            try:
+                stat = os.stat(path)
+                mtimes.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def register(self, target):
+        """
+        注册需要热更新的引擎
+
+        Args:
+            target: 实现了 apply_config(snapshot) 的对象
+                   （StrategyEngine / SignalFusionEngine / RealtimeSignalEngine）
+        """
+        if target not in self.targets:
+            self.targets.append(target)
+
+    def unregister(self, target):
+        """取消注册"""
+        if target in self.targets:
+            self.targets.remove(target)
+
+    def check(self) -> bool:
+        """
+        检查配置文件是否变化，变化则重新加载并应用
+
+        Returns:
+            是否应用了新配置
+        """
+        mtimes = self._read_mtimes()
+        if mtimes == self._mtimes:
+            return False
+        # 无论成功与否都记录，同一次修改只尝试一次
+        self._mtimes = mtimes
+
+        try:
+            snapshot = load_config_snapshot(self.reload_count + 1)
+        except Exception as e:
+            self.error_count += 1
+            logger.error(f"❌ 配置重新加载失败，继续使用旧配置: {e}")
+            return False
+
+        # 新配置已通过校验，同步模块中的变量（compile_active_pipeline 等直接读取模块）
+        for name in WATCHED_MODULES:
+            importlib.reload(importlib.import_module(name))
+
+        self.apply(snapshot)
+        return True
+
+    def apply(self, snapshot: ConfigSnapshot):
+        """把配置快照应用到所有已注册的引擎"""
+        self.snapshot = snapshot
+        self.reload_count = snapshot.version
+
+        for target in self.targets:
+            try:
+                target.apply_config(snapshot)
+            except Exception as e:
+                self.error_count += 1
+                logger.error(f"❌ 应用配置失败 ({type(target).__name__}): {e}")
+
+        logger.info(f"🔄 配置已热更新 (v{snapshot.version}): "
+                    f"{snapshot.filter_config.get('name')} "
+                    f"(hash: {snapshot.filter_pipeline.config_hash}), "
+                    f"{len(self.targets)} 个引擎")
+
+    async def run(self):
+        """轮询配置文件（在K线处理所在的事件循环中运行）"""
+        self._running = True
+        logger.info(f"👀 配置监视已启动: 每 {self.poll_interval}s 检查一次")
+        while self._running:
+            await asyncio.sleep(self.poll_interval)
+            self.check()
+
+    def stop(self):
+        """停止监视"""
+        self._running = False
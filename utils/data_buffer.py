@@ -1,16 +1,35 @@
 """
 数据缓冲区管理
 维护实时K线数据的滚动窗口
+
+K线存放在预分配的连续数组中（timestamp / datetime / open / high / low / close / volume 各一列），
+不为每根K线创建Python对象：
+
+    [ 已封闭K线 start..end ) [ 正在形成的K线 end ]
+    - 封闭当前K线只移动 end，超出容量时移动 start，均为 O(1)
+    - 正在形成的K线原地更新
+    - 数组容量为 2×max_size+1，写到末尾时把窗口整体搬回开头（均摊 O(1)）
+
+to_arrays / to_dataframe 返回按时间排序的数组视图（零拷贝），视图在下一次更新缓冲区之前有效
 """
 
+import numpy as np
 import pandas as pd
-from collections import deque
-from datetime import datetime
 from typing import Optional, Dict, List
 import logging
 
+from utils.trade_aggregator import aggregate_ticks
+
 logger = logging.getLogger(__name__)
 
+# 数值列（与 timestamp 一起组成 to_dataframe 的列）
+VALUE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+_OPEN, _HIGH, _LOW, _CLOSE, _VOLUME = range(len(VALUE_FIELDS))
+
+
+def _to_datetime64(value) -> np.datetime64:
+    return pd.Timestamp(value).to_datetime64()
+
 
 class KlineBuffer:
     """K线数据缓冲区"""
@@ -28,11 +47,15 @@ class KlineBuffer:
         self.timeframe = timeframe
         self.max_size = max_size
 
-        # 使用 deque 实现高效的滚动窗口
-        self.buffer = deque(maxlen=max_size)
+        # 预分配的列数组（已封闭K线 + 正在形成的K线，留出一倍空间用于滑动）
+        capacity = 2 * max_size + 1
+        self._timestamps = np.zeros(capacity, dtype='int64')
+        self._datetimes = np.zeros(capacity, dtype='datetime64[ns]')
+        self._values = np.zeros((len(VALUE_FIELDS), capacity), dtype='float64')
 
-        # 当前正在形成的K线
-        self.current_kline: Optional[Dict] = None
+        self._start = 0             # 第一根已封闭K线位置
+        self._end = 0               # 已封闭K线之后的位置（正在形成的K线所在位置）
+        self._has_current = False   # 是否有正在形成的K线
 
         logger.info(f"📊 初始化缓冲区: {symbol} {timeframe}, 容量: {max_size}")
 
@@ -43,21 +66,51 @@ class KlineBuffer:
         Args:
             historical_data: 历史K线数据
         """
-        self.buffer.clear()
+        df = historical_data.iloc[-self.max_size:] if self.max_size else historical_data.iloc[:0]
+        rows = len(df)
 
-        for _, row in historical_data.iterrows():
-            kline = {
-                'timestamp': int(row['timestamp']),
-                'datetime': row.name if isinstance(row.name, pd.Timestamp) else pd.to_datetime(row['timestamp'], unit='ms'),
-                'open': float(row['open']),
-                'high': float(row['high']),
-                'low': float(row['low']),
-                'close': float(row['close']),
-                'volume': float(row['volume'])
-            }
-            self.buffer.append(kline)
-
-        logger.info(f"✅ 缓冲区初始化完成: {len(self.buffer)} 条K线")
+        self._start, self._end, self._has_current = 0, rows, False
+        self._timestamps[:rows] = df['timestamp'].to_numpy(dtype='int64')
+        if isinstance(df.index, pd.DatetimeIndex):
+            self._datetimes[:rows] = df.index.values
+        else:
+            self._datetimes[:rows] = pd.to_datetime(self._timestamps[:rows], unit='ms').values
+        for i, field in enumerate(VALUE_FIELDS):
+            self._values[i, :rows] = df[field].to_numpy(dtype='float64')
+
+        logger.info(f"✅ 缓冲区初始化完成: {len(self)} 条K线")
+
+    # ==================== 底层写入 ====================
+
+    def _close_current(self):
+        """封闭正在形成的K线（它所在的位置成为最后一根已封闭K线）"""
+        self._end += 1
+        self._has_current = False
+        if self._end - self._start > self.max_size:
+            self._start += 1
+
+    def _set_current(self, timestamp: int, dt, open_: float, high: float, low: float,
+                     close: float, volume: float):
+        """写入新的正在形成的K线"""
+        if self._end == len(self._timestamps) - 1:
+            self._compact()
+        pos = self._end
+        self._timestamps[pos] = timestamp
+        self._datetimes[pos] = dt
+        values = self._values[:, pos]
+        values[_OPEN], values[_HIGH], values[_LOW], values[_CLOSE], values[_VOLUME] = \
+            open_, high, low, close, volume
+        self._has_current = True
+
+    def _compact(self):
+        """把已封闭K线窗口搬回数组开头"""
+        rows = self._end - self._start
+        self._timestamps[:rows] = self._timestamps[self._start:self._end]
+        self._datetimes[:rows] = self._datetimes[self._start:self._end]
+        self._values[:, :rows] = self._values[:, self._start:self._end]
+        self._start, self._end = 0, rows
+
+    # ==================== 更新 ====================
 
     def update_tick(self, price: float, volume: float, timestamp: int):
         """
@@ -68,49 +121,78 @@ class KlineBuffer:
             volume: 成交量
             timestamp: 时间戳（毫秒）
         """
-        dt = pd.to_datetime(timestamp, unit='ms')
+        dt = np.datetime64(int(timestamp), 'ms')
 
         # 判断是否需要创建新K线
-        if self.current_kline is None:
+        if not self._has_current:
             # 第一个tick，创建新K线
-            self.current_kline = {
-                'timestamp': timestamp,
-                'datetime': dt,
-                'open': price,
-                'high': price,
-                'low': price,
-                'close': price,
-                'volume': volume
-            }
+            self._set_current(timestamp, dt, price, price, price, price, volume)
         else:
             # 检查是否需要封闭当前K线
             if self._should_close_kline(timestamp):
-                # 封闭当前K线，加入缓冲区
-                self.buffer.append(self.current_kline.copy())
-
-                # 创建新K线
-                self.current_kline = {
-                    'timestamp': timestamp,
-                    'datetime': dt,
-                    'open': price,
-                    'high': price,
-                    'low': price,
-                    'close': price,
-                    'volume': volume
-                }
+                # 封闭当前K线，创建新K线
+                self._close_current()
+                self._set_current(timestamp, dt, price, price, price, price, volume)
 
                 logger.debug(f"🕐 新K线: {dt}, 开: {price}")
                 return True  # 返回True表示新K线
             else:
-                # 更新当前K线
-                self.current_kline['high'] = max(self.current_kline['high'], price)
-                self.current_kline['low'] = min(self.current_kline['low'], price)
-                self.current_kline['close'] = price
-                self.current_kline['volume'] += volume
-                self.current_kline['datetime'] = dt
+                # 原地更新当前K线
+                values = self._values[:, self._end]
+                values[_HIGH] = max(values[_HIGH], price)
+                values[_LOW] = min(values[_LOW], price)
+                values[_CLOSE] = price
+                values[_VOLUME] += volume
+                self._datetimes[self._end] = dt
 
         return False  # 返回False表示K线更新
 
+    def update_ticks(self, prices, volumes, timestamps) -> int:
+        """
+        批量更新tick数据（一次吸收一批突发成交，结果与逐个调用 update_tick 相同）
+
+        Args:
+            prices: 成交价数组
+            volumes: 成交量数组
+            timestamps: 时间戳数组（毫秒，按到达顺序）
+
+        Returns:
+            新产生的K线数量（0表示只更新了当前K线）
+        """
+        if len(timestamps) == 0:
+            return 0
+
+        timeframe_ms = self._get_timeframe_seconds() * 1000
+        floor_period = None
+        if self._has_current:
+            floor_period = int(self._timestamps[self._end]) // timeframe_ms
+
+        bars = aggregate_ticks(timestamps, prices, volumes, timeframe_ms, floor_period)
+        last_dts = bars['last_ts'].astype('datetime64[ms]')
+        new_klines = 0
+
+        for i in range(len(bars['period'])):
+            if i == 0 and floor_period is not None and bars['period'][0] == floor_period:
+                # 第一组属于当前K线
+                values = self._values[:, self._end]
+                values[_HIGH] = max(values[_HIGH], bars['high'][0])
+                values[_LOW] = min(values[_LOW], bars['low'][0])
+                values[_CLOSE] = bars['close'][0]
+                values[_VOLUME] += bars['volume'][0]
+                self._datetimes[self._end] = last_dts[0]
+                continue
+
+            if self._has_current:
+                self._close_current()
+                new_klines += 1
+
+            self._set_current(int(bars['first_ts'][i]), last_dts[i], bars['open'][i], bars['high'][i],
+                              bars['low'][i], bars['close'][i], bars['volume'][i])
+
+        if new_klines:
+            logger.debug(f"🕐 批量更新: {len(timestamps)} 笔成交, 新K线 {new_klines} 根")
+        return new_klines
+
     def update_kline(self, kline: Dict):
         """
         直接更新K线数据（来自WebSocket K线流）
@@ -119,20 +201,22 @@ class KlineBuffer:
             kline: K线数据字典
         """
         timestamp = kline['timestamp']
+        fields = (_to_datetime64(kline['datetime']), kline['open'], kline['high'], kline['low'],
+                  kline['close'], kline['volume'])
 
         # 检查是否是新K线
-        if self.current_kline is None or timestamp > self.current_kline['timestamp']:
+        if not self._has_current or timestamp > self._timestamps[self._end]:
             # 封闭旧K线
-            if self.current_kline is not None:
-                self.buffer.append(self.current_kline.copy())
+            if self._has_current:
+                self._close_current()
 
             # 设置新K线
-            self.current_kline = kline.copy()
+            self._set_current(timestamp, *fields)
             logger.debug(f"🕐 新K线: {kline['datetime']}")
             return True
         else:
             # 更新当前K线
-            self.current_kline = kline.copy()
+            self._set_current(timestamp, *fields)
             return False
 
     def _should_close_kline(self, timestamp: int) -> bool:
@@ -145,13 +229,13 @@ class KlineBuffer:
         Returns:
             是否应该封闭
         """
-        if self.current_kline is None:
+        if not self._has_current:
             return False
 
         # 根据时间周期判断
         timeframe_seconds = self._get_timeframe_seconds()
         current_period = timestamp // (timeframe_seconds * 1000)
-        kline_period = self.current_kline['timestamp'] // (timeframe_seconds * 1000)
+        kline_period = int(self._timestamps[self._end]) // (timeframe_seconds * 1000)
 
         return current_period > kline_period
 
@@ -168,35 +252,77 @@ class KlineBuffer:
         }
         return timeframe_map.get(self.timeframe, 3600)
 
-    def to_dataframe(self, include_current: bool = True) -> pd.DataFrame:
+    # ==================== 读取 ====================
+
+    @property
+    def current_kline(self) -> Optional[Dict]:
+        """当前正在形成的K线（副本）"""
+        if not self._has_current:
+            return None
+        return self._kline_at(self._end)
+
+    def _kline_at(self, pos: int) -> Dict:
+        values = self._values[:, pos]
+        kline = {
+            'timestamp': int(self._timestamps[pos]),
+            'datetime': pd.Timestamp(self._datetimes[pos]),
+        }
+        kline.update(zip(VALUE_FIELDS, values.tolist()))
+        return kline
+
+    def get_last_closed(self) -> Optional[Dict]:
+        """最后一根已封闭K线（副本）"""
+        if not len(self):
+            return None
+        return self._kline_at(self._end - 1)
+
+    def get_klines(self, include_current: bool = False) -> List[Dict]:
+        """K线字典列表（逐根创建对象，只用于调试/展示）"""
+        stop = self._end + (1 if include_current and self._has_current else 0)
+        return [self._kline_at(pos) for pos in range(self._start, stop)]
+
+    def to_arrays(self, include_current: bool = True) -> Dict[str, np.ndarray]:
         """
-        转换为DataFrame
+        按时间排序的列数组视图（零拷贝）
 
         Args:
             include_current: 是否包含当前正在形成的K线
 
         Returns:
-            DataFrame
+            {'timestamp', 'datetime', 'open', 'high', 'low', 'close', 'volume'}
         """
-        data = list(self.buffer)
+        stop = self._end + (1 if include_current and self._has_current else 0)
+        arrays = {
+            'timestamp': self._timestamps[self._start:stop],
+            'datetime': self._datetimes[self._start:stop],
+        }
+        for i, field in enumerate(VALUE_FIELDS):
+            arrays[field] = self._values[i, self._start:stop]
+        return arrays
 
-        if include_current and self.current_kline is not None:
-            data.append(self.current_kline)
+    def to_dataframe(self, include_current: bool = True) -> pd.DataFrame:
+        """
+        转换为DataFrame（列直接引用缓冲区数组，不复制；需要长期保留时请 copy()）
 
-        if not data:
-            return pd.DataFrame()
+        Args:
+            include_current: 是否包含当前正在形成的K线
 
-        df = pd.DataFrame(data)
-        df.set_index('datetime', inplace=True)
+        Returns:
+            DataFrame
+        """
+        arrays = self.to_arrays(include_current)
+        if len(arrays['timestamp']) == 0:
+            return pd.DataFrame()
 
-        return df
+        index = pd.DatetimeIndex(arrays.pop('datetime'), name='datetime')
+        return pd.DataFrame(arrays, index=index, copy=False)
 
     def get_latest_price(self) -> Optional[float]:
         """获取最新价格"""
-        if self.current_kline:
-            return self.current_kline['close']
-        elif self.buffer:
-            return self.buffer[-1]['close']
+        if self._has_current:
+            return float(self._values[_CLOSE, self._end])
+        elif len(self):
+            return float(self._values[_CLOSE, self._end - 1])
         return None
 
     def is_ready(self, min_periods: int = 200) -> bool:
@@ -209,11 +335,11 @@ class KlineBuffer:
         Returns:
             是否准备好
         """
-        return len(self.buffer) >= min_periods
+        return len(self) >= min_periods
 
     def __len__(self):
-        """缓冲区大小"""
-        return len(self.buffer)
+        """缓冲区大小（已封闭K线数）"""
+        return self._end - self._start
 
     def __repr__(self):
-        return f"KlineBuffer({self.symbol}, {self.timeframe}, {len(self.buffer)} klines)"
+        return f"KlineBuffer({self.symbol}, {self.timeframe}, {len(self)} klines)"
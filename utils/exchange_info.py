@@ -7,6 +7,9 @@ import ccxt
 import logging
 from typing import Dict, Optional
 
+from utils.market_cache import get_market_cache
+from utils.http_replay import get_http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,6 +35,7 @@ class ExchangeInfo:
         config = {
             'enableRateLimit': True,
             'timeout': 30000,
+            'session': get_http_session(),
         }
 
         if proxy:
@@ -50,7 +54,7 @@ class ExchangeInfo:
 
         try:
             logger.info("📡 正在加载交易所市场信息...")
-            self.exchange.load_markets()
+            get_market_cache().load_markets(self.exchange, self.exchange_name)
             self._loaded = True
             logger.info(f"✅ 已加载 {len(self.exchange.markets)} 个交易对信息")
         except Exception as e:
@@ -0,0 +1,125 @@
+"""
+跨进程读写锁（缓存序列级）
+每个缓存序列一个锁文件（data/cache/locks/BTC_USDT_1h.lock），基于 fcntl.flock：
+
+    读锁（共享）  多个回测进程可以同时读取同一序列
+    写锁（独占）  更新进程写入时，读者等待写入完成，不会读到写了一半的数据
+
+不同序列互不影响，更新 BTC 时读取 ETH 不需要等待
+
+同一线程内可重入：持有写锁时再获取读锁/写锁直接通过（merge_and_save 内部会读取缓存）；
+持有读锁时不能升级为写锁（两个进程同时升级会死锁），直接报错
+
+锁文件创建后不删除（删除后其他进程可能锁在已被删除的文件上，互斥失效）
+没有 fcntl 的平台（Windows）不加锁，只依靠写入时的原子替换
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+READ = 'read'
+WRITE = 'write'
+
+_POLL_INTERVAL = 0.05
+
+
+class LockTimeout(TimeoutError):
+    """等待缓存锁超时"""
+
+
+class SeriesLocks:
+    """缓存序列读写锁"""
+
+    def __init__(self, lock_dir: Path, timeout: Optional[float] = None):
+        """
+        Args:
+            lock_dir: 锁文件目录
+            timeout: 等待锁的最长时间（秒），None表示一直等待
+        """
+        self.lock_dir = Path(lock_dir)
+        self.timeout = timeout
+        self._local = threading.local()
+
+        if fcntl is None:
+            logger.warning("⚠️  当前平台不支持 fcntl，缓存读写锁已停用（写入仍为原子替换）")
+
+    def path(self, key: str) -> Path:
+        return self.lock_dir / f"{key}.lock"
+
+    def _held(self) -> Dict[str, list]:
+        """当前线程持有的锁 {序列名: [模式, 文件描述符, 重入次数]}"""
+        if not hasattr(self._local, 'held'):
+            self._local.held = {}
+        return self._local.held
+
+    def read(self, key: str):
+        """读锁（共享）"""
+        return self._lock(key, READ)
+
+    def write(self, key: str):
+        """写锁（独占）"""
+        return self._lock(key, WRITE)
+
+    @contextmanager
+    def _lock(self, key: str, mode: str):
+        held = self._held()
+        if key in held:
+            if held[key][0] == READ and mode == WRITE:
+                raise RuntimeError(f"持有读锁时不能获取写锁: {key}")
+            held[key][2] += 1
+            try:
+                yield
+            finally:
+                held[key][2] -= 1
+            return
+
+        fd = self._acquire(key, mode)
+        held[key] = [mode, fd, 1]
+        try:
+            yield
+        finally:
+            del held[key]
+            self._release(fd)
+
+    def _acquire(self, key: str, mode: str) -> Optional[int]:
+        if fcntl is None:
+            return None
+
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path(key), os.O_RDWR | os.O_CREAT, 0o644)
+        operation = fcntl.LOCK_SH if mode == READ else fcntl.LOCK_EX
+        try:
+            if self.timeout is None:
+                fcntl.flock(fd, operation)
+                return fd
+
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise LockTimeout(f"等待缓存{'读' if mode == READ else '写'}锁超时: {key}")
+                    time.sleep(_POLL_INTERVAL)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    @staticmethod
+    def _release(fd: Optional[int]):
+        if fd is not None:
+            # 关闭文件描述符即释放 flock
+            os.close(fd)
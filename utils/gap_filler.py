@@ -0,0 +1,129 @@
+"""
+实时K线缺口回填
+数据流断线重连（或丢消息）期间错过的K线不会再推送，缓冲区和指标状态会出现空洞
+
+GapFiller 包在K线回调外面，记录每路流最后一根K线的时间戳：
+    - 新K线时间戳比上一根晚超过一个周期：中间缺了K线
+    - 重连后的第一根新K线：上一根K线的最终值可能没有收到
+两种情况都用一次REST请求取回 [上一根, 新K线) 之间的全部K线，
+按时间顺序以 backfill=True、closed=True 交给回调，再交付当前K线
+
+RealtimeSignalEngine 对 backfill K线只更新缓冲区、推进指标状态，不生成信号
+单次回填最多 max_bars 根，缺口更长时只回填最近的部分（记录 truncated）
+
+使用方法：
+    filler = GapFiller(fetch)      # fetch(symbol, timeframe, since, limit) -> [[ts, o, h, l, c, v], ...]
+    stream.subscribe(symbol, '15m', filler.wrap(symbol, '15m', engine.on_kline))
+    filler.mark_reconnect()        # 重连后调用
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.timeframes import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class GapFiller:
+    """K线缺口检测与回填"""
+
+    def __init__(self, fetch: Callable[..., Awaitable[List[list]]], max_bars: int = 1000):
+        """
+        Args:
+            fetch: 异步获取K线 fetch(symbol, timeframe, since, limit)，返回 [[timestamp, open, high, low, close, volume], ...]
+            max_bars: 单次回填最多K线数（交易所单次请求上限）
+        """
+        self.fetch = fetch
+        self.max_bars = max_bars
+
+        self._last: Dict[Tuple[str, str], int] = {}     # 每路流最后交付的K线时间戳
+        self._reconnected = set()                       # 重连后尚未核对的流
+
+        self.stats = {
+            'gaps': 0,          # 检测到的缺口数（含重连核对）
+            'backfilled': 0,    # 回填交付的K线数
+            'truncated': 0,     # 缺口超过 max_bars 的次数
+            'errors': 0,        # 回填请求失败次数
+        }
+
+    def wrap(self, symbol: str, timeframe: str, callback: Callable) -> Callable:
+        """
+        包装K线回调
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            callback: 原回调 callback(kline)，可以是协程函数
+
+        Returns:
+            协程函数 on_kline(kline)
+        """
+        key = (symbol, timeframe)
+        timeframe_ms = timeframe_to_ms(timeframe)
+
+        async def on_kline(kline: Dict):
+            last = self._last.get(key)
+            timestamp = kline['timestamp']
+            if last is not None and (timestamp > last + timeframe_ms
+                                     or (timestamp > last and key in self._reconnected)):
+                await self._backfill(key, last, timestamp, timeframe_ms, callback)
+            if last is None or timestamp > last:
+                self._reconnected.discard(key)
+                self._last[key] = timestamp
+
+            await _call(callback, kline)
+
+        return on_kline
+
+    def mark_reconnect(self, keys: Optional[List[Tuple[str, str]]] = None):
+        """
+        标记重连（下一根新K线到达时核对上一根K线的最终值）
+
+        Args:
+            keys: [(symbol, timeframe)]，None表示全部
+        """
+        self._reconnected.update(keys if keys is not None else self._last)
+
+    async def _backfill(self, key: Tuple[str, str], last: int, timestamp: int,
+                        timeframe_ms: int, callback: Callable):
+        symbol, timeframe = key
+        missing = (timestamp - last) // timeframe_ms      # 含上一根（取最终值）
+        since = last
+        if missing > self.max_bars:
+            self.stats['truncated'] += 1
+            since = timestamp - self.max_bars * timeframe_ms
+            logger.warning(f"⚠️  {symbol} {timeframe} 缺口 {missing - 1} 根超过上限，只回填最近 {self.max_bars} 根")
+        self.stats['gaps'] += 1
+
+        try:
+            rows = await self.fetch(symbol, timeframe, since, min(missing, self.max_bars))
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ {symbol} {timeframe} 回填失败: {e}")
+            return
+
+        bars = [row for row in rows if since <= row[0] < timestamp]
+        for row in sorted(bars, key=lambda row: row[0]):
+            await _call(callback, {
+                'timestamp': int(row[0]),
+                'datetime': datetime.fromtimestamp(row[0] / 1000),
+                'open': float(row[1]),
+                'high': float(row[2]),
+                'low': float(row[3]),
+                'close': float(row[4]),
+                'volume': float(row[5]),
+                'closed': True,
+                'backfill': True,
+            })
+        self.stats['backfilled'] += len(bars)
+        if missing > 1:
+            logger.info(f"🩹 {symbol} {timeframe} 回填 {len(bars)} 根K线")
+
+
+async def _call(callback: Callable, kline: Dict):
+    result = callback(kline)
+    if asyncio.iscoroutine(result):
+        await result
@@ -0,0 +1,238 @@
+"""
+HTTP 录制/回放传输层
+挂在 requests.Session 上的 HTTPAdapter，所有经过该会话的请求（ccxt 同步交易所、
+BinanceDataClient、HyperliquidClient）都可以：
+
+- record: 正常请求，并把响应保存到本地归档（data/http_archive/<域名>/<请求指纹>.json）
+- replay: 不访问网络，按请求指纹返回归档中的响应（同一请求多次录制时按顺序回放，最后一个重复）
+          归档中没有的请求抛出 ReplayMissError（ConnectionError 子类，调用方按网络错误处理）
+
+回放时可以叠加延迟模型，离线压测/基准测试时得到可控、可复现的速度：
+    none      不延迟
+    fixed     固定延迟 fixed_ms
+    recorded  录制时的真实耗时 × scale
+    lognormal 对数正态分布（中位数 median_ms，离散度 sigma，固定随机种子）
+
+开启方式：config/storage_params.py 中 HTTP_REPLAY_PARAMS['mode']，或环境变量 HTTP_REPLAY_MODE=record/replay
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from config.storage_params import HTTP_REPLAY_PARAMS
+
+logger = logging.getLogger(__name__)
+
+MODES = (None, 'record', 'replay')
+
+# 回放时不再适用的响应头（内容已解码保存）
+_DROP_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length', 'connection')
+
+
+class ReplayMissError(requests.exceptions.ConnectionError):
+    """回放模式下归档中没有对应的请求"""
+
+
+class LatencyModel:
+    """回放延迟模型"""
+
+    def __init__(self, model: str = 'none', fixed_ms: float = 0, scale: float = 1.0,
+                 median_ms: float = 100, sigma: float = 0.5, seed: int = 0):
+        if model not in ('none', 'fixed', 'recorded', 'lognormal'):
+            raise ValueError(f"不支持的延迟模型: {model}")
+        self.model = model
+        self.fixed_ms = fixed_ms
+        self.scale = scale
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def delay_seconds(self, recorded_ms: float) -> float:
+        """
+        Args:
+            recorded_ms: 录制时该响应的真实耗时（毫秒）
+        """
+        if self.model == 'fixed':
+            return self.fixed_ms / 1000
+        if self.model == 'recorded':
+            return recorded_ms * self.scale / 1000
+        if self.model == 'lognormal':
+            with self._lock:
+                return float(self._rng.lognormal(np.log(self.median_ms), self.sigma)) / 1000
+        return 0.0
+
+
+def request_key(method: str, url: str, body: Optional[bytes] = None, ignore_params=()) -> str:
+    """请求指纹：方法 + URL（查询参数排序，去掉易变参数）+ 请求体"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in ignore_params)
+    normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+    digest = hashlib.sha256(f"{method.upper()} {normalized}".encode('utf-8'))
+    if body:
+        digest.update(body if isinstance(body, bytes) else body.encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+class ReplayAdapter(HTTPAdapter):
+    """录制/回放 HTTPAdapter"""
+
+    def __init__(self, mode: str, archive_dir: str = HTTP_REPLAY_PARAMS['archive_dir'],
+                 latency: Optional[LatencyModel] = None, ignore_params=(), **kwargs):
+        """
+        Args:
+            mode: 'record' 或 'replay'
+            archive_dir: 归档目录
+            latency: 回放延迟模型，默认不延迟
+            ignore_params: 计算请求指纹时忽略的查询参数（如 timestamp、signature）
+        """
+        super().__init__(**kwargs)
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"不支持的模式: {mode}")
+        self.mode = mode
+        self.archive_dir = Path(archive_dir)
+        self.latency = latency or LatencyModel()
+        self.ignore_params = tuple(ignore_params)
+
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, int] = {}   # 回放位置 {请求指纹: 已回放次数}
+        self._archives: Dict[str, Dict] = {}
+        self.stats = {'recorded': 0, 'replayed': 0, 'missed': 0}
+
+    def _path(self, host: str, key: str) -> Path:
+        return self.archive_dir / host.replace(':', '_') / f"{key}.json"
+
+    def _load_archive(self, path: Path) -> Optional[Dict]:
+        if path not in self._archives:
+            if not path.is_file():
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                self._archives[path] = json.load(f)
+        return self._archives[path]
+
+    def send(self, request, **kwargs):
+        key = request_key(request.method, request.url, request.body, self.ignore_params)
+        path = self._path(urlsplit(request.url).netloc, key)
+
+        if self.mode == 'record':
+            # response.elapsed 由 Session 在适配器返回之后才设置，这里自己计时
+            started = time.perf_counter()
+            response = super().send(request, **kwargs)
+            self._record(path, request, response, (time.perf_counter() - started) * 1000)
+            return response
+        return self._replay(path, key, request)
+
+    def _record(self, path: Path, request, response, elapsed_ms: float):
+        entry = {
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS},
+            'body': base64.b64encode(response.content).decode('ascii'),
+            'elapsed_ms': elapsed_ms,
+        }
+        with self._lock:
+            archive = self._load_archive(path) or {
+                'method': request.method,
+                'url': request.url,
+                'responses': [],
+            }
+            archive['responses'].append(entry)
+            self._archives[path] = archive
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(archive, f)
+            os.replace(tmp_path, path)
+            self.stats['recorded'] += 1
+
+    def _replay(self, path: Path, key: str, request):
+        with self._lock:
+            archive = self._load_archive(path)
+            if archive is None:
+                self.stats['missed'] += 1
+                raise ReplayMissError(f"归档中没有该请求: {request.method} {request.url}", request=request)
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+            self.stats['replayed'] += 1
+        entry = archive['responses'][min(index, len(archive['responses']) - 1)]
+
+        delay = self.latency.delay_seconds(entry['elapsed_ms'])
+        if delay > 0:
+            time.sleep(delay)
+        return self._build_response(request, entry, delay)
+
+    @staticmethod
+    def _build_response(request, entry: Dict, delay: float) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = base64.b64decode(entry['body'])
+        response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=delay)
+        return response
+
+    def rewind(self):
+        """回放位置归零（同一归档重复压测）"""
+        with self._lock:
+            self._cursors.clear()
+
+
+def build_latency_model(params: Optional[Dict] = None) -> LatencyModel:
+    """由 HTTP_REPLAY_PARAMS['latency'] 创建延迟模型"""
+    params = dict(HTTP_REPLAY_PARAMS['latency'] if params is None else params)
+    return LatencyModel(params.pop('model', 'none'), **params)
+
+
+def replay_mode() -> Optional[str]:
+    """当前录制/回放模式（环境变量 HTTP_REPLAY_MODE 优先）"""
+    mode = os.getenv('HTTP_REPLAY_MODE') or HTTP_REPLAY_PARAMS.get('mode')
+    if mode not in MODES:
+        raise ValueError(f"不支持的 HTTP_REPLAY_MODE: {mode}")
+    return mode
+
+
+def get_http_session(mode: Optional[str] = None, archive_dir: Optional[str] = None,
+                     latency: Optional[LatencyModel] = None) -> requests.Session:
+    """
+    创建 requests 会话（开启录制/回放时挂载 ReplayAdapter，否则为普通会话）
+
+    Args:
+        mode: 'record' / 'replay'，默认取 replay_mode()
+        archive_dir: 归档目录，默认 HTTP_REPLAY_PARAMS['archive_dir']
+        latency: 回放延迟模型，默认 HTTP_REPLAY_PARAMS['latency']
+    """
+    session = requests.Session()
+    mode = mode or replay_mode()
+    if mode is None:
+        return session
+
+    adapter = ReplayAdapter(
+        mode,
+        archive_dir or HTTP_REPLAY_PARAMS['archive_dir'],
+        latency or build_latency_model(),
+        ignore_params=HTTP_REPLAY_PARAMS.get('ignore_params', ()),
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    logger.info(f"🎞️  HTTP {'录制' if mode == 'record' else '回放'}模式: {adapter.archive_dir}")
+    return session
@@ -14,9 +14,11 @@ from datetime import datetime
 try:
     from utils.data_persistence import DataPersistence
     from utils.binance_data_client import BinanceDataClient
+    from utils.http_replay import get_http_session
 except ImportError:
     from data_persistence import DataPersistence
     from binance_data_client import BinanceDataClient
+    from http_replay import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +43,9 @@ class HyperliquidClient:
         self.base_url = base_url
         self.info_url = f"{base_url}/info"
 
+        # 复用连接的会话（支持HTTP录制/回放，见 utils/http_replay.py）
+        self.session = get_http_session()
+
         # 交易对映射：将交易所格式转换为Hyperliquid格式
         self.symbol_map = {
             'BTC/USDT': 'BTC',
@@ -155,7 +160,7 @@ class HyperliquidClient:
                 "type": "metaAndAssetCtxs"
             }
 
-            response = requests.post(self.info_url, json=payload, timeout=10)
+            response = self.session.post(self.info_url, json=payload, timeout=10)
             response.raise_for_status()
 
             data = response.json()
@@ -239,7 +244,7 @@ class HyperliquidClient:
                 "type": "metaAndAssetCtxs"
             }
 
-            response = requests.post(self.info_url, json=payload, timeout=10)
+            response = self.session.post(self.info_url, json=payload, timeout=10)
             response.raise_for_status()
 
             data = response.json()
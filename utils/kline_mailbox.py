@@ -0,0 +1,207 @@
+"""
+K线邮箱：数据流回调与信号引擎之间的合并/背压层
+
+数据流回调只把K线放进邮箱（不等待引擎处理），每个 交易对×周期 一个邮箱和一个消费协程：
+
+    - 正在形成的K线只保留最新一次更新（引擎处理慢时，中间的更新被合并掉，不再逐个处理过时数据）
+    - 封闭的K线从不丢弃：新K线到达时，上一根K线最后一次更新作为它的最终值排队交付
+      （K线带 closed=True 标记时同样排队）
+    - 交付顺序：先按时间顺序交付排队的封闭K线，再交付最新的形成中K线
+
+每个邮箱统计收到/交付/合并丢弃的更新数、当前与最大积压深度，MailboxGroup 汇总所有邮箱
+
+使用方法：
+    group = MailboxGroup()
+    manager.subscribe('BTC/USDT', '15m', group.mailbox('BTC/USDT', '15m', engine.on_kline).put)
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class KlineMailbox:
+    """单个 交易对×周期 的最新值邮箱"""
+
+    def __init__(self, handler: Callable, name: str = ''):
+        """
+        Args:
+            handler: 消费函数 handler(kline)，可以是协程函数（如 RealtimeSignalEngine.on_kline）
+            name: 名称（日志用）
+        """
+        self.handler = handler
+        self.name = name
+
+        self._closes = deque()                  # 待交付的封闭K线（按时间顺序）
+        self._latest: Optional[Dict] = None     # 待交付的形成中K线（只保留最新）
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._busy = False                      # 消费函数正在处理
+
+        self.stats = {
+            'received': 0,      # 收到的更新数
+            'delivered': 0,     # 交付给引擎的更新数
+            'coalesced': 0,     # 被更新的同一根K线覆盖而丢弃的更新数
+            'closes': 0,        # 排队交付的封闭K线数
+            'stale': 0,         # 早于待交付K线、直接丢弃的更新数
+            'errors': 0,        # 引擎处理失败次数
+            'max_depth': 0,     # 最大积压深度
+        }
+
+    @property
+    def depth(self) -> int:
+        """当前积压深度（待交付的更新数）"""
+        return len(self._closes) + (self._latest is not None)
+
+    def put(self, kline: Dict):
+        """
+        放入一次K线更新（不阻塞，可直接作为数据流回调）
+
+        需要在事件循环中调用（首次调用时启动消费协程）
+        """
+        self.stats['received'] += 1
+        timestamp = kline['timestamp']
+        latest = self._latest
+
+        if latest is not None and timestamp < latest['timestamp']:
+            # 乱序到达的旧K线：封闭的照常排队（保持时间顺序），形成中的更新已过时
+            if kline.get('closed'):
+                self._enqueue_close(kline)
+            else:
+                self.stats['stale'] += 1
+        elif kline.get('closed'):
+            # 交易所标记的最终值，取代同一根K线未交付的更新
+            if latest is not None and latest['timestamp'] == timestamp:
+                self.stats['coalesced'] += 1
+                self._latest = None
+            elif latest is not None:
+                self._enqueue_close(latest)
+                self._latest = None
+            self._enqueue_close(kline)
+        elif latest is None:
+            self._latest = kline
+        elif timestamp == latest['timestamp']:
+            self.stats['coalesced'] += 1
+            self._latest = kline
+        else:
+            # 新K线开始：上一根K线最后一次更新即为它的最终值
+            self._enqueue_close(latest)
+            self._latest = kline
+
+        self.stats['max_depth'] = max(self.stats['max_depth'], self.depth)
+        self._wake()
+
+    def _enqueue_close(self, kline: Dict):
+        self._closes.append(kline)
+        self.stats['closes'] += 1
+
+    def _wake(self):
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._consume())
+        self._ready.set()
+
+    def _take(self) -> Optional[Dict]:
+        if self._closes:
+            return self._closes.popleft()
+        kline, self._latest = self._latest, None
+        return kline
+
+    async def _consume(self):
+        """消费协程：有更新时依次交付，处理期间到达的更新在邮箱中合并"""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+
+            while True:
+                kline = self._take()
+                if kline is None:
+                    break
+                self._busy = True
+                try:
+                    result = self.handler(kline)
+                    if asyncio.iscoroutine(result):
+                        await result
+                    self.stats['delivered'] += 1
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"❌ {self.name} 处理K线失败: {e}")
+                finally:
+                    self._busy = False
+                # 让出事件循环，其他邮箱与数据流接收不被饿死
+                await asyncio.sleep(0)
+
+    async def drain(self):
+        """等待当前积压全部交付"""
+        while self.depth or self._busy:
+            await asyncio.sleep(0)
+
+    async def close(self):
+        """停止消费协程（未交付的更新被丢弃）"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class MailboxGroup:
+    """一组邮箱（汇总统计）"""
+
+    def __init__(self):
+        self.mailboxes: Dict[str, KlineMailbox] = {}
+
+    def mailbox(self, symbol: str, timeframe: str, handler: Callable) -> KlineMailbox:
+        """
+        创建（或获取已有的）邮箱，同一路K线的不同消费函数各用一个邮箱
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            handler: 消费函数 handler(kline)
+        """
+        base = name = f"{symbol} {timeframe}"
+        n = 1
+        while name in self.mailboxes:
+            if self.mailboxes[name].handler == handler:
+                return self.mailboxes[name]
+            n += 1
+            name = f"{base} #{n}"
+        self.mailboxes[name] = KlineMailbox(handler, name)
+        return self.mailboxes[name]
+
+    def get_stats(self) -> Dict:
+        """
+        汇总统计
+
+        Returns:
+            {'mailboxes', 'depth', 'received', 'delivered', 'coalesced', 'closes', 'stale', 'errors',
+             'max_depth', 'busiest': 当前积压最深的邮箱}
+        """
+        totals = {'mailboxes': len(self.mailboxes), 'depth': 0}
+        busiest, busiest_depth = None, 0
+        for name, box in self.mailboxes.items():
+            totals['depth'] += box.depth
+            for key, value in box.stats.items():
+                if key == 'max_depth':
+                    totals[key] = max(totals.get(key, 0), value)
+                else:
+                    totals[key] = totals.get(key, 0) + value
+            if box.depth > busiest_depth:
+                busiest, busiest_depth = name, box.depth
+        totals['busiest'] = busiest
+        return totals
+
+    def log_stats(self):
+        """打印一行汇总统计"""
+        stats = self.get_stats()
+        if not stats['mailboxes']:
+            return
+        logger.info(f"📬 邮箱: {stats['mailboxes']} 个, 积压 {stats['depth']} (最大 {stats['max_depth']}), "
+                    f"收到 {stats['received']}, 交付 {stats['delivered']}, 合并 {stats['coalesced']}, "
+                    f"封闭K线 {stats['closes']}")
+
+    async def close(self):
+        await asyncio.gather(*(box.close() for box in self.mailboxes.values()))
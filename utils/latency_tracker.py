@@ -0,0 +1,173 @@
+"""
+实时链路延迟追踪
+每根K线在链路各阶段打时间戳，按 交易对×周期 与阶段保存最近 window 个样本（滚动窗口），
+用于查看多个交易对同时封闭K线时的尾部延迟：
+
+    network          交易所事件时间 → 本地收到（StreamManager 的 E 字段；依赖本机时钟同步，可能为负）
+    queue            本地收到 → 引擎开始处理（邮箱/回调排队）
+    indicator        引擎处理K线封闭：推进指标状态 + 生成信号（不含信号回调）
+    callback         on_signal_change 回调耗时
+    close_to_signal  K线周期结束 → 信号生成完成（端到端）
+
+network / queue 每条K线更新都记录，其余阶段只在K线封闭时记录
+K线字典上的时间字段（由数据流写入）：event_time（交易所事件时间，毫秒）、received_at（本地收到，秒）
+
+使用方法：
+    tracker = get_latency_tracker()
+    tracker.get_stats()['stages']['close_to_signal']   # {'count', 'mean', 'p50', 'p90', 'p99', 'max'}（毫秒）
+    tracker.log_summary()
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('network', 'queue', 'indicator', 'callback', 'close_to_signal')
+
+# 直方图分桶上限（毫秒）
+HISTOGRAM_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class _RollingWindow:
+    """最近 size 个样本（毫秒，环形数组）"""
+
+    __slots__ = ('samples', 'count', 'pos')
+
+    def __init__(self, size: int):
+        self.samples = np.empty(size, dtype='float64')
+        self.count = 0
+        self.pos = 0
+
+    def add(self, value_ms: float):
+        self.samples[self.pos] = value_ms
+        self.pos = (self.pos + 1) % len(self.samples)
+        self.count = min(self.count + 1, len(self.samples))
+
+    def values(self) -> np.ndarray:
+        return self.samples[:self.count]
+
+
+def _describe(values: np.ndarray) -> Dict:
+    if len(values) == 0:
+        return {'count': 0}
+    p50, p90, p99 = np.percentile(values, (50, 90, 99))
+    return {
+        'count': len(values),
+        'mean': round(float(values.mean()), 3),
+        'p50': round(float(p50), 3),
+        'p90': round(float(p90), 3),
+        'p99': round(float(p99), 3),
+        'max': round(float(values.max()), 3),
+    }
+
+
+class LatencyTracker:
+    """分阶段延迟统计"""
+
+    def __init__(self, window: int = 1024):
+        """
+        Args:
+            window: 每个 交易对×阶段 保留的样本数
+        """
+        self.window = window
+        self._windows: Dict[str, Dict[str, _RollingWindow]] = {}
+
+    def record(self, key: str, stage: str, seconds: float):
+        """
+        记录一个样本
+
+        Args:
+            key: 交易对×周期，如 'BTC/USDT 15m'
+            stage: 阶段，见 STAGES
+            seconds: 耗时（秒）
+        """
+        stages = self._windows.get(key)
+        if stages is None:
+            stages = self._windows[key] = {}
+        window = stages.get(stage)
+        if window is None:
+            if stage not in STAGES:
+                raise ValueError(f"未知的延迟阶段: {stage}")
+            window = stages[stage] = _RollingWindow(self.window)
+        window.add(seconds * 1000)
+
+    def _values(self, stage: str, key: Optional[str] = None) -> np.ndarray:
+        keys = [key] if key is not None else list(self._windows)
+        parts = [self._windows[k][stage].values() for k in keys
+                 if k in self._windows and stage in self._windows[k]]
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def summary(self, key: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        各阶段统计（毫秒）
+
+        Args:
+            key: 交易对×周期，None表示汇总所有交易对
+
+        Returns:
+            {stage: {'count', 'mean', 'p50', 'p90', 'p99', 'max'}}
+        """
+        return {stage: _describe(self._values(stage, key)) for stage in STAGES}
+
+    def histogram(self, stage: str, key: Optional[str] = None) -> Dict[str, int]:
+        """
+        阶段延迟分布
+
+        Returns:
+            {'≤1ms': n, '≤2ms': n, ..., '>5000ms': n}
+        """
+        values = self._values(stage, key)
+        edges = (-np.inf,) + HISTOGRAM_EDGES_MS + (np.inf,)
+        counts, _ = np.histogram(values, bins=edges)
+        labels = [f"≤{edge}ms" for edge in HISTOGRAM_EDGES_MS] + [f">{HISTOGRAM_EDGES_MS[-1]}ms"]
+        return dict(zip(labels, counts.tolist()))
+
+    def get_stats(self, top: int = 5) -> Dict:
+        """
+        全部统计
+
+        Args:
+            top: 列出端到端 p99 最高的交易对数
+
+        Returns:
+            {'stages': 汇总统计, 'symbols': {key: 各阶段统计}, 'slowest': [(key, close_to_signal p99), ...]}
+        """
+        symbols = {key: self.summary(key) for key in self._windows}
+        ranked = sorted(((key, s['close_to_signal']['p99']) for key, s in symbols.items()
+                         if s['close_to_signal']['count']), key=lambda item: item[1], reverse=True)
+        return {'stages': self.summary(), 'symbols': symbols, 'slowest': ranked[:top]}
+
+    def log_summary(self, top: int = 3):
+        """打印各阶段汇总与最慢的交易对"""
+        stats = self.get_stats(top)
+        parts = [f"{stage} p50/p99 {s['p50']:.1f}/{s['p99']:.1f}ms" for stage, s in stats['stages'].items() if s['count']]
+        if not parts:
+            return
+        logger.info(f"⏱️  延迟（{len(stats['symbols'])} 路）: " + ", ".join(parts))
+        if stats['slowest']:
+            logger.info("⏱️  端到端最慢: " + ", ".join(f"{key} {p99:.1f}ms" for key, p99 in stats['slowest']))
+
+    async def report_periodically(self, interval: float = 60):
+        """每 interval 秒打印一次汇总（作为后台任务运行）"""
+        while True:
+            await asyncio.sleep(interval)
+            self.log_summary()
+
+    def reset(self):
+        """清空所有样本"""
+        self._windows.clear()
+
+
+_latency_tracker = None
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """获取默认延迟追踪器（单例）"""
+    global _latency_tracker
+    if _latency_tracker is None:
+        _latency_tracker = LatencyTracker()
+    return _latency_tracker
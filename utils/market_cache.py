@@ -0,0 +1,112 @@
+"""
+交易所市场信息磁盘缓存
+load_markets 需要请求交易所（币安数秒），而交易对列表、精度等信息很少变化。
+缓存到 data/cache/markets/binance_spot.json，有效期内直接 exchange.set_markets()，不访问网络
+
+多个进程/采集器/ExchangeInfo 共享同一份缓存文件（临时文件 + 原子替换写入）
+"""
+
+import json
+import os
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+from config.storage_params import MARKET_CACHE_PARAMS
+
+logger = logging.getLogger(__name__)
+
+
+class MarketCache:
+    """市场信息缓存"""
+
+    def __init__(self, cache_dir: str = MARKET_CACHE_PARAMS['cache_dir'],
+                 ttl_hours: float = MARKET_CACHE_PARAMS['ttl_hours']):
+        """
+        Args:
+            cache_dir: 缓存目录
+            ttl_hours: 有效期（小时），过期后重新请求交易所
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_hours * 3600
+
+    def path(self, exchange_name: str, market_type: str = 'spot') -> Path:
+        return self.cache_dir / f"{exchange_name}_{market_type}.json"
+
+    def load(self, exchange_name: str, market_type: str = 'spot') -> Optional[Dict]:
+        """
+        读取未过期的缓存
+
+        Returns:
+            {'saved_at', 'hostname', 'markets', 'currencies'}，不存在、过期或损坏时为None
+        """
+        path = self.path(exchange_name, market_type)
+        if not path.is_file():
+            return None
+        if time.time() - path.stat().st_mtime > self.ttl_seconds:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  市场信息缓存损坏，将重新加载: {e}")
+            return None
+
+    def save(self, exchange_name: str, market_type: str, exchange, hostname: Optional[str] = None):
+        """保存交易所当前已加载的市场信息"""
+        payload = {
+            'saved_at': int(time.time()),
+            'hostname': hostname,
+            'markets': exchange.markets,
+            'currencies': exchange.currencies or None,
+        }
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(exchange_name, market_type)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning(f"⚠️  保存市场信息缓存失败: {e}")
+
+    def load_markets(self, exchange, exchange_name: str, market_type: str = 'spot',
+                     hostname: Optional[str] = None, reload: bool = False) -> Dict:
+        """
+        加载市场信息：缓存有效时直接注入交易所实例，否则请求交易所并写入缓存
+
+        Args:
+            exchange: ccxt 交易所实例
+            exchange_name: 交易所名称（缓存文件名）
+            market_type: 市场类型（缓存文件名）
+            hostname: 当前使用的域名（一起缓存，下次启动直接使用）
+            reload: 忽略缓存强制重新加载
+
+        Returns:
+            exchange.markets
+        """
+        cached = None if reload else self.load(exchange_name, market_type)
+        if cached is not None:
+            exchange.set_markets(cached['markets'], cached.get('currencies'))
+            age_min = (time.time() - cached['saved_at']) / 60
+            logger.info(f"✅ 使用缓存的市场信息: {len(exchange.markets)} 个交易对 ({age_min:.0f} 分钟前)")
+            return exchange.markets
+
+        exchange.load_markets(reload=True)
+        self.save(exchange_name, market_type, exchange, hostname)
+        return exchange.markets
+
+
+# ==================== 全局实例 ====================
+
+_market_cache = None
+
+
+def get_market_cache() -> MarketCache:
+    """获取默认市场信息缓存（单例）"""
+    global _market_cache
+    if _market_cache is None:
+        _market_cache = MarketCache()
+    return _market_cache
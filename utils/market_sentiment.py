@@ -9,6 +9,8 @@ import time
 from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
 
+from utils.http_replay import get_http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,6 +32,7 @@ class MarketSentiment:
             'enableRateLimit': True,
             'options': {'defaultType': 'future'},
             'timeout': 30000,
+            'session': get_http_session(),  # 支持HTTP录制/回放（utils/http_replay.py）
         }
 
         if proxy:
@@ -0,0 +1,308 @@
+"""
+市场状态时间线
+按 MARKET_REGIME_PARAMS 阈值向量化识别每根K线的市场状态
+（规则与 StrategyEngine.identify_market_regime 一致），
+并把连续相同状态压缩为 (开始, 结束, 状态) 区间
+
+用途：
+- 快速区间查询：某段时间内经历了哪些市场状态
+- 分状态统计：各状态下的K线收益、回测交易表现
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.cache_storage import _tmp_path
+from utils.indicators import calculate_adx, calculate_bbw
+
+logger = logging.getLogger(__name__)
+
+REGIMES = ('STRONG_TREND', 'TREND', 'RANGE', 'SQUEEZE', 'NEUTRAL')
+
+# 影响状态识别的参数（用于判断已保存的时间线是否过期）
+REGIME_PARAM_KEYS = (
+    'adx_period', 'adx_trend_threshold', 'adx_weak_trend_threshold', 'adx_range_threshold',
+    'bbw_period', 'bbw_ma_period', 'bbw_high_threshold', 'bbw_squeeze_threshold',
+)
+
+
+def regime_params_hash(params: Dict) -> str:
+    """状态识别参数的指纹"""
+    relevant = {key: params[key] for key in REGIME_PARAM_KEYS}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def classify_regimes(adx, bbw, bbw_ma, params: Dict) -> np.ndarray:
+    """
+    向量化识别市场状态（NaN 与逐根识别一样落到 NEUTRAL）
+
+    Args:
+        adx: ADX数组
+        bbw: 布林带宽度数组
+        bbw_ma: 布林带宽度均值数组
+        params: MARKET_REGIME_PARAMS
+
+    Returns:
+        状态字符串数组
+    """
+    adx = np.asarray(adx, dtype='float64')
+    bbw = np.asarray(bbw, dtype='float64')
+    bbw_ma = np.asarray(bbw_ma, dtype='float64')
+
+    with np.errstate(invalid='ignore'):
+        conditions = [
+            (adx > params['adx_trend_threshold']) & (bbw > params['bbw_high_threshold']),
+            (adx > params['adx_weak_trend_threshold']) & (bbw > bbw_ma),
+            (adx < params['adx_range_threshold']) & (bbw < bbw_ma),
+            bbw < params['bbw_squeeze_threshold'],
+        ]
+    return np.select(conditions, list(REGIMES[:4]), default='NEUTRAL').astype(object)
+
+
+def _timestamps_ms(df: pd.DataFrame) -> np.ndarray:
+    if 'timestamp' in df.columns:
+        return df['timestamp'].to_numpy(dtype='int64')
+    return df.index.values.astype('datetime64[ms]').astype('int64')
+
+
+class RegimeTimeline:
+    """市场状态区间（按时间排序、互不重叠）"""
+
+    def __init__(self, starts, ends, regimes, bars, params_hash: str = '', data_end: Optional[int] = None):
+        """
+        Args:
+            starts: 区间第一根K线的开盘时间（毫秒）
+            ends: 区间最后一根K线的开盘时间（毫秒）
+            regimes: 区间状态
+            bars: 区间K线数
+            params_hash: 生成时使用的参数指纹
+            data_end: 生成时数据的最后一根K线时间（毫秒）
+        """
+        self.starts = np.asarray(starts, dtype='int64')
+        self.ends = np.asarray(ends, dtype='int64')
+        self.regimes = np.asarray(regimes, dtype=object)
+        self.bars = np.asarray(bars, dtype='int64')
+        self.params_hash = params_hash
+        self.data_end = data_end
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, params: Optional[Dict] = None) -> 'RegimeTimeline':
+        """
+        从OHLCV数据生成时间线（已有 adx/bbw/bbw_ma 列时直接使用）
+
+        Args:
+            df: OHLCV数据（或已计算指标的数据）
+            params: 状态识别参数，默认 MARKET_REGIME_PARAMS
+        """
+        if params is None:
+            from config.strategy_params import MARKET_REGIME_PARAMS
+            params = MARKET_REGIME_PARAMS
+
+        if {'adx', 'bbw', 'bbw_ma'}.issubset(df.columns):
+            adx, bbw, bbw_ma = df['adx'], df['bbw'], df['bbw_ma']
+        else:
+            adx = calculate_adx(df, params['adx_period'])[0]
+            bbw = calculate_bbw(df, params['bbw_period'])
+            bbw_ma = bbw.rolling(params['bbw_ma_period']).mean()
+
+        regimes = classify_regimes(adx, bbw, bbw_ma, params)
+        timestamps = _timestamps_ms(df)
+
+        if len(regimes) == 0:
+            return cls([], [], [], [], regime_params_hash(params))
+
+        # 连续相同状态压缩为区间
+        change = np.flatnonzero(regimes[1:] != regimes[:-1]) + 1
+        first = np.concatenate(([0], change))
+        last = np.concatenate((change - 1, [len(regimes) - 1]))
+
+        return cls(
+            starts=timestamps[first],
+            ends=timestamps[last],
+            regimes=regimes[first],
+            bars=last - first + 1,
+            params_hash=regime_params_hash(params),
+            data_end=int(timestamps[-1]),
+        )
+
+    # ==================== 查询 ====================
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """区间表：start, end, regime, bars"""
+        return pd.DataFrame({
+            'start': pd.to_datetime(self.starts, unit='ms'),
+            'end': pd.to_datetime(self.ends, unit='ms'),
+            'regime': self.regimes,
+            'bars': self.bars,
+        })
+
+    def query(self, start=None, end=None, regime: Optional[str] = None) -> pd.DataFrame:
+        """
+        查询与 [start, end] 有重叠的区间（二分查找）
+
+        Args:
+            start: 开始时间（可解析的时间或毫秒时间戳）
+            end: 结束时间
+            regime: 只返回某个状态
+
+        Returns:
+            区间表
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.ends, _to_ms(start), side='left'))
+        hi = len(self) if end is None else int(np.searchsorted(self.starts, _to_ms(end), side='right'))
+
+        segments = self.to_dataframe().iloc[lo:hi]
+        if regime is not None:
+            segments = segments[segments['regime'] == regime]
+        return segments
+
+    def regime_at(self, timestamp) -> Optional[str]:
+        """某个时间点所处的市场状态"""
+        labels = self.label([_to_ms(timestamp)])
+        return labels[0]
+
+    def label(self, timestamps) -> np.ndarray:
+        """
+        把时间点映射回市场状态（不在时间线覆盖范围内的为 None）
+
+        Args:
+            timestamps: 毫秒时间戳数组或 DatetimeIndex
+        """
+        if isinstance(timestamps, pd.DatetimeIndex):
+            timestamps = timestamps.values.astype('datetime64[ms]').astype('int64')
+        timestamps = np.asarray(timestamps, dtype='int64')
+
+        idx = np.searchsorted(self.starts, timestamps, side='right') - 1
+        labels = np.full(len(timestamps), None, dtype=object)
+        if len(self) == 0:
+            return labels
+
+        inside = idx >= 0
+        if self.data_end is not None:
+            inside &= timestamps <= self.data_end
+        labels[inside] = self.regimes[idx[inside]]
+        return labels
+
+    # ==================== 分状态统计 ====================
+
+    def summary(self) -> pd.DataFrame:
+        """各状态的区间数、K线数、占比、平均/最长持续K线数"""
+        segments = self.to_dataframe()
+        if segments.empty:
+            return pd.DataFrame(columns=['segments', 'bars', 'pct', 'avg_bars', 'max_bars'])
+
+        grouped = segments.groupby('regime')['bars']
+        summary = pd.DataFrame({
+            'segments': grouped.size(),
+            'bars': grouped.sum(),
+            'avg_bars': grouped.mean(),
+            'max_bars': grouped.max(),
+        })
+        summary['pct'] = summary['bars'] / summary['bars'].sum() * 100
+        return summary[['segments', 'bars', 'pct', 'avg_bars', 'max_bars']]
+
+    def return_stats(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        各状态下的K线收益统计（收益计入该K线所处的状态）
+
+        Args:
+            df: OHLCV数据
+
+        Returns:
+            bars, mean_return_pct, volatility_pct, total_return_pct, up_ratio
+        """
+        returns = df['close'].pct_change().to_numpy() * 100
+        labels = self.label(_timestamps_ms(df))
+        frame = pd.DataFrame({'regime': labels, 'ret': returns}).dropna()
+
+        grouped = frame.groupby('regime')['ret']
+        return pd.DataFrame({
+            'bars': grouped.size(),
+            'mean_return_pct': grouped.mean(),
+            'volatility_pct': grouped.std(),
+            'total_return_pct': grouped.apply(lambda r: (np.prod(1 + r / 100) - 1) * 100),
+            'up_ratio': grouped.apply(lambda r: (r > 0).mean() * 100),
+        })
+
+    def trade_stats(self, trades: List[Dict]) -> pd.DataFrame:
+        """
+        按开仓时的市场状态统计回测交易（FastBacktest.trades 格式：BUY/SELL 成对）
+
+        Returns:
+            trades, win_rate, total_profit, avg_profit_pct
+        """
+        entries, exits = [], []
+        entry = None
+        for trade in trades:
+            if trade['type'] == 'BUY':
+                entry = trade
+            elif trade['type'] == 'SELL' and entry is not None:
+                entries.append(entry['timestamp'])
+                exits.append(trade)
+                entry = None
+
+        columns = ['trades', 'win_rate', 'total_profit', 'avg_profit_pct']
+        if not exits:
+            return pd.DataFrame(columns=columns)
+
+        frame = pd.DataFrame({
+            'regime': self.label(pd.DatetimeIndex(entries)),
+            'profit': [t['profit'] for t in exits],
+            'profit_pct': [t['profit_pct'] for t in exits],
+        })
+        frame['regime'] = frame['regime'].fillna('UNKNOWN')
+
+        grouped = frame.groupby('regime')
+        return pd.DataFrame({
+            'trades': grouped.size(),
+            'win_rate': grouped['profit'].apply(lambda p: (p > 0).mean() * 100),
+            'total_profit': grouped['profit'].sum(),
+            'avg_profit_pct': grouped['profit_pct'].mean(),
+        })[columns]
+
+    # ==================== 持久化 ====================
+
+    def save(self, path: Path):
+        """保存为JSON（区间数通常只有数百到数千个，临时文件 + 原子替换写入）"""
+        payload = {
+            'params_hash': self.params_hash,
+            'data_end': self.data_end,
+            'segments': [
+                [int(s), int(e), r, int(b)]
+                for s, e, r, b in zip(self.starts, self.ends, self.regimes, self.bars)
+            ],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _tmp_path(path)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, path: Path) -> 'RegimeTimeline':
+        """从JSON加载"""
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+
+        segments = payload['segments']
+        columns = list(zip(*segments)) if segments else [[], [], [], []]
+        return cls(*columns, params_hash=payload['params_hash'], data_end=payload['data_end'])
+
+
+def _to_ms(value) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).value // 1_000_000)
@@ -0,0 +1,285 @@
+"""
+编译后的信号过滤管线
+启动时把 signal_filter_config 预设方案编译为不可变、已校验的有序谓词列表
+
+每个谓词同时支持：
+- 单根K线：apply() 作用于信号字典（与 StrategyEngineV73 原有过滤语义一致）
+- 向量化：evaluate() 作用于整段历史的数组（用于批量回测/方案对比）
+
+config_hash 只由参与过滤的参数决定，可作为缓存键
+"""
+
+import hashlib
+import json
+import logging
+from typing import Dict, FrozenSet, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 过滤阶段
+STAGE_STRATEGY = 'strategy'   # 策略信号生成后（趋势/均值回归）
+STAGE_REGIME = 'regime'       # 综合信号生成后（市场状态）
+
+# 动作编码（向量化）
+ACTION_CODES = {'BUY': 1, 'SELL': -1, 'HOLD': 0}
+
+# 信号类型 → 阈值前缀
+SIGNAL_TYPES = {
+    'TREND_FOLLOWING': 'trend',
+    'MEAN_REVERSION': 'mean_reversion',
+}
+
+KNOWN_REGIMES = ('STRONG_TREND', 'TREND', 'RANGE', 'SQUEEZE', 'NEUTRAL')
+THRESHOLD_KEYS = ('trend_buy', 'trend_sell', 'mean_reversion_buy', 'mean_reversion_sell')
+EXTRA_FILTER_KEYS = ('min_adx', 'require_volume_confirmation', 'max_rsi_for_buy', 'min_rsi_for_sell')
+
+
+def is_volume_confirmed(reasons) -> bool:
+    """信号理由中是否包含成交量确认"""
+    return any('成交量' in reason or 'volume' in reason.lower() for reason in reasons)
+
+
+# ==================== 谓词 ====================
+
+class StrengthThreshold(NamedTuple):
+    """信号强度阈值（按信号类型和方向）"""
+    trend_buy: float
+    trend_sell: float
+    mean_reversion_buy: float
+    mean_reversion_sell: float
+    stage: str = STAGE_STRATEGY
+
+    def required(self, signal_type: str, action: str) -> float:
+        side = 'buy' if action == 'BUY' else 'sell'
+        return getattr(self, f'{signal_type}_{side}', 40)
+
+    def check(self, signal: Dict, signal_type: str, values: Mapping) -> Optional[str]:
+        required = self.required(signal_type, signal['action'])
+        if signal['strength'] < required:
+            side = '买入' if signal['action'] == 'BUY' else '卖出'
+            logger.info(f"⚠️  {side}信号强度不足: {signal['strength']} < {required}")
+            return f"信号强度不足（{signal['strength']} < {required}）"
+        return None
+
+    def rejects(self, arrays: Mapping) -> np.ndarray:
+        signal_type = arrays['signal_type']
+        buy = arrays['action'] == 1
+        trend = signal_type == 'trend'
+        reversion = signal_type == 'mean_reversion'
+        required = np.select(
+            [trend & buy, trend & ~buy, reversion & buy, reversion & ~buy],
+            [self.trend_buy, self.trend_sell, self.mean_reversion_buy, self.mean_reversion_sell],
+            default=40
+        )
+        return arrays['strength'] < required
+
+
+class MinADX(NamedTuple):
+    """最低ADX要求"""
+    min_adx: float
+    stage: str = STAGE_STRATEGY
+
+    def check(self, signal, signal_type, values):
+        adx = values.get('adx')
+        if adx is not None and adx < self.min_adx:
+            logger.info(f"⚠️  ADX不足: {adx:.1f} < {self.min_adx}")
+            return f"ADX不足（{adx:.1f} < {self.min_adx}）"
+        return None
+
+    def rejects(self, arrays):
+        return arrays['adx'] < self.min_adx
+
+
+class MaxRSIForBuy(NamedTuple):
+    """买入时RSI上限"""
+    max_rsi: float
+    stage: str = STAGE_STRATEGY
+
+    def check(self, signal, signal_type, values):
+        rsi = values.get('rsi')
+        if signal['action'] == 'BUY' and rsi is not None and rsi > self.max_rsi:
+            logger.info(f"⚠️  RSI过高: {rsi:.1f} > {self.max_rsi}")
+            return f"RSI过高（{rsi:.1f} > {self.max_rsi}）"
+        return None
+
+    def rejects(self, arrays):
+        return (arrays['action'] == 1) & (arrays['rsi'] > self.max_rsi)
+
+
+class MinRSIForSell(NamedTuple):
+    """卖出时RSI下限"""
+    min_rsi: float
+    stage: str = STAGE_STRATEGY
+
+    def check(self, signal, signal_type, values):
+        rsi = values.get('rsi')
+        if signal['action'] == 'SELL' and rsi is not None and rsi < self.min_rsi:
+            logger.info(f"⚠️  RSI过低: {rsi:.1f} < {self.min_rsi}")
+            return f"RSI过低（{rsi:.1f} < {self.min_rsi}）"
+        return None
+
+    def rejects(self, arrays):
+        return (arrays['action'] == -1) & (arrays['rsi'] < self.min_rsi)
+
+
+class VolumeConfirmation(NamedTuple):
+    """必须有成交量确认"""
+    stage: str = STAGE_STRATEGY
+
+    def check(self, signal, signal_type, values):
+        if not is_volume_confirmed(signal['reasons']):
+            logger.info("⚠️  缺少成交量确认")
+            return "缺少成交量确认"
+        return None
+
+    def rejects(self, arrays):
+        return ~arrays['volume_confirmed']
+
+
+class RegimeFilter(NamedTuple):
+    """市场状态过滤（未配置的状态默认允许）"""
+    blocked: FrozenSet[str]
+    stage: str = STAGE_REGIME
+
+    def check(self, signal, signal_type, values):
+        regime = signal.get('market_regime')
+        if regime in self.blocked:
+            logger.info(f"⚠️  市场状态不允许交易: {regime}")
+            return f"市场状态不允许交易（{regime}）"
+        return None
+
+    def rejects(self, arrays):
+        return np.isin(arrays['market_regime'], list(self.blocked))
+
+
+# ==================== 管线 ====================
+
+class CompiledFilterPipeline(NamedTuple):
+    """编译后的过滤管线（不可变）"""
+    name: str
+    preset: Optional[str]
+    predicates: Tuple
+    config_hash: str
+
+    def stage_predicates(self, stage: str) -> Tuple:
+        return tuple(p for p in self.predicates if p.stage == stage)
+
+    def apply(self, signal: Dict, stage: str, signal_type: Optional[str] = None,
+              values: Optional[Mapping] = None) -> Dict:
+        """
+        对单个信号应用某一阶段的过滤（首个不通过的谓词把信号转为HOLD）
+
+        Args:
+            signal: 信号字典（原地修改并返回）
+            stage: STAGE_STRATEGY 或 STAGE_REGIME
+            signal_type: 'trend' / 'mean_reversion'（策略阶段需要）
+            values: 最新指标值，如 {'adx': 30.1, 'rsi': 55.2}
+        """
+        if signal['action'] == 'HOLD':
+            return signal
+
+        values = values or {}
+        for predicate in self.predicates:
+            if predicate.stage != stage:
+                continue
+            reason = predicate.check(signal, signal_type, values)
+            if reason is not None:
+                signal['action'] = 'HOLD'
+                signal['reasons'].insert(0, reason)
+                break
+        return signal
+
+    def evaluate(self, arrays: Mapping) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        向量化评估整段信号
+
+        Args:
+            arrays: 等长数组字典：
+                action (1/-1/0), strength, signal_type ('trend'/'mean_reversion'/''),
+                adx, rsi, volume_confirmed (bool), market_regime
+
+        Returns:
+            (过滤后的动作数组, 拦截谓词下标数组，-1表示未拦截)
+        """
+        action = np.asarray(arrays['action'])
+        rejected_by = np.full(len(action), -1, dtype=np.int16)
+        active = action != 0
+
+        for i, predicate in enumerate(self.predicates):
+            hit = active & (rejected_by < 0) & predicate.rejects(arrays)
+            rejected_by[hit] = i
+
+        filtered = np.where(rejected_by < 0, action, 0).astype(action.dtype)
+        return filtered, rejected_by
+
+
+def _number(section: str, key: str, value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{section}.{key} 必须是数字: {value!r}")
+    return value
+
+
+def compile_filter_pipeline(config: Dict, preset: Optional[str] = None) -> CompiledFilterPipeline:
+    """
+    编译预设方案为过滤管线（顺序与原过滤流程一致：阈值 → 额外过滤 → 市场状态）
+
+    Args:
+        config: signal_filter_config 中的预设方案字典
+        preset: 预设方案名称（仅用于显示）
+
+    Returns:
+        CompiledFilterPipeline
+    """
+    thresholds = config.get('thresholds', {})
+    extra_filters = config.get('extra_filters', {})
+    regime_filter = config.get('market_regime_filter', {})
+
+    unknown = set(thresholds) - set(THRESHOLD_KEYS)
+    unknown |= set(extra_filters) - set(EXTRA_FILTER_KEYS)
+    unknown |= set(regime_filter) - set(KNOWN_REGIMES)
+    if unknown:
+        raise ValueError(f"未知的过滤配置项: {sorted(unknown)}")
+
+    predicates = [StrengthThreshold(**{
+        key: _number('thresholds', key, thresholds.get(key, 40)) for key in THRESHOLD_KEYS
+    })]
+
+    # 与原实现一致：值为 0/None 视为不启用
+    if extra_filters.get('min_adx'):
+        predicates.append(MinADX(_number('extra_filters', 'min_adx', extra_filters['min_adx'])))
+    if extra_filters.get('max_rsi_for_buy'):
+        predicates.append(MaxRSIForBuy(_number('extra_filters', 'max_rsi_for_buy', extra_filters['max_rsi_for_buy'])))
+    if extra_filters.get('min_rsi_for_sell'):
+        predicates.append(MinRSIForSell(_number('extra_filters', 'min_rsi_for_sell', extra_filters['min_rsi_for_sell'])))
+    if extra_filters.get('require_volume_confirmation', False):
+        predicates.append(VolumeConfirmation())
+
+    blocked = frozenset(regime for regime, allowed in regime_filter.items() if not allowed)
+    if blocked:
+        predicates.append(RegimeFilter(blocked))
+
+    # 哈希只包含编译后的谓词参数（名称、说明文字的修改不影响缓存键）
+    canonical = [
+        [type(p).__name__, {k: sorted(v) if isinstance(v, frozenset) else v for k, v in p._asdict().items()}]
+        for p in predicates
+    ]
+    config_hash = hashlib.sha256(
+        json.dumps(canonical, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()[:16]
+
+    return CompiledFilterPipeline(
+        name=config.get('name', preset or 'custom'),
+        preset=preset,
+        predicates=tuple(predicates),
+        config_hash=config_hash,
+    )
+
+
+def compile_active_pipeline() -> CompiledFilterPipeline:
+    """编译当前激活的预设方案（ACTIVE_PRESET）"""
+    from config import signal_filter_config
+
+    preset = signal_filter_config.ACTIVE_PRESET
+    return compile_filter_pipeline(signal_filter_config.get_preset_config(preset), preset)
@@ -0,0 +1,613 @@
+"""
+流式技术指标
+按K线逐根递推指标状态，避免每根K线都对整个缓冲区重算
+
+递推公式与 TA-Lib 保持一致（EMA以SMA作为首值、RSI/ATR/ADX使用Wilder平滑、
+布林带使用总体标准差），因此在相同历史数据上与 utils.indicators 的结果一致。
+输出列名与 StrategyEngine.calculate_all_indicators 相同，可直接交给策略规则使用。
+
+注意：VWAP 为累计指标，结果取决于状态开始累计的位置。
+"""
+
+import math
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+NAN = float('nan')
+
+# 基础K线字段
+BAR_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+def _is_zero(value: float) -> bool:
+    """与 TA-Lib 的 TA_IS_ZERO 一致"""
+    return -0.00000001 < value < 0.00000001
+
+
+class _EmaCore:
+    """EMA递推核心（首值为前period个数据的SMA，与TA-Lib一致）"""
+
+    __slots__ = ('period', 'k', 'count', 'total', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value: Optional[float] = None
+
+    def step(self, x: float, commit: bool = True) -> float:
+        if self.value is None:
+            count = self.count + 1
+            total = self.total + x
+            value = total / self.period if count >= self.period else None
+            if commit:
+                self.count, self.total, self.value = count, total, value
+            return NAN if value is None else value
+
+        value = self.value + self.k * (x - self.value)
+        if commit:
+            self.value = value
+        return value
+
+
+class _RollingMean:
+    """滚动均值（窗口内存在NaN或数据不足时输出NaN，与pandas rolling一致）"""
+
+    __slots__ = ('period', 'values')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.values = deque(maxlen=period)
+
+    def step(self, x: float, commit: bool = True) -> float:
+        if commit:
+            self.values.append(x)
+            window = self.values
+        else:
+            window = list(self.values)[1:] if len(self.values) == self.period else list(self.values)
+            window.append(x)
+
+        if len(window) < self.period or any(v != v for v in window):
+            return NAN
+        return sum(window) / self.period
+
+
+# ==================== 指标组件 ====================
+
+class StreamingIndicator:
+    """
+    流式指标组件基类
+
+    子类实现 _step(bar, commit)：commit=False 时只计算不修改状态（用于推测性更新）
+    """
+
+    columns: Tuple[str, ...] = ()
+
+    def update(self, bar: Dict) -> Dict[str, float]:
+        """用一根已收盘K线推进状态"""
+        return self._step(bar, True)
+
+    def peek(self, bar: Dict) -> Dict[str, float]:
+        """计算假设追加该K线后的指标值，不修改状态"""
+        return self._step(bar, False)
+
+    def _step(self, bar: Dict, commit: bool) -> Dict[str, float]:
+        raise NotImplementedError
+
+    def _empty(self) -> Dict[str, float]:
+        return {col: NAN for col in self.columns}
+
+
+class EMAIndicator(StreamingIndicator):
+    """EMA"""
+
+    def __init__(self, period: int, column: str):
+        self.columns = (column,)
+        self._core = _EmaCore(period)
+
+    def _step(self, bar, commit):
+        return {self.columns[0]: self._core.step(bar['close'], commit)}
+
+
+class MACDIndicator(StreamingIndicator):
+    """MACD（快线在慢线首值位置对齐起算，与TA-Lib MACD一致）"""
+
+    columns = ('macd', 'macd_signal', 'macd_hist')
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast_start = slow - fast
+        self.count = 0
+        self._fast = _EmaCore(fast)
+        self._slow = _EmaCore(slow)
+        self._signal = _EmaCore(signal)
+
+    def _step(self, bar, commit):
+        close = bar['close']
+        index = self.count
+        if commit:
+            self.count += 1
+
+        slow = self._slow.step(close, commit)
+        fast = self._fast.step(close, commit) if index >= self.fast_start else NAN
+        if slow != slow or fast != fast:
+            return self._empty()
+
+        macd = fast - slow
+        signal = self._signal.step(macd, commit)
+        if signal != signal:
+            return self._empty()
+        return {'macd': macd, 'macd_signal': signal, 'macd_hist': macd - signal}
+
+
+class RSIIndicator(StreamingIndicator):
+    """RSI（Wilder平滑）"""
+
+    columns = ('rsi',)
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev_close: Optional[float] = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def _step(self, bar, commit):
+        close = bar['close']
+        if self.prev_close is None:
+            if commit:
+                self.prev_close = close
+                self.count = 1
+            return self._empty()
+
+        diff = close - self.prev_close
+        gain = diff if diff > 0 else 0.0
+        loss = -diff if diff < 0 else 0.0
+        count = self.count
+
+        if count <= self.period:
+            # 累计阶段：先求和，满period个差值后取平均
+            avg_gain = self.avg_gain + gain
+            avg_loss = self.avg_loss + loss
+            ready = count == self.period
+            if ready:
+                avg_gain /= self.period
+                avg_loss /= self.period
+        else:
+            avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+            ready = True
+
+        if commit:
+            self.prev_close = close
+            self.count = count + 1
+            self.avg_gain, self.avg_loss = avg_gain, avg_loss
+
+        if not ready:
+            return self._empty()
+        total = avg_gain + avg_loss
+        return {'rsi': 100.0 * (avg_gain / total) if not _is_zero(total) else 0.0}
+
+
+def _true_range(high: float, low: float, prev_close: float) -> float:
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class ATRIndicator(StreamingIndicator):
+    """ATR（Wilder平滑）"""
+
+    columns = ('atr',)
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev_close: Optional[float] = None
+        self.value = 0.0
+
+    def _step(self, bar, commit):
+        if self.prev_close is None:
+            if commit:
+                self.prev_close = bar['close']
+                self.count = 1
+            return self._empty()
+
+        tr = _true_range(bar['high'], bar['low'], self.prev_close)
+        count = self.count
+        if count <= self.period:
+            value = self.value + tr
+            ready = count == self.period
+            if ready:
+                value /= self.period
+        else:
+            value = (self.value * (self.period - 1) + tr) / self.period
+            ready = True
+
+        if commit:
+            self.prev_close = bar['close']
+            self.count = count + 1
+            self.value = value
+
+        return {'atr': value} if ready else self._empty()
+
+
+class ADXIndicator(StreamingIndicator):
+    """ADX / +DI / -DI（与TA-Lib的DM、TR平滑及DX种子方式一致）"""
+
+    columns = ('adx', 'plus_di', 'minus_di')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev_bar: Optional[Tuple[float, float, float]] = None
+        self.plus_dm = 0.0
+        self.minus_dm = 0.0
+        self.tr = 0.0
+        self.sum_dx = 0.0
+        self.adx = NAN
+
+    def _step(self, bar, commit):
+        high, low, close = bar['high'], bar['low'], bar['close']
+        if self.prev_bar is None:
+            if commit:
+                self.prev_bar = (high, low, close)
+                self.count = 1
+            return self._empty()
+
+        prev_high, prev_low, prev_close = self.prev_bar
+        diff_p = high - prev_high
+        diff_m = prev_low - low
+        dm_plus = dm_minus = 0.0
+        if diff_m > 0 and diff_p < diff_m:
+            dm_minus = diff_m
+        elif diff_p > 0 and diff_p > diff_m:
+            dm_plus = diff_p
+        tr = _true_range(high, low, prev_close)
+
+        period = self.period
+        index = self.count
+        plus_dm, minus_dm, tr_sum = self.plus_dm, self.minus_dm, self.tr
+        sum_dx, adx = self.sum_dx, self.adx
+        result = self._empty()
+
+        if index < period:
+            # 前 period-1 个差值直接累加
+            plus_dm += dm_plus
+            minus_dm += dm_minus
+            tr_sum += tr
+        else:
+            plus_dm = plus_dm - plus_dm / period + dm_plus
+            minus_dm = minus_dm - minus_dm / period + dm_minus
+            tr_sum = tr_sum - tr_sum / period + tr
+
+            if not _is_zero(tr_sum):
+                plus_di = 100.0 * (plus_dm / tr_sum)
+                minus_di = 100.0 * (minus_dm / tr_sum)
+            else:
+                plus_di = minus_di = 0.0
+            di_sum = plus_di + minus_di
+            dx = 100.0 * (abs(minus_di - plus_di) / di_sum) if not _is_zero(tr_sum) and not _is_zero(di_sum) else None
+
+            if index < 2 * period - 1:
+                sum_dx += dx or 0.0
+            elif index == 2 * period - 1:
+                sum_dx += dx or 0.0
+                adx = sum_dx / period
+            elif dx is not None:
+                adx = (adx * (period - 1) + dx) / period
+
+            result = {'adx': adx, 'plus_di': plus_di, 'minus_di': minus_di}
+
+        if commit:
+            self.prev_bar = (high, low, close)
+            self.count = index + 1
+            self.plus_dm, self.minus_dm, self.tr = plus_dm, minus_dm, tr_sum
+            self.sum_dx, self.adx = sum_dx, adx
+
+        return result
+
+
+def _window_stats(window) -> Tuple[float, float]:
+    """返回窗口均值与总体标准差（与TA-Lib BBANDS一致）"""
+    n = len(window)
+    mean = sum(window) / n
+    variance = sum(v * v for v in window) / n - mean * mean
+    return mean, math.sqrt(variance) if variance > 0 else 0.0
+
+
+class BollingerIndicator(StreamingIndicator):
+    """布林带"""
+
+    columns = ('bb_upper', 'bb_middle', 'bb_lower')
+
+    def __init__(self, period: int = 20, std_dev: float = 2.0):
+        self.period = period
+        self.std_dev = std_dev
+        self.closes = deque(maxlen=period)
+
+    def _window(self, close, commit):
+        if commit:
+            self.closes.append(close)
+            return self.closes
+        window = list(self.closes)[1:] if len(self.closes) == self.period else list(self.closes)
+        window.append(close)
+        return window
+
+    def _bands(self, close, commit):
+        window = self._window(close, commit)
+        if len(window) < self.period:
+            return None
+        middle, std = _window_stats(window)
+        return middle + self.std_dev * std, middle, middle - self.std_dev * std
+
+    def _step(self, bar, commit):
+        bands = self._bands(bar['close'], commit)
+        if bands is None:
+            return self._empty()
+        return dict(zip(self.columns, bands))
+
+
+class BBWIndicator(BollingerIndicator):
+    """布林带宽度及其均线（市场状态识别用）"""
+
+    columns = ('bbw', 'bbw_ma')
+
+    def __init__(self, period: int = 20, ma_period: int = 20, std_dev: float = 2.0):
+        super().__init__(period, std_dev)
+        self._ma = _RollingMean(ma_period)
+
+    def _step(self, bar, commit):
+        bands = self._bands(bar['close'], commit)
+        bbw = (bands[0] - bands[2]) / bands[1] if bands is not None else NAN
+        return {'bbw': bbw, 'bbw_ma': self._ma.step(bbw, commit)}
+
+
+class KDJIndicator(StreamingIndicator):
+    """KDJ（STOCH，K/D均使用EMA平滑）"""
+
+    columns = ('kdj_k', 'kdj_d', 'kdj_j')
+
+    def __init__(self, fastk_period: int = 9, slowk_period: int = 3, slowd_period: int = 3):
+        self.fastk_period = fastk_period
+        self.highs = deque(maxlen=fastk_period)
+        self.lows = deque(maxlen=fastk_period)
+        self._k = _EmaCore(slowk_period)
+        self._d = _EmaCore(slowd_period)
+
+    def _step(self, bar, commit):
+        if commit:
+            self.highs.append(bar['high'])
+            self.lows.append(bar['low'])
+            highs, lows = self.highs, self.lows
+        else:
+            full = len(self.highs) == self.fastk_period
+            highs = (list(self.highs)[1:] if full else list(self.highs)) + [bar['high']]
+            lows = (list(self.lows)[1:] if full else list(self.lows)) + [bar['low']]
+
+        if len(highs) < self.fastk_period:
+            return self._empty()
+
+        lowest = min(lows)
+        diff = (max(highs) - lowest) / 100.0
+        fast_k = (bar['close'] - lowest) / diff if diff != 0.0 else 0.0
+
+        k = self._k.step(fast_k, commit)
+        if k != k:
+            return self._empty()
+        d = self._d.step(k, commit)
+        if d != d:
+            return self._empty()
+        return {'kdj_k': k, 'kdj_d': d, 'kdj_j': 3 * k - 2 * d}
+
+
+class OBVIndicator(StreamingIndicator):
+    """OBV及其均线"""
+
+    columns = ('obv', 'obv_ma')
+
+    def __init__(self, ma_period: int = 20):
+        self.prev_close: Optional[float] = None
+        self.obv = 0.0
+        self._ma = _RollingMean(ma_period)
+
+    def _step(self, bar, commit):
+        close, volume = bar['close'], bar['volume']
+        if self.prev_close is None:
+            obv = volume
+        elif close > self.prev_close:
+            obv = self.obv + volume
+        elif close < self.prev_close:
+            obv = self.obv - volume
+        else:
+            obv = self.obv
+
+        if commit:
+            self.prev_close = close
+            self.obv = obv
+        return {'obv': obv, 'obv_ma': self._ma.step(obv, commit)}
+
+
+class VWAPIndicator(StreamingIndicator):
+    """VWAP（从状态开始处累计）"""
+
+    columns = ('vwap',)
+
+    def __init__(self):
+        self.tp_volume = 0.0
+        self.volume = 0.0
+
+    def _step(self, bar, commit):
+        typical_price = (bar['high'] + bar['low'] + bar['close']) / 3
+        tp_volume = self.tp_volume + typical_price * bar['volume']
+        volume = self.volume + bar['volume']
+        if commit:
+            self.tp_volume, self.volume = tp_volume, volume
+        return {'vwap': tp_volume / volume if volume else NAN}
+
+
+def build_indicator_specs(engine) -> Dict[str, Tuple]:
+    """
+    根据策略引擎参数生成指标规格（与 StrategyEngine.calculate_all_indicators 对应）
+
+    Args:
+        engine: 带有 trend_params / mean_reversion_params /
+                market_regime_params / volume_params 属性的对象
+
+    Returns:
+        {名称: (指标类, 构造参数元组)}，规格相同即表示指标无需重算
+    """
+    trend = engine.trend_params
+    mean_reversion = engine.mean_reversion_params
+    regime = engine.market_regime_params
+    volume = engine.volume_params
+
+    specs = {
+        'ema_fast': (EMAIndicator, (trend['ema_fast'], 'ema_50')),
+        'ema_slow': (EMAIndicator, (trend['ema_slow'], 'ema_200')),
+        'macd': (MACDIndicator, (trend['macd_fast'], trend['macd_slow'], trend['macd_signal'])),
+        'rsi': (RSIIndicator, (mean_reversion['rsi_period'],)),
+        'adx': (ADXIndicator, (regime['adx_period'],)),
+        'bollinger': (BollingerIndicator, (mean_reversion['bb_period'], mean_reversion['bb_std'])),
+        'bbw': (BBWIndicator, (regime['bbw_period'], regime['bbw_ma_period'])),
+        'atr': (ATRIndicator, (14,)),
+    }
+
+    if mean_reversion.get('kdj_enabled', True):
+        specs['kdj'] = (KDJIndicator, (
+            mean_reversion['kdj_fastk_period'],
+            mean_reversion['kdj_slowk_period'],
+            mean_reversion['kdj_slowd_period'],
+        ))
+    if volume.get('obv_enabled', True):
+        specs['obv'] = (OBVIndicator, (volume['obv_ma_period'],))
+    if volume.get('vwap_enabled', True):
+        specs['vwap'] = (VWAPIndicator, ())
+
+    return specs
+
+
+# ==================== 指标状态 ====================
+
+class IndicatorState:
+    """
+    单个交易对/周期的流式指标状态
+
+    只保留最近 window 根K线的指标行，用于交给策略规则（规则只需要最新几根K线）
+    """
+
+    def __init__(self, specs: Dict[str, Tuple], window: int = 50):
+        """
+        初始化指标状态
+
+        Args:
+            specs: 指标规格（见 build_indicator_specs）
+            window: 保留的最近K线行数（量价背离检测需要至少20根）
+        """
+        self.specs = dict(specs)
+        self.window = window
+        self.components = {name: cls(*args) for name, (cls, args) in self.specs.items()}
+        self.rows = deque(maxlen=window)
+        self.bars = 0
+
+    def warm_up(self, df: pd.DataFrame):
+        """
+        使用历史K线逐根推进状态（一次性 O(N)）
+
+        Args:
+            df: OHLCV数据（datetime索引，可含timestamp列）
+        """
+        for bar in iter_bars(df):
+            self.update(bar)
+
+    def update(self, bar: Dict) -> Dict:
+        """用一根已收盘K线推进所有指标，返回该K线的指标行"""
+        row = _base_row(bar)
+        for component in self.components.values():
+            row.update(component.update(bar))
+        self.rows.append(row)
+        self.bars += 1
+        return row
+
+    def peek(self, bar: Dict) -> Dict:
+        """推测性计算（用于正在形成的K线），不修改任何状态"""
+        row = _base_row(bar)
+        for component in self.components.values():
+            row.update(component.peek(bar))
+        return row
+
+    @property
+    def latest(self) -> Optional[Dict]:
+        """最新已收盘K线的指标行"""
+        return self.rows[-1] if self.rows else None
+
+    def frame(self, extra_row: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        最近 window 根K线的指标DataFrame（列名与 calculate_all_indicators 一致）
+
+        Args:
+            extra_row: 追加在末尾的额外行（如 peek() 得到的推测行）
+        """
+        rows = list(self.rows)
+        if extra_row is not None:
+            rows.append(extra_row)
+        if not rows:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(rows)
+        df.index = pd.to_datetime(df['timestamp'], unit='ms')
+        df.index.name = 'datetime'
+        return df
+
+    def reconfigure(self, specs: Dict[str, Tuple], history: pd.DataFrame) -> List[str]:
+        """
+        更新指标参数，只重算规格发生变化的指标
+
+        Args:
+            specs: 新的指标规格
+            history: 已有的K线缓冲（需与当前状态覆盖同一段数据）
+
+        Returns:
+            重算的指标名称列表
+        """
+        changed = [name for name, spec in specs.items() if self.specs.get(name) != spec]
+        removed = [name for name in self.specs if name not in specs]
+
+        for name in removed:
+            for column in self.components[name].columns:
+                for row in self.rows:
+                    row.pop(column, None)
+            del self.components[name]
+
+        if changed:
+            rebuilt = {name: specs[name][0](*specs[name][1]) for name in changed}
+            # 只对最近 window 行回填新指标的输出
+            tail_start = len(history) - len(self.rows)
+            for i, bar in enumerate(iter_bars(history)):
+                outputs = {}
+                for component in rebuilt.values():
+                    outputs.update(component.update(bar))
+                if i >= tail_start:
+                    self.rows[i - tail_start].update(outputs)
+            self.components.update(rebuilt)
+
+        # 保持与 build_indicator_specs 相同的组件顺序
+        self.specs = dict(specs)
+        self.components = {name: self.components[name] for name in specs}
+        return changed + removed
+
+
+def _base_row(bar: Dict) -> Dict:
+    return {field: bar[field] for field in BAR_FIELDS}
+
+
+def iter_bars(df: pd.DataFrame):
+    """逐行产出K线字典（基于numpy数组，避免 iterrows 开销）"""
+    if 'timestamp' in df.columns:
+        timestamps = df['timestamp'].to_numpy(dtype='int64')
+    else:
+        timestamps = df.index.values.astype('datetime64[ms]').astype('int64')
+
+    columns = [df[field].to_numpy(dtype='float64') for field in BAR_FIELDS[1:]]
+    for values in zip(timestamps.tolist(), *(col.tolist() for col in columns)):
+        yield dict(zip(BAR_FIELDS, values))
@@ -0,0 +1,46 @@
+"""
+时间周期工具
+统一解析 '15m' / '1h' / '1d' 等周期字符串
+"""
+
+import re
+
+# 常用周期（秒）
+TIMEFRAME_SECONDS = {
+    '1m': 60,
+    '3m': 180,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1h': 3600,
+    '2h': 7200,
+    '4h': 14400,
+    '1d': 86400,
+}
+
+_UNIT_SECONDS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def timeframe_to_seconds(timeframe: str) -> int:
+    """
+    周期字符串转换为秒数
+
+    Args:
+        timeframe: 时间周期，如 '15m', '1h'
+
+    Returns:
+        秒数
+    """
+    if timeframe in TIMEFRAME_SECONDS:
+        return TIMEFRAME_SECONDS[timeframe]
+
+    match = re.fullmatch(r'(\d+)([mhdw])', timeframe)
+    if not match:
+        raise ValueError(f"不支持的时间周期: {timeframe}")
+
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """周期字符串转换为毫秒数"""
+    return timeframe_to_seconds(timeframe) * 1000
@@ -0,0 +1,217 @@
+"""
+成交 → K线 批量聚合
+一次向量化处理整批成交（实时tick突发、历史成交文件），规则与 KlineBuffer._should_close_kline 一致：
+
+    周期编号 = 时间戳 // 周期毫秒数
+    成交的周期编号大于当前K线时才封闭当前K线；乱序到达的旧周期成交并入当前K线
+    （等价于按 周期编号的累计最大值 分组）
+
+没有成交的周期不会生成K线（与逐笔聚合一致）
+
+使用方法：
+    python3 -m utils.trade_aggregator BTCUSDT-trades-2025-10.csv --symbol BTC/USDT -t 1m 15m 1h
+"""
+
+import logging
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.timeframes import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+# 成交文件格式（币安 data.binance.vision 历史数据）：(时间列, 价格列, 数量列)
+TRADE_FILE_FORMATS = {
+    'binance_trades': (4, 1, 2),     # id, price, qty, quote_qty, time, is_buyer_maker, is_best_match
+    'binance_aggtrades': (5, 1, 2),  # agg_id, price, qty, first_id, last_id, time, is_buyer_maker, is_best_match
+}
+
+# 币安现货2025年起的历史成交使用微秒时间戳
+_MICROSECOND_THRESHOLD = 10 ** 14
+
+
+def aggregate_ticks(timestamps, prices, volumes, timeframe_ms: int,
+                    floor_period: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    把一批成交聚合为K线（按到达顺序处理，不要求有序）
+
+    Args:
+        timestamps: 成交时间（毫秒）
+        prices: 成交价
+        volumes: 成交量
+        timeframe_ms: K线周期（毫秒）
+        floor_period: 已有的当前K线周期编号（实时增量聚合时传入，更早的成交并入该K线）
+
+    Returns:
+        {'period', 'first_ts', 'last_ts', 'open', 'high', 'low', 'close', 'volume', 'trades'}，
+        每个数组一行对应一根K线
+    """
+    timestamps = np.asarray(timestamps, dtype='int64')
+    prices = np.asarray(prices, dtype='float64')
+    volumes = np.asarray(volumes, dtype='float64')
+
+    period = timestamps // timeframe_ms
+    if floor_period is not None:
+        period = np.maximum(period, floor_period)
+    period = np.maximum.accumulate(period) if len(period) else period
+
+    starts = np.flatnonzero(np.r_[True, period[1:] != period[:-1]]) if len(period) else np.empty(0, dtype='int64')
+    ends = np.r_[starts[1:] - 1, len(period) - 1] if len(starts) else starts
+
+    return {
+        'period': period[starts],
+        'first_ts': timestamps[starts],
+        'last_ts': timestamps[ends],
+        'open': prices[starts],
+        'high': np.maximum.reduceat(prices, starts) if len(starts) else prices[:0],
+        'low': np.minimum.reduceat(prices, starts) if len(starts) else prices[:0],
+        'close': prices[ends],
+        'volume': np.add.reduceat(volumes, starts) if len(starts) else volumes[:0],
+        'trades': ends - starts + 1,
+    }
+
+
+def bars_to_dataframe(bars: Dict[str, np.ndarray], timeframe_ms: int, include_trades: bool = False) -> pd.DataFrame:
+    """
+    聚合结果转换为缓存格式 DataFrame（timestamp 为周期开始时间，与交易所K线一致）
+    """
+    timestamps = bars['period'] * timeframe_ms
+    df = pd.DataFrame({
+        'timestamp': timestamps,
+        'open': bars['open'],
+        'high': bars['high'],
+        'low': bars['low'],
+        'close': bars['close'],
+        'volume': bars['volume'],
+    }, index=pd.DatetimeIndex(pd.to_datetime(timestamps, unit='ms'), name='datetime'))
+    if include_trades:
+        df['trades'] = bars['trades']
+    return df
+
+
+def trades_to_ohlcv(trades: pd.DataFrame, timeframe: str, time_col: str = 'timestamp',
+                    price_col: str = 'price', volume_col: str = 'volume',
+                    include_trades: bool = False) -> pd.DataFrame:
+    """
+    成交表聚合为OHLCV
+
+    Args:
+        trades: 成交数据
+        timeframe: 目标周期，如 '1m', '15m'
+        time_col / price_col / volume_col: 列名
+        include_trades: 是否附带每根K线的成交笔数
+
+    Returns:
+        datetime索引 + timestamp/open/high/low/close/volume 列
+    """
+    timeframe_ms = timeframe_to_ms(timeframe)
+    bars = aggregate_ticks(_to_ms(trades[time_col].to_numpy()), trades[price_col].to_numpy(),
+                           trades[volume_col].to_numpy(), timeframe_ms)
+    return bars_to_dataframe(bars, timeframe_ms, include_trades)
+
+
+def _to_ms(timestamps: np.ndarray) -> np.ndarray:
+    timestamps = np.asarray(timestamps, dtype='int64')
+    if len(timestamps) and timestamps[0] > _MICROSECOND_THRESHOLD:
+        return timestamps // 1000
+    return timestamps
+
+
+def _read_trade_chunks(path: str, file_format: str, chunksize: int) -> Iterator[np.ndarray]:
+    if file_format not in TRADE_FILE_FORMATS:
+        raise ValueError(f"不支持的成交文件格式: {file_format}")
+    time_col, price_col, qty_col = TRADE_FILE_FORMATS[file_format]
+
+    # 合约历史数据带表头，现货不带
+    first_row = pd.read_csv(path, header=None, nrows=1)
+    has_header = not str(first_row.iloc[0, 0]).strip().lstrip('-').isdigit()
+
+    reader = pd.read_csv(path, header=None, skiprows=1 if has_header else 0,
+                         usecols=[time_col, price_col, qty_col], chunksize=chunksize,
+                         dtype={time_col: 'int64', price_col: 'float64', qty_col: 'float64'})
+    for chunk in reader:
+        yield _to_ms(chunk[time_col].to_numpy()), chunk[price_col].to_numpy(), chunk[qty_col].to_numpy()
+
+
+def aggregate_trade_file(path: str, timeframes: List[str], file_format: str = 'binance_trades',
+                         chunksize: int = 2_000_000) -> Dict[str, pd.DataFrame]:
+    """
+    分块读取历史成交文件，一遍同时聚合多个周期（内存占用与 chunksize 成正比）
+
+    每块最后一根K线可能延续到下一块，把它的成交留到下一块一起聚合
+
+    Args:
+        path: 成交CSV（可为 .zip）
+        timeframes: 目标周期列表
+        file_format: 文件格式，见 TRADE_FILE_FORMATS
+        chunksize: 每块行数
+
+    Returns:
+        {timeframe: OHLCV DataFrame}
+    """
+    timeframes_ms = {tf: timeframe_to_ms(tf) for tf in timeframes}
+    pieces = {tf: [] for tf in timeframes}
+    carry = {tf: None for tf in timeframes}
+    total = 0
+
+    for ts, price, qty in _read_trade_chunks(path, file_format, chunksize):
+        total += len(ts)
+        for tf, tf_ms in timeframes_ms.items():
+            if carry[tf] is not None:
+                c_ts, c_price, c_qty = carry[tf]
+                ts_tf, price_tf, qty_tf = np.r_[c_ts, ts], np.r_[c_price, price], np.r_[c_qty, qty]
+            else:
+                ts_tf, price_tf, qty_tf = ts, price, qty
+
+            bars = aggregate_ticks(ts_tf, price_tf, qty_tf, tf_ms)
+            if len(bars['period']) == 0:
+                continue
+
+            # 最后一根K线留到下一块（它的成交从最后一个分组起点开始）
+            last_start = len(ts_tf) - int(bars['trades'][-1])
+            carry[tf] = (ts_tf[last_start:], price_tf[last_start:], qty_tf[last_start:])
+            pieces[tf].append(bars_to_dataframe({k: v[:-1] for k, v in bars.items()}, tf_ms))
+
+    results = {}
+    for tf, tf_ms in timeframes_ms.items():
+        if carry[tf] is not None:
+            pieces[tf].append(bars_to_dataframe(aggregate_ticks(*carry[tf], tf_ms), tf_ms))
+        results[tf] = pd.concat(pieces[tf]) if pieces[tf] else bars_to_dataframe(aggregate_ticks([], [], [], tf_ms), tf_ms)
+
+    logger.info(f"✅ 聚合完成: {total} 笔成交 → " + ", ".join(f"{tf} {len(df)} 根" for tf, df in results.items()))
+    return results
+
+
+def main():
+    """命令行：历史成交文件聚合为K线并写入本地缓存"""
+    import argparse
+    import time
+    from data_cache_manager import DataCacheManager
+
+    parser = argparse.ArgumentParser(description='历史成交文件聚合为K线')
+    parser.add_argument('files', nargs='+', help='成交CSV/ZIP文件（币安 data.binance.vision 格式）')
+    parser.add_argument('--symbol', required=True, help='交易对，如 BTC/USDT')
+    parser.add_argument('-t', '--timeframes', nargs='+', default=['1m'], help='目标周期，默认: 1m')
+    parser.add_argument('--format', default='binance_trades', choices=list(TRADE_FILE_FORMATS),
+                        help='文件格式，默认: binance_trades')
+    parser.add_argument('--dry-run', action='store_true', help='只聚合，不写入缓存')
+    args = parser.parse_args()
+
+    manager = None if args.dry_run else DataCacheManager()
+    for path in args.files:
+        start = time.perf_counter()
+        results = aggregate_trade_file(path, args.timeframes, args.format)
+        print(f"📦 {path}: {time.perf_counter() - start:.1f}s")
+        for tf, df in results.items():
+            if df.empty:
+                continue
+            print(f"   {tf:<4} {len(df):>8} 根  {df.index[0]} ~ {df.index[-1]}")
+            if manager is not None:
+                manager.merge_and_save(df, args.symbol, tf, return_data=False)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,14 +1,27 @@
 """
 WebSocket 数据流
 实时接收交易所K线数据
+
+不支持 WebSocket 时退化为轮询：使用异步 ccxt 客户端，请求不阻塞事件循环；
+同一实例上的多个监听共享并发上限（max_concurrent_polls），一个慢请求不会拖慢其他交易对
+轮询按时钟对齐调度：K线周期边界后 close_delay 秒拉取刚封闭的K线，其间按刷新间隔更新正在形成的K线
+
+出错恢复后（或K线时间戳跳过周期时）用一次 fetch_ohlcv 回填错过的封闭K线（utils/gap_filler.py），
+回填K线带 backfill=True，先于实时K线交给回调
 """
 
 import ccxt
+import ccxt.async_support as ccxt_async
 import asyncio
+import time
 import logging
 from typing import Callable, Optional, Dict
 from datetime import datetime
 
+from utils.market_cache import get_market_cache
+from utils.gap_filler import GapFiller
+from utils.timeframes import timeframe_to_ms
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,7 +33,10 @@ class WebSocketStream:
         self,
         exchange_name: str = 'binance',
         proxy: Optional[str] = None,
-        market_type: str = 'spot'
+        market_type: str = 'spot',
+        max_concurrent_polls: int = 10,
+        close_delay: float = 1.5,
+        backfill: bool = True
     ):
         """
         初始化WebSocket流
@@ -29,10 +45,16 @@ class WebSocketStream:
             exchange_name: 交易所名称
             proxy: 代理地址
             market_type: 市场类型，'spot' (现货) 或 'future' (合约)
+            max_concurrent_polls: 轮询模式下同时进行的请求数上限
+            close_delay: 轮询模式下K线周期边界之后等待多久再拉取（秒，等交易所封闭K线）
+            backfill: 是否回填出错/断线期间错过的K线
         """
         self.exchange_name = exchange_name
         self.proxy = proxy
         self.market_type = market_type
+        self.max_concurrent_polls = max_concurrent_polls
+        self.close_delay = close_delay
+        self._poll_semaphore: Optional[asyncio.Semaphore] = None
 
         # 配置
         config = {
@@ -43,21 +65,21 @@ class WebSocketStream:
             }
         }
 
-        if proxy:
-            config['proxies'] = {
-                'http': proxy,
-                'https': proxy
-            }
-
-        # 先尝试使用普通 ccxt（更稳定）
+        # 轮询使用异步 ccxt 客户端（异步客户端通过 aiohttp_proxy 设置代理）
         try:
-            exchange_class = getattr(ccxt, exchange_name)
-            self.exchange = exchange_class(config)
+            exchange_class = getattr(ccxt_async, exchange_name)
+            self.exchange = exchange_class({**config, 'aiohttp_proxy': proxy} if proxy else config)
             logger.info(f"✅ 初始化 {exchange_name} (轮询模式)")
             self.has_pro = False
         except AttributeError:
             raise ValueError(f"不支持的交易所: {exchange_name}")
 
+        if proxy:
+            config['proxies'] = {
+                'http': proxy,
+                'https': proxy
+            }
+
         # 检查是否有 pro 版本可用
         try:
             exchange_class_pro = getattr(ccxt.pro, exchange_name)
@@ -69,8 +91,16 @@ class WebSocketStream:
             self.has_pro = False
             logger.info(f"ℹ️  ccxt.pro 不可用，将使用轮询模式")
 
+        # 有效期内的市场信息直接注入，首次请求不需要先 load_markets
+        cached = get_market_cache().load(exchange_name, market_type)
+        if cached is not None:
+            for client in (self.exchange, self.exchange_pro):
+                if client is not None:
+                    client.set_markets(cached['markets'], cached.get('currencies'))
+
         self.running = False
         self.callbacks: Dict[str, Callable] = {}
+        self.gap_filler = GapFiller(self._fetch_range) if backfill else None
 
     async def watch_ohlcv(
         self,
@@ -90,6 +120,9 @@ class WebSocketStream:
 
         logger.info(f"📡 开始监听 {symbol} {timeframe} K线")
 
+        if callback and self.gap_filler is not None:
+            callback = self.gap_filler.wrap(symbol, timeframe, callback)
+
         # 尝试使用 WebSocket（如果有 pro 版本）
         use_websocket = False
 
@@ -126,41 +159,39 @@ class WebSocketStream:
                     except Exception as e:
                         logger.error(f"❌ WebSocket 错误: {e}")
                         await asyncio.sleep(5)  # 错误后等待5秒重连
+                        self._mark_reconnect(symbol, timeframe)
 
             else:
                 # 轮询模式
                 interval = self._get_poll_interval(timeframe)
-                logger.info(f"📊 轮询模式（每 {interval} 秒）")
+                logger.info(f"📊 轮询模式（每 {interval} 秒，K线封闭后 {self.close_delay}s 拉取）")
 
                 last_timestamp = 0
 
                 while self.running:
                     try:
-                        # 使用普通 ccxt exchange（现货市场）
-                        ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=1)
+                        # 多取一根：新K线出现时先推送上一根K线的最终值
+                        ohlcv = await self._poll(self.exchange.fetch_ohlcv, symbol, timeframe, limit=2)
 
                         if ohlcv and len(ohlcv) > 0:
                             latest = ohlcv[-1]
 
-                            # 只在新K线时触发回调
-                            if latest[0] > last_timestamp:
-                                last_timestamp = latest[0]
-                                kline = self._format_kline(latest)
-
+                            if latest[0] > last_timestamp and len(ohlcv) > 1 and ohlcv[-2][0] >= last_timestamp > 0:
                                 if callback:
-                                    await callback(kline)
-                            else:
-                                # 更新当前K线
-                                kline = self._format_kline(latest)
-                                if callback:
-                                    await callback(kline)
+                                    await callback(self._format_kline(ohlcv[-2]))
+                            last_timestamp = max(last_timestamp, latest[0])
+
+                            # 新K线或更新当前K线
+                            kline = self._format_kline(latest)
+                            if callback:
+                                await callback(kline)
 
-                        # 根据时间周期调整轮询间隔
-                        await asyncio.sleep(interval)
+                        await asyncio.sleep(self._next_poll_delay(timeframe, interval))
 
                     except Exception as e:
                         logger.error(f"❌ 轮询错误: {e}")
                         await asyncio.sleep(10)
+                        self._mark_reconnect(symbol, timeframe)
 
         except Exception as e:
             logger.error(f"❌ 监听失败: {e}")
@@ -222,13 +253,13 @@ class WebSocketStream:
 
                 while self.running:
                     try:
-                        ticker = self.exchange.fetch_ticker(symbol)
+                        ticker = await self._poll(self.exchange.fetch_ticker, symbol)
 
                         if ticker and callback:
                             await callback(ticker)
 
-                        # ticker 轮询间隔：1秒
-                        await asyncio.sleep(1)
+                        # ticker 轮询间隔：1秒（对齐到整秒，慢请求不累积延迟）
+                        await asyncio.sleep(1 - time.time() % 1)
 
                     except Exception as e:
                         logger.error(f"❌ ticker 轮询错误: {e}")
@@ -241,6 +272,48 @@ class WebSocketStream:
         finally:
             await self.close()
 
+    async def _poll(self, fetch, *args, **kwargs):
+        """异步请求（同一实例上所有轮询共享并发上限）"""
+        if self._poll_semaphore is None:
+            self._poll_semaphore = asyncio.Semaphore(self.max_concurrent_polls)
+        async with self._poll_semaphore:
+            return await fetch(*args, **kwargs)
+
+    def _next_poll_delay(self, timeframe: str, interval: int, now: Optional[float] = None) -> float:
+        """
+        距离下一次轮询的秒数（按时钟对齐，与请求耗时无关）
+
+        刷新时刻按 interval 对齐；落在K线周期边界与 close_delay 之间的刷新改到边界后 close_delay 秒，
+        拉取刚封闭的K线
+
+        Args:
+            timeframe: 时间周期
+            interval: 刷新间隔（秒）
+            now: 当前时间（秒），默认 time.time()
+        """
+        now_ms = int((time.time() if now is None else now) * 1000)
+        timeframe_ms = timeframe_to_ms(timeframe)
+        close_delay_ms = int(self.close_delay * 1000)
+
+        next_refresh = (now_ms // (interval * 1000) + 1) * interval * 1000
+        if next_refresh % timeframe_ms < close_delay_ms:
+            next_refresh = next_refresh // timeframe_ms * timeframe_ms + close_delay_ms
+
+        # 当前K线刚开始、上一根K线还没按 close_delay 拉取
+        close_at = now_ms // timeframe_ms * timeframe_ms + close_delay_ms
+        if now_ms < close_at:
+            next_refresh = min(next_refresh, close_at)
+        return (next_refresh - now_ms) / 1000
+
+    def _mark_reconnect(self, symbol: str, timeframe: str):
+        """出错恢复后，下一根新K线到达时核对并回填错过的K线"""
+        if self.gap_filler is not None:
+            self.gap_filler.mark_reconnect([(symbol, timeframe)])
+
+    async def _fetch_range(self, symbol: str, timeframe: str, since: int, limit: int) -> list:
+        """回填用：一次请求获取 since 起的 limit 根K线"""
+        return await self._poll(self.exchange.fetch_ohlcv, symbol, timeframe, since=since, limit=limit)
+
     def _format_kline(self, ohlcv: list) -> Dict:
         """
         格式化K线数据
@@ -258,7 +331,8 @@ class WebSocketStream:
             'high': float(ohlcv[2]),
             'low': float(ohlcv[3]),
             'close': float(ohlcv[4]),
-            'volume': float(ohlcv[5])
+            'volume': float(ohlcv[5]),
+            'received_at': time.time()
         }
 
     def _get_poll_interval(self, timeframe: str) -> int: